@@ -2,22 +2,34 @@
 import datetime, logging
 from datetime import timedelta
 
+from django.conf import settings
 from django.contrib import admin, messages
+from django.db import transaction
+from django.db.models import Count, Q
+from django.http import StreamingHttpResponse
 from django.urls import reverse
 from django.utils import timezone
 from django.utils.translation import ngettext
 
+from gestion.busqueda import filtro_busqueda
+from gestion.cvs import cvs_compartidos, zip_cvs
+from gestion.duplicados import correos_duplicados
+from gestion.eventos import registrar_lote
 from gestion.models import (
+    Colaborador,
+    CorreoPendiente,
     Empresa,
+    Evento,
     Mentor,
+    Normalizacion,
     Participante,
     Pase,
-    Colaborador,
     Presencia,
     RestriccionAlimentaria,
     TipoPase,
     Token,
 )
+from gestion.seleccion import aplicar_seleccion, seleccionar
 from gestion.utils import enviar_correo_confirmacion, enviar_correo_verificacion
 
 logger = logging.getLogger(__name__)
@@ -101,27 +113,43 @@ def aceptar_personas(modeladmin, request, queryset):
         )
         return
 
-    verificados = queryset.filter(fecha_verificacion_correo__isnull=False)
-    no_verificados = queryset.filter(fecha_verificacion_correo__isnull=True)
-
-    ya_aceptados = verificados.filter(fecha_aceptacion__isnull=False).count()
-    actualizados = verificados.filter(fecha_aceptacion__isnull=True).update(
-        fecha_aceptacion=timezone.now()
+    recuento = queryset.aggregate(
+        no_verificados=Count("pk", filter=Q(fecha_verificacion_correo__isnull=True)),
+        ya_aceptados=Count(
+            "pk",
+            filter=Q(
+                fecha_verificacion_correo__isnull=False, fecha_aceptacion__isnull=False
+            ),
+        ),
     )
+    no_verificados = recuento["no_verificados"]
+    ya_aceptados = recuento["ya_aceptados"]
+    ahora = timezone.now()
+    with transaction.atomic():
+        actualizados = queryset.filter(
+            fecha_verificacion_correo__isnull=False, fecha_aceptacion__isnull=True
+        ).update(fecha_aceptacion=ahora)
+        # Las aceptadas ahora son las que tienen esta misma fecha
+        registrar_lote(
+            queryset.filter(fecha_aceptacion=ahora).values_list("pk", flat=True),
+            "ACEPTACION",
+            usuario=request.user.username,
+            fecha=ahora,
+        )
 
     logger.info(
-        f"Acción 'aceptar_personas' ejecutada por {request.user.username}: {actualizados} aceptados. {no_verificados.count()} no verificados. {ya_aceptados} ya aceptados"
+        f"Acción 'aceptar_personas' ejecutada por {request.user.username}: {actualizados} aceptados. {no_verificados} no verificados. {ya_aceptados} ya aceptados"
     )
 
-    if no_verificados.exists():
+    if no_verificados:
         modeladmin.message_user(
             request,
             ngettext(
                 "%d persona no tiene el correo verificado y no se ha podido aceptar.",
                 "%d personas no tienen el correo verificado y no se han podido aceptar.",
-                no_verificados.count(),
+                no_verificados,
             )
-            % no_verificados.count(),
+            % no_verificados,
             messages.ERROR,
         )
 
@@ -147,6 +175,81 @@ def aceptar_personas(modeladmin, request, queryset):
         modeladmin.message_user(request, "No se ha aceptado a ninguna persona.")
 
 
+def _seleccion_segun_plazas(modeladmin, request, queryset, aplicar: bool):
+    if not modeladmin.has_aceptar_permission(request):
+        modeladmin.message_user(
+            request, "No tienes permiso para realizar esta acción", messages.ERROR
+        )
+        return
+
+    if settings.PLAZAS_EVENTO is None:
+        modeladmin.message_user(
+            request, "No se han definido las plazas del evento.", messages.ERROR
+        )
+        return
+
+    resultado = seleccionar(settings.PLAZAS_EVENTO, personas=queryset)
+    for (campo, valor), descartados in resultado["descartados_cuota"].items():
+        modeladmin.message_user(
+            request,
+            f"Cuota {campo}={valor} completa: {descartados} candidatos quedan en espera.",
+            messages.WARNING,
+        )
+
+    resumen = (
+        f"Plazas: {settings.PLAZAS_EVENTO}. Ocupadas: {resultado['ocupadas']}. "
+        f"Seleccionados: {len(resultado['aceptados'])}. En espera: {len(resultado['en_espera'])}."
+    )
+    if not aplicar:
+        modeladmin.message_user(request, f"Simulación. {resumen}")
+        return
+
+    aceptados = len(aplicar_seleccion(resultado["aceptados"], request.user.username))
+    logger.info(
+        f"Acción 'aceptar_segun_plazas' ejecutada por {request.user.username}: {aceptados} aceptados"
+    )
+    modeladmin.message_user(
+        request,
+        f"{resumen} {aceptados} personas aceptadas.",
+        messages.SUCCESS if aceptados else messages.INFO,
+    )
+
+
+@admin.action(
+    permissions=["aceptar"],
+    description="Aceptar según las plazas disponibles",
+)
+def aceptar_segun_plazas(modeladmin, request, queryset):
+    _seleccion_segun_plazas(modeladmin, request, queryset, aplicar=True)
+
+
+@admin.action(
+    permissions=["aceptar"],
+    description="Simular la aceptación según las plazas disponibles",
+)
+def simular_segun_plazas(modeladmin, request, queryset):
+    _seleccion_segun_plazas(modeladmin, request, queryset, aplicar=False)
+
+
+@admin.action(
+    permissions=["ver_cv"],
+    description="Descargar los CVs compartidos en un ZIP",
+)
+def descargar_cvs_compartidos(modeladmin, request, queryset):
+    participantes = cvs_compartidos(queryset)
+
+    logger.info(
+        f"{request.user.username} descarga el ZIP de {participantes.count()} CVs compartidos"
+    )
+    return StreamingHttpResponse(
+        zip_cvs(participantes),
+        content_type="application/zip",
+        headers={
+            "Content-Disposition": f'attachment; filename="cvs-{timezone.now():%Y%m%d-%H%M}.zip"'
+        },
+    )
+
+
 class EstadoPersonaListFilter(admin.SimpleListFilter):
     title = "Estado"
     parameter_name = "estado"
@@ -214,6 +317,24 @@ class EstadoPersonaListFilter(admin.SimpleListFilter):
                 )
 
 
+class PosibleDuplicadoListFilter(admin.SimpleListFilter):
+    title = "Posible duplicado"
+    parameter_name = "duplicado"
+
+    def lookups(self, request, model_admin):
+        return [
+            ("si", "Sí"),
+            ("no", "No"),
+        ]
+
+    def queryset(self, request, queryset):
+        match self.value():
+            case "si":
+                return queryset.filter(correo__in=correos_duplicados())
+            case "no":
+                return queryset.exclude(correo__in=correos_duplicados())
+
+
 class TokenValidoListFilter(admin.SimpleListFilter):
     title = "Validez"
     parameter_name = "validez"
@@ -254,7 +375,46 @@ class TokenInline(admin.TabularInline):
     ]
 
 
-class ParticipanteAdmin(admin.ModelAdmin):
+class EventoInline(admin.TabularInline):
+    model = Evento
+    can_delete = False
+    extra = 0
+    ordering = ["fecha", "id_evento"]
+
+    fields = [
+        "tipo",
+        "fecha",
+        "usuario",
+        "detalle",
+    ]
+
+    readonly_fields = fields
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
+class BusquedaCVMixin:
+    """
+    Añade a la búsqueda del admin las Personas con todas las palabras buscadas en la
+    motivación o, con el permiso `permiso_cv`, en el texto del CV (ver gestion/busqueda.py).
+    """
+
+    permiso_cv = None
+
+    def get_search_results(self, request, queryset, search_term):
+        resultado, duplicados = super().get_search_results(
+            request, queryset, search_term
+        )
+        filtro = filtro_busqueda(
+            search_term, incluir_cv=request.user.has_perm(self.permiso_cv)
+        )
+        if filtro is not None:
+            resultado |= queryset.filter(filtro)
+        return resultado, duplicados
+
+
+class ParticipanteAdmin(BusquedaCVMixin, admin.ModelAdmin):
     fieldsets = [
         (
             "Personal",
@@ -331,6 +491,7 @@ class ParticipanteAdmin(admin.ModelAdmin):
     ]
     list_filter = [
         EstadoPersonaListFilter,
+        PosibleDuplicadoListFilter,
         "nivel_estudio",
         "centro_estudio",
         "nombre_estudio",
@@ -341,15 +502,20 @@ class ParticipanteAdmin(admin.ModelAdmin):
         "correo",
         "nombre",
     ]
+    permiso_cv = "gestion.ver_cv_participante"
 
     actions = [
         aceptar_personas,
+        aceptar_segun_plazas,
+        simular_segun_plazas,
         reenviar_correo_verificacion,
         reenviar_correo_confirmacion,
+        descargar_cvs_compartidos,
     ]
 
     inlines = [
         TokenInline,
+        EventoInline,
     ]
 
     def change_view(self, request, object_id, form_url="", extra_context=None):
@@ -394,8 +560,11 @@ class ParticipanteAdmin(admin.ModelAdmin):
     def has_reenviar_confirmacion_permission(self, request):
         return request.user.has_perm("gestion.reenviar_confirmacion")
 
+    def has_ver_cv_permission(self, request):
+        return request.user.has_perm("gestion.ver_cv_participante")
+
 
-class MentorAdmin(admin.ModelAdmin):
+class MentorAdmin(BusquedaCVMixin, admin.ModelAdmin):
     fieldsets = [
         (
             "Personal",
@@ -457,6 +626,7 @@ class MentorAdmin(admin.ModelAdmin):
     ]
     list_filter = [
         EstadoPersonaListFilter,
+        PosibleDuplicadoListFilter,
         "ciudad",
     ]
 
@@ -464,15 +634,19 @@ class MentorAdmin(admin.ModelAdmin):
         "correo",
         "nombre",
     ]
+    permiso_cv = "gestion.ver_cv_mentor"
 
     actions = [
         aceptar_personas,
+        aceptar_segun_plazas,
+        simular_segun_plazas,
         reenviar_correo_verificacion,
         reenviar_correo_confirmacion,
     ]
 
     inlines = [
         TokenInline,
+        EventoInline,
     ]
 
     def change_view(self, request, object_id, form_url="", extra_context=None):
@@ -598,6 +772,29 @@ class ColaboradorAdmin(admin.ModelAdmin):
     search_fields = ["correo", "nombre"]
 
 
+class EventoAdmin(admin.ModelAdmin):
+    list_display = ["fecha", "persona", "tipo", "usuario", "detalle"]
+    list_filter = ["tipo", "fecha"]
+    list_select_related = ["persona"]
+    date_hierarchy = "fecha"
+
+    search_fields = [
+        "persona__correo",
+        "persona__nombre",
+        "usuario",
+    ]
+
+    # El historial solo se añade desde el código
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
 # Register your models here.
 admin.site.register(Colaborador, ColaboradorAdmin)
 admin.site.register(Mentor, MentorAdmin)
@@ -608,3 +805,6 @@ admin.site.register(TipoPase)
 admin.site.register(Pase)
 admin.site.register(Token, TokenAdmin)
 admin.site.register(Empresa)
+admin.site.register(Normalizacion)
+admin.site.register(CorreoPendiente)
+admin.site.register(Evento, EventoAdmin)
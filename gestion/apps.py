@@ -4,3 +4,12 @@ from django.apps import AppConfig
 class GestionConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "gestion"
+
+    def ready(self):
+        # Pragmas de SQLite en cada conexión (connection_created)
+        import gestion.sqlite
+
+        # Escritura de los logs encolados en un hilo de este proceso
+        from gestion.logs import iniciar
+
+        iniciar()
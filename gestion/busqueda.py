@@ -0,0 +1,198 @@
+# Copyright (C) 2025-now  p.fernandezf <p@fernandezf.es> & iago.rivas <delthia@delthia.com>
+
+import logging, re
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from gestion.models import Mentor, Participante, Persona, TextoCV
+from gestion.pdf import extraer_texto
+
+logger = logging.getLogger(__name__)
+
+# Índice de texto completo (SQLite FTS5, creado en la migración 0012 si SQLite incluye
+# FTS5) con la motivación y el texto del CV de cada Persona. `cv_sha256` es el CV cuyo
+# texto está indexado, o NULL si aún no se ha extraído.
+TABLA = "gestion_busqueda"
+
+_PALABRA = re.compile(r"\w+")
+
+
+# Si existe el índice en cada base de datos, por su nombre (la de los tests es otra)
+_disponible: dict[str, bool] = {}
+
+
+def indice_disponible() -> bool:
+    """Si existe el índice. Se comprueba una vez por proceso, no en cada búsqueda."""
+    nombre = str(connection.settings_dict["NAME"])
+    if nombre not in _disponible:
+        _disponible[nombre] = (
+            connection.vendor == "sqlite"
+            and TABLA in connection.introspection.table_names()
+        )
+    return _disponible[nombre]
+
+
+def extraer_pendientes(maximo: int | None = None) -> int:
+    """
+    Extrae y guarda el texto de los CVs que aún no lo tienen en TextoCV.
+    Los CVs que no se pueden leer se guardan con el error para no reintentarlos.
+
+    Argumentos:
+        maximo: Número máximo de CVs a procesar (Opcional, por defecto `CV_INDICE_LOTE`).
+
+    Salida:
+        Número de CVs procesados.
+    """
+    maximo = maximo or settings.CV_INDICE_LOTE
+    pendientes = (
+        Persona.objects.exclude(cv="")
+        .exclude(cv__isnull=True)
+        .exclude(cv_sha256__isnull=True)
+        .exclude(cv_sha256__in=TextoCV.objects.values("sha256"))
+        .values_list("cv_sha256", "cv")
+        .order_by()
+        .distinct()
+    )
+
+    procesados = 0
+    vistos = set()
+    for sha256, nombre in pendientes[: maximo * 2]:
+        if sha256 in vistos:
+            continue
+        vistos.add(sha256)
+
+        texto, error = "", None
+        try:
+            with Persona.cv.field.storage.open(nombre, "rb") as archivo:
+                texto = extraer_texto(archivo.read(), settings.CV_TEXTO_MAXIMO)
+        except Exception as e:
+            logger.warning(f"No se pudo extraer el texto del CV {nombre}: {e}")
+            error = str(e)[:4096]
+
+        TextoCV.objects.update_or_create(
+            sha256=sha256, defaults={"texto": texto, "error": error}
+        )
+        procesados += 1
+        if procesados >= maximo:
+            break
+
+    return procesados
+
+
+def actualizar_indice() -> int:
+    """
+    Actualiza el índice de búsqueda de forma incremental: solo se vuelven a indexar
+    las Personas nuevas, las que cambiaron de CV o de motivación y las que tienen
+    texto del CV extraído desde la última vez. Se eliminan las que ya no existen.
+
+    Salida:
+        Número de filas del índice añadidas, modificadas o eliminadas.
+    """
+    if not indice_disponible():
+        return 0
+
+    extraidos = set(TextoCV.objects.values_list("sha256", flat=True))
+    actuales = {}
+    for modelo in (Participante, Mentor):
+        for correo, sha256, motivacion in modelo.objects.values_list(
+            "correo", "cv_sha256", "motivacion"
+        ).order_by():
+            actuales[correo] = (
+                sha256 if sha256 in extraidos else None,
+                motivacion or "",
+            )
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT rowid, correo, cv_sha256, motivacion FROM {TABLA}")
+        indexadas = {
+            correo: (rowid, (sha256, motivacion))
+            for rowid, correo, sha256, motivacion in cursor.fetchall()
+        }
+
+        obsoletas = [
+            rowid
+            for correo, (rowid, valores) in indexadas.items()
+            if actuales.get(correo) != valores
+        ]
+        nuevas = [
+            correo
+            for correo, valores in actuales.items()
+            if correo not in indexadas or indexadas[correo][1] != valores
+        ]
+
+        textos = dict(
+            TextoCV.objects.filter(
+                sha256__in={actuales[correo][0] for correo in nuevas} - {None}
+            ).values_list("sha256", "texto")
+        )
+
+        cursor.executemany(
+            f"DELETE FROM {TABLA} WHERE rowid = %s", [(rowid,) for rowid in obsoletas]
+        )
+        cursor.executemany(
+            f"INSERT INTO {TABLA} (correo, cv_sha256, motivacion, cv) VALUES (%s, %s, %s, %s)",
+            [
+                (correo, *actuales[correo], textos.get(actuales[correo][0], ""))
+                for correo in nuevas
+            ],
+        )
+
+    eliminadas = len(set(indexadas) - set(actuales))
+    return len(nuevas) + eliminadas
+
+
+def reconstruir_indice() -> int:
+    """Vacía el índice y lo vuelve a generar completo."""
+    if not indice_disponible():
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {TABLA}")
+    return actualizar_indice()
+
+
+def consulta_fts(termino: str, incluir_cv: bool) -> str | None:
+    """
+    Consulta FTS5 que busca todas las palabras del término (como prefijo) en la
+    motivación y, si `incluir_cv`, en el CV. None si el término no tiene palabras.
+    """
+    palabras = _PALABRA.findall(termino)
+    if not palabras:
+        return None
+    columnas = "{motivacion cv}" if incluir_cv else "motivacion"
+    return " AND ".join(f'{columnas} : "{palabra}"*' for palabra in palabras)
+
+
+def filtro_busqueda(termino: str, incluir_cv: bool) -> Q | None:
+    """
+    Filtro para un queryset de Persona (o sus subclases) con las que contienen
+    todas las palabras de `termino` en la motivación o, si `incluir_cv`, en el CV.
+    Usa el índice FTS5 si está disponible; si no, busca con `icontains`.
+    """
+    palabras = _PALABRA.findall(termino)
+    if not palabras:
+        return None
+
+    if indice_disponible():
+        return Q(
+            pk__in=RawSQL(
+                f"SELECT correo FROM {TABLA} WHERE {TABLA} MATCH %s",
+                [consulta_fts(termino, incluir_cv)],
+            )
+        )
+
+    filtro = Q()
+    for palabra in palabras:
+        coincide = Q(participante__motivacion__icontains=palabra) | Q(
+            mentor__motivacion__icontains=palabra
+        )
+        if incluir_cv:
+            coincide |= Q(
+                cv_sha256__in=TextoCV.objects.filter(texto__icontains=palabra).values(
+                    "sha256"
+                )
+            )
+        filtro &= coincide
+    return Q(pk__in=Persona.objects.filter(filtro).values("pk"))
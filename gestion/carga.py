@@ -0,0 +1,565 @@
+# Copyright (C) 2025-now  p.fernandezf <p@fernandezf.es> & iago.rivas <delthia@delthia.com>
+
+import logging, os, secrets, shutil, socket, subprocess, threading, time
+from contextlib import contextmanager
+from datetime import date, timedelta
+from http.client import HTTPConnection, HTTPException, RemoteDisconnected
+from http.cookies import SimpleCookie
+from itertools import count
+from pathlib import Path
+from statistics import quantiles
+from urllib.parse import urlsplit
+from uuid import uuid4
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import OperationalError, connection, connections
+from django.test import Client, override_settings
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.urls import reverse
+from django.utils import timezone
+
+from gestion.models import Participante, Pase, Persona, Presencia, TipoPase, Token
+from gestion.sqlite import es_bloqueo
+
+logger = logging.getLogger(__name__)
+
+# Pruebas de carga de las vistas que reciben picos al abrir el registro y durante el
+# evento, con el cliente de pruebas de Django (un proceso, un hilo por cliente) o contra
+# gunicorn con distintos procesos e hilos. Se ejecutan sobre una base de datos y un
+# directorio de CVs temporales, y los correos se guardan en memoria o se envían a un
+# servidor SMTP local.
+
+ESCENARIOS = ("registro", "verificar", "pases", "presencia")
+# Escenarios de las páginas de gestión, que necesitan un usuario con sesión iniciada
+ESCENARIOS_GESTION = ("pases", "presencia")
+ESTADO_ESPERADO = {"registro": 200, "verificar": 200, "pases": 302, "presencia": 302}
+
+# Personas con acreditación que se reparten las peticiones de pases y presencia
+ACREDITACIONES = 200
+
+USUARIO = "prueba_carga"
+LETRAS_DNI = "TRWAGMYFPDXBNJZSQVHLCKE"
+
+
+def pdf_cv(numero: int, tamano: int) -> bytes:
+    """
+    PDF de una página con texto y un flujo de relleno aleatorio (cada CV es distinto y
+    no se comprime) hasta ocupar aproximadamente `tamano` bytes.
+    """
+    texto = f"BT /F1 12 Tf 72 720 Td (Curriculum de prueba {numero}) Tj ET".encode()
+    objetos = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+        b"/Contents 4 0 R /Resources << /Font << /F1 5 0 R >> >> >>",
+        b"<< /Length %d >>\nstream\n%s\nendstream" % (len(texto), texto),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    relleno = os.urandom(max(tamano - 1024, 0))
+    objetos.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(relleno), relleno))
+
+    contenido = bytearray(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+    posiciones = []
+    for i, objeto in enumerate(objetos, 1):
+        posiciones.append(len(contenido))
+        contenido += b"%d 0 obj\n%s\nendobj\n" % (i, objeto)
+    xref = len(contenido)
+    contenido += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objetos) + 1)
+    contenido += b"".join(b"%010d 00000 n \n" % posicion for posicion in posiciones)
+    contenido += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+        len(objetos) + 1,
+        xref,
+    )
+    return bytes(contenido)
+
+
+def dni(numero: int) -> str:
+    numero %= 10**8
+    return f"{numero:08d}{LETRAS_DNI[numero % 23]}"
+
+
+def datos_registro(prefijo: str, numero: int, tamano_cv: int) -> dict:
+    """Datos del formulario de registro de un participante, con su CV."""
+    return {
+        "nombre": f"Participante {numero}",
+        "dni": dni(numero),
+        "correo": f"{prefijo}-{numero}@example.com",
+        "telefono": f"6{numero % 10**8:08d}",
+        "fecha_nacimiento": "2002-05-17",
+        "genero": "-",
+        "talla_camiseta": "M",
+        "ciudad": "A Coruña",
+        "detalle_restricciones_alimentarias": "",
+        "nivel_estudio": "UNIVERSIDAD",
+        "centro_estudio": "FIC",
+        "nombre_estudio": "GEI",
+        "curso": "3",
+        "quiere_creditos": "on",
+        "motivacion": "Quiero aprender y conocer gente en el hackathon. " * 5,
+        "cv": ("cv.pdf", pdf_cv(numero, tamano_cv), "application/pdf"),
+        "compartir_cv": "on",
+        "notas": "",
+        "acepta_terminos": "on",
+    }
+
+
+class ClienteDjango:
+    """Cliente de pruebas de Django: la petición se atiende en este proceso y en este hilo."""
+
+    def __init__(self):
+        self.cliente = Client()
+
+    def iniciar_sesion(self, usuario: str, contrasena: str):
+        if not self.cliente.login(username=usuario, password=contrasena):
+            raise RuntimeError(f"No se pudo iniciar sesión con {usuario}")
+
+    def get(self, ruta: str) -> int:
+        return self.cliente.get(ruta).status_code
+
+    def post(self, ruta: str, datos: dict) -> int:
+        datos = {
+            campo: (SimpleUploadedFile(*valor) if isinstance(valor, tuple) else valor)
+            for campo, valor in datos.items()
+        }
+        return self.cliente.post(ruta, datos).status_code
+
+
+class ClienteHttp:
+    """
+    Cliente HTTP con una conexión persistente, las cookies de la sesión y el token CSRF,
+    que se obtiene con un GET de la misma página antes del primer POST.
+    """
+
+    def __init__(self, url: str):
+        partes = urlsplit(url)
+        self.conexion = HTTPConnection(partes.hostname, partes.port, timeout=120)
+        # ALLOWED_HOSTS solo admite el host de la web
+        self.host = settings.HOST_REGISTRO or partes.netloc
+        self.cookies = {}
+
+    def peticion(self, metodo: str, ruta: str, cuerpo=None, cabeceras=None) -> int:
+        cabeceras = {"Host": self.host, **(cabeceras or {})}
+        if self.cookies:
+            cabeceras["Cookie"] = "; ".join(f"{k}={v}" for k, v in self.cookies.items())
+        for intento in range(2):
+            # Conexión persistente de una petición anterior (no cerrada)
+            reutilizada = self.conexion.sock is not None
+            try:
+                self.conexion.request(metodo, ruta, cuerpo, cabeceras)
+                respuesta = self.conexion.getresponse()
+                respuesta.read()
+                break
+            except (HTTPException, OSError) as error:
+                self.conexion.close()
+                # gunicorn cierra las conexiones persistentes inactivas (`keepalive`):
+                # si cierra sin responder en una conexión reutilizada, la petición no
+                # llegó a procesarse y se repite una vez en una conexión nueva. Otros
+                # errores de conexión solo se repiten en los GET, que no escriben.
+                repetible = reutilizada and (
+                    isinstance(error, RemoteDisconnected)
+                    or (metodo == "GET" and isinstance(error, ConnectionError))
+                )
+                if intento or not repetible:
+                    raise
+
+        for cabecera in respuesta.headers.get_all("Set-Cookie") or []:
+            for nombre, morsel in SimpleCookie(cabecera).items():
+                self.cookies[nombre] = morsel.value
+        return respuesta.status
+
+    def iniciar_sesion(self, usuario: str, contrasena: str):
+        estado = self.post(
+            reverse("login"), {"username": usuario, "password": contrasena}
+        )
+        if estado != 302:
+            raise RuntimeError(f"No se pudo iniciar sesión con {usuario} ({estado})")
+
+    def get(self, ruta: str) -> int:
+        return self.peticion("GET", ruta)
+
+    def post(self, ruta: str, datos: dict) -> int:
+        if "csrftoken" not in self.cookies:
+            self.get(ruta)
+        cuerpo, tipo = multipart(
+            {**datos, "csrfmiddlewaretoken": self.cookies.get("csrftoken", "")}
+        )
+        return self.peticion(
+            "POST",
+            ruta,
+            cuerpo,
+            {
+                "Content-Type": tipo,
+                "X-CSRFToken": self.cookies.get("csrftoken", ""),
+            },
+        )
+
+
+def multipart(datos: dict) -> tuple[bytes, str]:
+    """Cuerpo `multipart/form-data` de un formulario. Los archivos son tuplas (nombre, contenido, tipo)."""
+    limite = uuid4().hex
+    partes = []
+    for campo, valor in datos.items():
+        for valor in valor if isinstance(valor, list) else [valor]:
+            if isinstance(valor, tuple):
+                nombre, contenido, tipo = valor
+                cabecera = (
+                    f'Content-Disposition: form-data; name="{campo}"; filename="{nombre}"\r\n'
+                    f"Content-Type: {tipo}\r\n"
+                )
+            else:
+                contenido = str(valor).encode()
+                cabecera = f'Content-Disposition: form-data; name="{campo}"\r\n'
+            partes.append(
+                f"--{limite}\r\n{cabecera}\r\n".encode() + contenido + b"\r\n"
+            )
+    cuerpo = b"".join(partes) + f"--{limite}--\r\n".encode()
+    return cuerpo, f"multipart/form-data; boundary={limite}"
+
+
+def _registro(cliente, i: int, datos: dict) -> int:
+    return cliente.post(
+        reverse("registro"),
+        datos_registro(datos["prefijo"], datos["base"] + i, datos["tamano_cv"]),
+    )
+
+
+def _verificar(cliente, i: int, datos: dict) -> int:
+    return cliente.get(reverse("verificar-correo", args=[datos["enlaces"][i]]))
+
+
+def _pases(cliente, i: int, datos: dict) -> int:
+    acreditaciones = datos["acreditaciones"]
+    return cliente.post(
+        reverse("pases"),
+        {
+            "tipo_pase": datos["tipo_pase"],
+            "acreditacion": acreditaciones[i % len(acreditaciones)],
+        },
+    )
+
+
+def _presencia(cliente, i: int, datos: dict) -> int:
+    # Cada acreditación alterna entradas y salidas
+    acreditaciones = datos["acreditaciones"]
+    vista = (
+        "presencia-entrada" if i // len(acreditaciones) % 2 == 0 else "presencia-salida"
+    )
+    return cliente.get(reverse(vista, args=[acreditaciones[i % len(acreditaciones)]]))
+
+
+_PETICIONES = {
+    "registro": _registro,
+    "verificar": _verificar,
+    "pases": _pases,
+    "presencia": _presencia,
+}
+
+
+def _participante(prefijo: str, numero: int, **campos) -> Participante:
+    return Participante.objects.create(
+        correo=f"{prefijo}-{numero}@example.com",
+        nombre=f"Participante {numero}",
+        dni=dni(numero),
+        genero="-",
+        talla_camiseta="M",
+        telefono=f"6{numero % 10**8:08d}",
+        fecha_nacimiento=date(2002, 5, 17),
+        nivel_estudio="UNIVERSIDAD",
+        **campos,
+    )
+
+
+def preparar(escenario: str, peticiones: int, fase: int, tamano_cv: int) -> dict:
+    """
+    Crea los datos que necesita el escenario: personas sin verificar con su Token de
+    verificación, o personas con acreditación y un tipo de pase válido. Cada fase usa
+    correos, DNIs y acreditaciones distintos.
+    """
+    prefijo = f"carga{fase}"
+    datos = {
+        "escenario": escenario,
+        "prefijo": prefijo,
+        "base": fase * 1_000_000,
+        "tamano_cv": tamano_cv,
+    }
+    ahora = timezone.now()
+
+    if escenario == "verificar":
+        datos["enlaces"] = [
+            Token.objects.create(
+                persona=_participante(f"{prefijo}v", datos["base"] + i),
+                tipo="VERIFICACION",
+                fecha_expiracion=ahora + timedelta(days=7),
+            ).enlace()
+            for i in range(peticiones)
+        ]
+
+    if escenario in ESCENARIOS_GESTION:
+        datos["acreditaciones"] = [
+            _participante(
+                f"{prefijo}a",
+                datos["base"] + i,
+                fecha_verificacion_correo=ahora,
+                fecha_aceptacion=ahora,
+                acreditacion=f"{fase % 100:02d}{i:04d}",
+            ).acreditacion
+            for i in range(min(peticiones, ACREDITACIONES))
+        ]
+        datos["tipo_pase"] = TipoPase.objects.get_or_create(
+            nombre="Prueba de carga",
+            defaults={"inicio_validez": ahora - timedelta(hours=1)},
+        )[0].pk
+
+    return datos
+
+
+def escrituras(datos: dict) -> int:
+    """Filas escritas por el escenario, para comparar con las peticiones correctas."""
+    escenario, prefijo = datos["escenario"], datos["prefijo"]
+    if escenario == "registro":
+        return Persona.objects.filter(correo__startswith=f"{prefijo}-").count()
+    if escenario == "verificar":
+        return Persona.objects.filter(
+            correo__startswith=f"{prefijo}v-", fecha_verificacion_correo__isnull=False
+        ).count()
+    if escenario == "pases":
+        return Pase.objects.filter(persona__correo__startswith=f"{prefijo}a-").count()
+    presencias = Presencia.objects.filter(persona__correo__startswith=f"{prefijo}a-")
+    return (
+        presencias.filter(entrada__isnull=False).count()
+        + presencias.filter(salida__isnull=False).count()
+    )
+
+
+def percentil(ordenadas: list[float], p: int) -> float:
+    if len(ordenadas) < 2:
+        return ordenadas[0] if ordenadas else 0.0
+    return quantiles(ordenadas, n=100, method="inclusive")[p - 1]
+
+
+def ejecutar(fabrica, datos: dict, peticiones: int, concurrencia: int) -> dict:
+    """
+    Lanza `peticiones` peticiones del escenario de `datos` desde `concurrencia` hilos,
+    cada uno con su cliente creado por `fabrica`. Las peticiones con un estado distinto
+    del esperado o que lanzan una excepción son errores; las que fallan porque la base
+    de datos estaba bloqueada (solo visibles con el cliente de Django) son bloqueos.
+
+    Salida:
+        Peticiones, errores, bloqueos, duración, peticiones por segundo y
+        percentiles 50, 95 y 99 y máximo de la latencia en milisegundos.
+    """
+    escenario = datos["escenario"]
+    peticion = _PETICIONES[escenario]
+    esperado = ESTADO_ESPERADO[escenario]
+    siguiente = count()
+    bloqueo = threading.Lock()
+    latencias = []
+    errores = bloqueos = 0
+    listos = threading.Barrier(concurrencia + 1)
+
+    def cliente_hilo():
+        nonlocal errores, bloqueos
+        try:
+            cliente = fabrica()
+            if escenario in ESCENARIOS_GESTION:
+                cliente.iniciar_sesion(USUARIO, datos["contrasena"])
+        finally:
+            listos.wait()
+
+        propias = []
+        try:
+            while (i := next(siguiente)) < peticiones:
+                inicio = time.perf_counter()
+                try:
+                    correcta = peticion(cliente, i, datos) == esperado
+                    bloqueada = False
+                except OperationalError as e:
+                    correcta, bloqueada = False, es_bloqueo(e)
+                except Exception as e:
+                    logger.debug(f"Error en la petición {escenario} {i}: {e}")
+                    correcta = bloqueada = False
+                propias.append(time.perf_counter() - inicio)
+                with bloqueo:
+                    errores += not correcta
+                    bloqueos += bloqueada
+        finally:
+            # Las conexiones a la base de datos son de cada hilo
+            connections.close_all()
+            with bloqueo:
+                latencias.extend(propias)
+
+    hilos = [
+        threading.Thread(target=cliente_hilo, name=f"carga-{n}")
+        for n in range(concurrencia)
+    ]
+    for hilo in hilos:
+        hilo.start()
+    # Los clientes inician sesión antes de empezar a medir
+    listos.wait()
+    inicio = time.perf_counter()
+    for hilo in hilos:
+        hilo.join()
+    duracion = time.perf_counter() - inicio
+
+    ordenadas = sorted(latencia * 1000 for latencia in latencias)
+    return {
+        "peticiones": len(ordenadas),
+        "errores": errores,
+        "bloqueos": bloqueos,
+        "duracion": duracion,
+        "por_segundo": len(ordenadas) / duracion if duracion else 0.0,
+        "p50": percentil(ordenadas, 50),
+        "p95": percentil(ordenadas, 95),
+        "p99": percentil(ordenadas, 99),
+        "maximo": ordenadas[-1] if ordenadas else 0.0,
+    }
+
+
+@contextmanager
+def entorno_prueba(directorio: Path, smtp: tuple[str, int] | None = None):
+    """
+    Base de datos de pruebas (con SQLite, un archivo en `directorio` en modo WAL como el
+    de producción), CVs en `directorio`, registro abierto y correos en memoria o al
+    servidor SMTP `smtp` (host, puerto). Crea el usuario de staff de los escenarios de gestión.
+
+    Salida:
+        Contraseña del usuario de staff.
+    """
+    setup_test_environment()
+    nombre_prueba = connection.settings_dict["TEST"].get("NAME")
+    if connection.vendor == "sqlite":
+        connection.settings_dict["TEST"]["NAME"] = str(directorio / "carga.sqlite3")
+    nombre = connection.creation.create_test_db(
+        verbosity=0, autoclobber=True, serialize=False
+    )
+
+    correo = {}
+    if smtp:
+        correo = {
+            "EMAIL_BACKEND": "django.core.mail.backends.smtp.EmailBackend",
+            "EMAIL_HOST": smtp[0],
+            "EMAIL_PORT": smtp[1],
+            "EMAIL_USE_SSL": False,
+        }
+    try:
+        with override_settings(
+            MEDIA_ROOT=directorio / "media",
+            CV_DIRECTORIO_TEMPORAL=directorio / "media" / "tmp",
+            METRICAS_DIRECTORIO=directorio / "metricas",
+            FECHA_FIN_REGISTRO=timezone.now() + timedelta(days=1),
+            **correo,
+        ):
+            contrasena = secrets.token_urlsafe()
+            User.objects.create_user(USUARIO, password=contrasena, is_staff=True)
+            yield contrasena
+    finally:
+        connections.close_all()
+        connection.creation.destroy_test_db(nombre, verbosity=0)
+        connection.settings_dict["TEST"]["NAME"] = nombre_prueba
+        teardown_test_environment()
+
+
+def entorno_gunicorn(smtp: tuple[str, int] | None = None) -> dict:
+    """Variables de entorno para que gunicorn use la base de datos, los CVs, las métricas y el correo de `entorno_prueba`."""
+    entorno = {
+        **os.environ,
+        "BD_NOMBRE": str(connection.settings_dict["NAME"]),
+        "MEDIA_ROOT": str(settings.MEDIA_ROOT),
+        "METRICAS_DIRECTORIO": str(settings.METRICAS_DIRECTORIO),
+        "FECHA_FIN_REGISTRO": settings.FECHA_FIN_REGISTRO.isoformat(),
+        "EMAIL_BACKEND": "django.core.mail.backends.locmem.EmailBackend",
+    }
+    if smtp:
+        entorno.update(
+            EMAIL_BACKEND="django.core.mail.backends.smtp.EmailBackend",
+            EMAIL_HOST=smtp[0],
+            EMAIL_PORT=str(smtp[1]),
+        )
+    return entorno
+
+
+def gunicorn_disponible() -> bool:
+    return bool(shutil.which("gunicorn"))
+
+
+@contextmanager
+def servidor_gunicorn(
+    workers: int, threads: int, puerto: int, directorio: Path, entorno: dict
+):
+    """
+    Lanza gunicorn con `gunicorn.conf.py` (incluidos sus hooks) pero en primer plano, con
+    `workers` procesos de `threads` hilos en `puerto`, y espera a que responda.
+
+    Salida:
+        URL del servidor.
+    """
+    configuracion = directorio / f"gunicorn-{workers}x{threads}.conf.py"
+    configuracion.write_text(
+        f"exec(open({str(settings.BASE_DIR / 'gunicorn.conf.py')!r}).read())\n"
+        "daemon = False\n"
+        "pidfile = None\n"
+        f"workers = {workers}\n"
+        f"threads = {threads}\n"
+        f"bind = '127.0.0.1:{puerto}'\n"
+        "accesslog = None\n"
+        f"errorlog = {str(directorio / 'gunicorn.log')!r}\n"
+    )
+    proceso = subprocess.Popen(
+        [shutil.which("gunicorn"), "-c", str(configuracion)],
+        cwd=settings.BASE_DIR,
+        env=entorno,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        limite = time.monotonic() + 30
+        while True:
+            if proceso.poll() is not None:
+                raise RuntimeError(
+                    f"gunicorn terminó al arrancar (ver {directorio / 'gunicorn.log'})"
+                )
+            try:
+                socket.create_connection(("127.0.0.1", puerto), timeout=1).close()
+                break
+            except OSError:
+                if time.monotonic() > limite:
+                    raise RuntimeError("gunicorn no respondió en 30 segundos")
+                time.sleep(0.2)
+        yield f"http://127.0.0.1:{puerto}"
+    finally:
+        proceso.terminate()
+        try:
+            proceso.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            proceso.kill()
+            proceso.wait()
+
+
+def ruta_registro_avisos() -> Path:
+    return Path(settings.BASE_DIR) / settings.LOGFILE_NAME / "warning.log"
+
+
+def tamano_registro_avisos() -> int:
+    try:
+        return ruta_registro_avisos().stat().st_size
+    except OSError:
+        return 0
+
+
+def bloqueos_registro(desde: int) -> tuple[int, int]:
+    """
+    Reintentos de `escritura` y errores por base de datos bloqueada escritos en el log
+    de avisos desde la posición `desde`, para contar los de los procesos de gunicorn.
+    """
+    try:
+        with open(ruta_registro_avisos(), "rb") as archivo:
+            archivo.seek(desde)
+            nuevo = archivo.read().decode(errors="replace")
+    except OSError:
+        return 0, 0
+    return (
+        nuevo.count("reintento en"),
+        nuevo.count("OperationalError: database is locked"),
+    )
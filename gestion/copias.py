@@ -0,0 +1,193 @@
+# Copyright (C) 2025-now  p.fernandezf <p@fernandezf.es> & iago.rivas <delthia@delthia.com>
+
+import gzip, logging, os, shutil, sqlite3, subprocess, tempfile, time
+from datetime import datetime
+from pathlib import Path
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+SUFIJO = "_db.sqlite3"
+EXTENSIONES = (".zst", ".gz")
+
+# Reinicios de la copia (por escrituras durante la misma) antes de copiar en un solo paso
+MAXIMO_REINICIOS = 5
+
+
+class ErrorCopia(Exception):
+    pass
+
+
+class _Reintentar(Exception):
+    pass
+
+
+def copiar_bd(origen: Path, destino: Path, paginas: int, pausa: float) -> int:
+    """
+    Copia en caliente la base de datos SQLite `origen` en `destino` con la API de
+    copias de seguridad, de `paginas` en `paginas` y esperando `pausa` segundos entre
+    pasos, para no bloquear a gunicorn. La copia incluye lo que aún está en el WAL.
+
+    Si otra conexión escribe durante la copia, SQLite la reinicia. Si se reinicia más
+    de `MAXIMO_REINICIOS` veces, se termina en un solo paso, que en modo WAL solo
+    mantiene abierta una transacción de lectura y no bloquea las escrituras.
+
+    Salida:
+        Número de páginas copiadas.
+    """
+    reinicios = 0
+    anterior = None
+    total_paginas = 0
+
+    def progreso(estado, restantes, total):
+        nonlocal reinicios, anterior, total_paginas
+        total_paginas = total
+        if anterior is not None and restantes > anterior:
+            reinicios += 1
+        anterior = restantes
+        if reinicios > MAXIMO_REINICIOS:
+            raise _Reintentar()
+        if restantes:
+            time.sleep(pausa)
+
+    fuente = sqlite3.connect(origen, timeout=30)
+    copia = sqlite3.connect(destino)
+    try:
+        try:
+            fuente.backup(copia, pages=paginas, progress=progreso)
+        except _Reintentar:
+            logger.warning(
+                f"La copia de seguridad se reinició {reinicios} veces, se copia en un solo paso"
+            )
+            fuente.backup(copia, pages=-1)
+
+        resultado = copia.execute("PRAGMA integrity_check").fetchall()
+        if resultado != [("ok",)]:
+            raise ErrorCopia(
+                "La comprobación de integridad de la copia falló: "
+                + "; ".join(fila[0] for fila in resultado[:10])
+            )
+        # La copia es un archivo independiente, sin WAL
+        copia.execute("PRAGMA journal_mode=DELETE")
+    finally:
+        copia.close()
+        fuente.close()
+
+    return total_paginas
+
+
+def comprimir(origen: Path, destino_base: Path, nivel: int) -> Path:
+    """
+    Comprime `origen` con zstd si está instalado o, si no, con gzip. Se escribe en un
+    archivo `.part` que se renombra al terminar, para no dejar copias incompletas.
+
+    Salida:
+        Ruta del archivo comprimido.
+    """
+    zstd = shutil.which("zstd")
+    destino = destino_base.with_name(destino_base.name + (".zst" if zstd else ".gz"))
+    parcial = destino.with_name(destino.name + ".part")
+
+    try:
+        if zstd:
+            subprocess.run(
+                [zstd, "-q", "-f", "-T0", f"-{nivel}", "-o", parcial, origen],
+                check=True,
+            )
+        else:
+            with open(origen, "rb") as entrada, gzip.open(
+                parcial, "wb", compresslevel=min(nivel, 9)
+            ) as salida:
+                shutil.copyfileobj(entrada, salida, 1024 * 1024)
+        os.replace(parcial, destino)
+    except BaseException:
+        parcial.unlink(missing_ok=True)
+        raise
+
+    return destino
+
+
+def copias(directorio: Path) -> list[Path]:
+    """Copias de seguridad del directorio, de la más antigua a la más reciente."""
+    return sorted(
+        archivo
+        for archivo in directorio.glob(f"*{SUFIJO}*")
+        if archivo.suffix in EXTENSIONES and archivo.is_file()
+    )
+
+
+def rotar(directorio: Path, conservar: int) -> list[Path]:
+    """
+    Elimina las copias más antiguas del directorio, dejando las `conservar` más recientes.
+
+    Salida:
+        Copias eliminadas.
+    """
+    if conservar <= 0:
+        return []
+    antiguas = copias(directorio)[:-conservar]
+    for archivo in antiguas:
+        archivo.unlink(missing_ok=True)
+    return antiguas
+
+
+def checkpoint(origen: Path):
+    """Vacía el WAL en la base de datos. Si hay lectores o escritores, lo deja para más adelante."""
+    conexion = sqlite3.connect(origen, timeout=5)
+    try:
+        ocupado, _paginas, _copiadas = conexion.execute(
+            "PRAGMA wal_checkpoint(TRUNCATE)"
+        ).fetchone()
+        if ocupado:
+            logger.info("No se pudo vaciar el WAL completamente: base de datos en uso")
+    finally:
+        conexion.close()
+
+
+def copia_seguridad(
+    directorio: Path,
+    conservar: int | None = None,
+    nivel: int | None = None,
+) -> Path:
+    """
+    Crea una copia de seguridad comprimida de la base de datos en `directorio`
+    (`AAAA-MM-DD_HH-MM-SS_db.sqlite3.zst`), comprueba su integridad antes de comprimirla
+    y elimina las más antiguas según `conservar`. Al terminar vacía el WAL.
+
+    Argumentos:
+        directorio: Directorio de las copias.
+        conservar: Número de copias a conservar (Opcional, por defecto `COPIAS_CONSERVAR`).
+        nivel: Nivel de compresión (Opcional, por defecto `COPIAS_NIVEL_COMPRESION`).
+
+    Salida:
+        Ruta de la copia.
+    """
+    origen = Path(settings.DATABASES["default"]["NAME"])
+    conservar = settings.COPIAS_CONSERVAR if conservar is None else conservar
+    nivel = nivel or settings.COPIAS_NIVEL_COMPRESION
+
+    os.makedirs(directorio, exist_ok=True)
+    nombre = datetime.now().strftime("%Y-%m-%d_%H-%M-%S") + SUFIJO
+
+    inicio = time.perf_counter()
+    # En el mismo directorio que las copias: la base de datos puede no caber en /tmp
+    with tempfile.TemporaryDirectory(dir=directorio, prefix=".copia-") as temporal:
+        instantanea = Path(temporal) / nombre
+        paginas = copiar_bd(
+            origen,
+            instantanea,
+            settings.COPIAS_PAGINAS_PASO,
+            settings.COPIAS_PAUSA_PASO,
+        )
+        destino = comprimir(instantanea, directorio / nombre, nivel)
+
+    eliminadas = rotar(directorio, conservar)
+    checkpoint(origen)
+
+    logger.info(
+        f"Copia de seguridad {destino.name} creada en {time.perf_counter() - inicio:.1f}s "
+        f"({paginas} páginas, {destino.stat().st_size / (1024 * 1024):.1f} MB), "
+        f"{len(eliminadas)} copias antiguas eliminadas"
+    )
+    return destino
@@ -0,0 +1,250 @@
+# Copyright (C) 2025-now  p.fernandezf <p@fernandezf.es> & iago.rivas <delthia@delthia.com>
+
+import csv, io, logging, os, re, time, zipfile
+from collections.abc import Iterator
+from itertools import batched
+from pathlib import Path
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import (
+    FileResponse,
+    HttpRequest,
+    HttpResponse,
+    StreamingHttpResponse,
+)
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from django.utils.text import slugify
+
+from gestion.models import Participante
+
+logger = logging.getLogger(__name__)
+
+MODOS_DESCARGA = ("django", "nginx", "sendfile")
+
+TAMANO_BLOQUE = 64 * 1024
+
+_RANGO = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def _rango(cabecera: str, tamano: int) -> tuple[int, int] | None:
+    """
+    Primer y último byte de una cabecera Range con un solo rango.
+    None si no hay rango o no es válido (p. ej. "bytes=10-5"), que se ignora y se envía
+    el archivo completo (RFC 9110). El rango puede no ser satisfacible (el inicio fuera
+    del archivo), y entonces el primer byte es mayor que el último.
+    """
+    coincidencia = _RANGO.match(cabecera.strip())
+    if not coincidencia or coincidencia.groups() == ("", ""):
+        return None
+
+    inicio, fin = coincidencia.groups()
+    if inicio and fin and int(fin) < int(inicio):
+        return None
+    if not inicio:
+        # Sufijo: los últimos N bytes
+        return max(0, tamano - int(fin)), tamano - 1
+    fin = min(int(fin), tamano - 1) if fin else tamano - 1
+    return int(inicio), fin
+
+
+def _leer(ruta: Path, inicio: int, longitud: int):
+    with open(ruta, "rb") as archivo:
+        archivo.seek(inicio)
+        while longitud > 0:
+            bloque = archivo.read(min(TAMANO_BLOQUE, longitud))
+            if not bloque:
+                break
+            longitud -= len(bloque)
+            yield bloque
+
+
+def respuesta_cv(request: HttpRequest, ruta: Path) -> HttpResponse:
+    """
+    Respuesta con un CV de MEDIA_ROOT, una vez comprobados los permisos.
+
+    Según `CV_DESCARGA`:
+        "nginx": cabecera X-Accel-Redirect a la ubicación interna `CV_DESCARGA_PREFIJO`.
+        "sendfile": cabecera X-Sendfile con la ruta absoluta.
+        "django": el archivo desde Django, con ETag, Last-Modified y peticiones Range.
+
+    En los dos primeros modos el servidor web envía el archivo y gestiona la caché y los rangos.
+    """
+    nombre = ruta.name
+    modo = settings.CV_DESCARGA
+
+    if modo in ("nginx", "sendfile"):
+        respuesta = HttpResponse(content_type="application/pdf")
+        respuesta["Content-Disposition"] = f'inline; filename="{nombre}"'
+        if modo == "nginx":
+            relativa = ruta.resolve().relative_to(Path(settings.MEDIA_ROOT).resolve())
+            respuesta["X-Accel-Redirect"] = settings.CV_DESCARGA_PREFIJO + quote(
+                relativa.as_posix()
+            )
+        else:
+            respuesta["X-Sendfile"] = str(ruta.resolve())
+        return respuesta
+
+    estado = os.stat(ruta)
+    etag = f'"{estado.st_mtime_ns:x}-{estado.st_size:x}"'
+    condicional = get_conditional_response(
+        request, etag=etag, last_modified=int(estado.st_mtime)
+    )
+    if condicional is not None:
+        return condicional
+
+    rango = None
+    if "HTTP_RANGE" in request.META and request.META.get("HTTP_IF_RANGE", etag) in (
+        etag,
+        http_date(estado.st_mtime),
+    ):
+        rango = _rango(request.META["HTTP_RANGE"], estado.st_size)
+
+    if rango is None:
+        respuesta = FileResponse(open(ruta, "rb"), content_type="application/pdf")
+    elif rango[0] > rango[1] or rango[0] >= estado.st_size:
+        respuesta = HttpResponse(status=416)
+        respuesta["Content-Range"] = f"bytes */{estado.st_size}"
+    else:
+        inicio, fin = rango
+        respuesta = StreamingHttpResponse(
+            _leer(ruta, inicio, fin - inicio + 1),
+            status=206,
+            content_type="application/pdf",
+        )
+        respuesta["Content-Length"] = fin - inicio + 1
+        respuesta["Content-Range"] = f"bytes {inicio}-{fin}/{estado.st_size}"
+
+    respuesta["Content-Disposition"] = f'inline; filename="{nombre}"'
+    respuesta["Accept-Ranges"] = "bytes"
+    respuesta["ETag"] = etag
+    respuesta["Last-Modified"] = http_date(estado.st_mtime)
+    return respuesta
+
+
+# Columnas del manifiesto incluido en los ZIP de CVs
+CAMPOS_MANIFIESTO = (
+    "nombre",
+    "correo",
+    "nivel_estudio",
+    "nombre_estudio",
+    "centro_estudio",
+    "curso",
+    "ciudad",
+)
+
+
+def cvs_compartidos(
+    participantes=None,
+    nivel_estudio: str | None = None,
+    centro_estudio: str | None = None,
+):
+    """
+    Participantes que autorizaron compartir su CV y lo subieron, en orden de registro
+    para que los nuevos queden al final.
+    """
+    if participantes is None:
+        participantes = Participante.objects.all()
+
+    participantes = participantes.filter(compartir_cv=True).exclude(cv="")
+    participantes = participantes.exclude(cv__isnull=True)
+    if nivel_estudio:
+        participantes = participantes.filter(nivel_estudio=nivel_estudio)
+    if centro_estudio:
+        participantes = participantes.filter(centro_estudio=centro_estudio)
+    return participantes.order_by("fecha_registro", "correo")
+
+
+class _Salida(io.RawIOBase):
+    """Flujo sin posicionamiento que acumula lo escrito hasta que se recoge."""
+
+    def __init__(self):
+        super().__init__()
+        self.bloques = []
+
+    def writable(self):
+        return True
+
+    def write(self, datos):
+        self.bloques.append(bytes(datos))
+        return len(datos)
+
+    def recoger(self) -> bytes:
+        datos = b"".join(self.bloques)
+        self.bloques.clear()
+        return datos
+
+
+def zip_cvs(participantes, inicio: int = 1) -> Iterator[bytes]:
+    """
+    Genera por bloques un ZIP sin compresión (los PDF ya están comprimidos) con los CV
+    de los Participantes indicados y un `manifiesto.csv`. Nunca tiene en memoria más
+    de un bloque de un CV, por lo que se puede enviar directamente en la respuesta.
+    Los CV que no están en el disco se omiten y no aparecen en el manifiesto.
+
+    Argumentos:
+        participantes: Queryset de Participante, normalmente de `cvs_compartidos`.
+        inicio: Número del primer CV en los nombres de los archivos (Opcional).
+    """
+    salida = _Salida()
+    manifiesto = io.StringIO()
+    escritor = csv.writer(manifiesto)
+    escritor.writerow(("archivo", *CAMPOS_MANIFIESTO))
+
+    with zipfile.ZipFile(salida, "w", zipfile.ZIP_STORED) as paquete:
+        filas = participantes.values_list("cv", *CAMPOS_MANIFIESTO)
+        for numero, (cv, *datos) in enumerate(filas.iterator(), start=inicio):
+            ruta = Path(settings.MEDIA_ROOT) / cv
+            try:
+                origen = open(ruta, "rb")
+            except OSError:
+                logger.warning(f"No se encuentra el CV {cv}, se omite del ZIP")
+                continue
+
+            # Sin el DNI ni el correo del nombre original del archivo
+            nombre = f"{numero:04d}_{slugify(datos[0]) or 'cv'}.pdf"
+            modificado = time.localtime(os.fstat(origen.fileno()).st_mtime)
+            info = zipfile.ZipInfo(nombre, modificado[:6])
+            with origen, paquete.open(info, "w") as destino:
+                while bloque := origen.read(TAMANO_BLOQUE):
+                    destino.write(bloque)
+                    yield salida.recoger()
+
+            escritor.writerow((nombre, *datos))
+
+        paquete.writestr("manifiesto.csv", manifiesto.getvalue())
+
+    yield salida.recoger()
+
+
+def escribir_volumenes(
+    participantes, destino: Path, por_volumen: int
+) -> list[tuple[Path, bool]]:
+    """
+    Escribe los CV en volúmenes ZIP de `por_volumen` CV (`destino-001.zip`, ...).
+    Cada volumen se escribe en un archivo `.part` que se renombra al terminar, y los
+    volúmenes ya terminados no se vuelven a generar: si la generación se interrumpe,
+    basta con repetirla mientras no cambien los participantes.
+
+    Salida:
+        Lista de volúmenes con su ruta y si ya existía.
+    """
+    correos = list(participantes.values_list("correo", flat=True))
+    volumenes = []
+
+    for numero, lote in enumerate(batched(correos, por_volumen), start=1):
+        ruta = destino.with_name(f"{destino.stem}-{numero:03d}{destino.suffix}")
+        if ruta.exists():
+            volumenes.append((ruta, True))
+            continue
+
+        parcial = ruta.with_name(ruta.name + ".part")
+        with open(parcial, "wb") as archivo:
+            primero = (numero - 1) * por_volumen + 1
+            for bloque in zip_cvs(participantes.filter(correo__in=lote), primero):
+                archivo.write(bloque)
+        os.replace(parcial, ruta)
+        volumenes.append((ruta, False))
+
+    return volumenes
@@ -0,0 +1,216 @@
+# Copyright (C) 2025-now  p.fernandezf <p@fernandezf.es> & iago.rivas <delthia@delthia.com>
+
+import asyncio, json, logging, threading
+from collections import deque
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max
+
+from gestion.models import Evento, Persona, Presencia
+from gestion.panel import pases
+
+logger = logging.getLogger(__name__)
+
+# Lecturas de acreditaciones en directo (Server-Sent Events) para las pantallas de la
+# organización. Cada proceso tiene un `Canal` en memoria con una cola por conexión:
+# - Las vistas de las lecturas publican su Evento al confirmarse la transacción
+#   (`gestion.eventos.registrar`), que llega al momento a las conexiones del proceso.
+# - Mientras hay conexiones, una tarea del proceso consulta cada `DIRECTO_INTERVALO`
+#   los Eventos nuevos de la base de datos para recibir también los de otros procesos
+#   (los de gunicorn que atienden las lecturas). Es una consulta por proceso, no por
+#   pantalla conectada.
+# Las conexiones abiertas solo se mantienen con ASGI (`hackackathon.asgi`), en el que
+# cada una es una corrutina; con WSGI la vista responde con lo pendiente y el navegador
+# vuelve a conectarse pasados `DIRECTO_REINTENTO` milisegundos.
+
+TIPOS = ("ACREDITACION", "PASE", "ENTRADA", "SALIDA")
+
+CAMPOS = (
+    "id_evento",
+    "tipo",
+    "fecha",
+    "usuario",
+    "detalle",
+    "persona__nombre",
+    "persona__acreditacion",
+)
+
+
+def serializar(fila: dict) -> dict:
+    return {
+        "id": fila["id_evento"],
+        "tipo": fila["tipo"],
+        "fecha": fila["fecha"].isoformat(),
+        "puesto": fila["usuario"],
+        "detalle": fila["detalle"],
+        "nombre": fila["persona__nombre"],
+        "acreditacion": fila["persona__acreditacion"],
+    }
+
+
+def mensaje(datos: dict) -> str:
+    """Evento en el formato de Server-Sent Events."""
+    return f"id: {datos['id']}\ndata: {json.dumps(datos, ensure_ascii=False)}\n\n"
+
+
+def eventos_desde(ultimo_id: int) -> list[dict]:
+    """Eventos en directo posteriores a `ultimo_id`, como mucho `DIRECTO_REPETIR`."""
+    return [
+        serializar(fila)
+        for fila in Evento.objects.filter(id_evento__gt=ultimo_id, tipo__in=TIPOS)
+        .order_by("id_evento")
+        .values(*CAMPOS)[: settings.DIRECTO_REPETIR]
+    ]
+
+
+def ultimo_evento() -> int:
+    return Evento.objects.aggregate(ultimo=Max("id_evento"))["ultimo"] or 0
+
+
+def estado() -> dict:
+    """Recuentos de partida de la pantalla y el último Evento incluido en ellos."""
+    with transaction.atomic():
+        return {
+            "ultimo": ultimo_evento(),
+            "dentro": Presencia.objects.filter(
+                entrada__isnull=False, salida__isnull=True
+            ).count(),
+            "acreditadas": Persona.objects.filter(acreditacion__isnull=False).count(),
+            "pases": pases(),
+        }
+
+
+class Suscripcion:
+    """Cola de una conexión, en el bucle de eventos de la conexión."""
+
+    def __init__(self, bucle: asyncio.AbstractEventLoop):
+        self.bucle = bucle
+        self.cola = asyncio.Queue(settings.DIRECTO_COLA)
+
+    def entregar(self, datos: dict):
+        # Se puede llamar desde cualquier hilo
+        try:
+            self.bucle.call_soon_threadsafe(self._encolar, datos)
+        except RuntimeError:
+            pass  # Bucle cerrado
+
+    def _encolar(self, datos: dict):
+        # Una pantalla que no lee a tiempo pierde los más antiguos
+        if self.cola.full():
+            self.cola.get_nowait()
+        self.cola.put_nowait(datos)
+
+
+class Canal:
+    """Publicación y suscripción en memoria del proceso."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._suscripciones: set[Suscripcion] = set()
+        # Identificadores ya publicados, para no repetirlos desde la base de datos
+        self._publicados = deque(maxlen=1000)
+        self._ids = set()
+        self._seguimiento: asyncio.Task | None = None
+
+    def publicar(self, datos: dict):
+        with self._lock:
+            if datos["id"] in self._ids:
+                return
+            if len(self._publicados) == self._publicados.maxlen:
+                self._ids.discard(self._publicados[0])
+            self._publicados.append(datos["id"])
+            self._ids.add(datos["id"])
+            suscripciones = list(self._suscripciones)
+
+        for suscripcion in suscripciones:
+            suscripcion.entregar(datos)
+
+    def suscribir(self) -> Suscripcion:
+        """Nueva suscripción. Se llama desde el bucle de eventos de la conexión."""
+        bucle = asyncio.get_running_loop()
+        suscripcion = Suscripcion(bucle)
+        with self._lock:
+            self._suscripciones.add(suscripcion)
+            if self._seguimiento is None or self._seguimiento.done():
+                self._seguimiento = bucle.create_task(self._seguir())
+        return suscripcion
+
+    def cancelar(self, suscripcion: Suscripcion):
+        with self._lock:
+            self._suscripciones.discard(suscripcion)
+
+    async def _seguir(self):
+        """Publica los Eventos de otros procesos mientras haya suscripciones."""
+        ultimo = await sync_to_async(ultimo_evento)()
+        while self._suscripciones:
+            await asyncio.sleep(settings.DIRECTO_INTERVALO)
+            try:
+                nuevos = await sync_to_async(eventos_desde)(ultimo)
+            except Exception:
+                logger.exception("Error al consultar los eventos en directo")
+                continue
+            for datos in nuevos:
+                self.publicar(datos)
+                ultimo = datos["id"]
+
+
+canal = Canal()
+
+
+def publicar(evento: Evento, persona: Persona | None = None):
+    """Publica en el proceso un Evento de `TIPOS` cuando se confirma la transacción."""
+    datos = serializar(
+        {
+            "id_evento": evento.id_evento,
+            "tipo": evento.tipo,
+            "fecha": evento.fecha,
+            "usuario": evento.usuario,
+            "detalle": evento.detalle,
+            "persona__nombre": getattr(persona, "nombre", None),
+            "persona__acreditacion": getattr(persona, "acreditacion", None),
+        }
+    )
+    transaction.on_commit(lambda: canal.publicar(datos))
+
+
+async def flujo(ultimo_id: int | None):
+    """
+    Mensajes de una conexión: los Eventos posteriores a `ultimo_id` (p. ej. los de la
+    cabecera Last-Event-ID al reconectar) y después los nuevos según se publican. Un
+    comentario cada `DIRECTO_LATIDO` segundos mantiene abierta la conexión en nginx.
+    """
+    # Antes de consultar los pendientes, para no perder los publicados entre medias
+    suscripcion = canal.suscribir()
+    try:
+        if ultimo_id is None:
+            ultimo_id = await sync_to_async(ultimo_evento)()
+        yield f"retry: {settings.DIRECTO_REINTENTO}\nid: {ultimo_id}\n\n"
+
+        enviados = set()
+        for datos in await sync_to_async(eventos_desde)(ultimo_id):
+            enviados.add(datos["id"])
+            yield mensaje(datos)
+
+        while True:
+            try:
+                datos = await asyncio.wait_for(
+                    suscripcion.cola.get(), settings.DIRECTO_LATIDO
+                )
+            except TimeoutError:
+                yield ": latido\n\n"
+                continue
+            if datos["id"] not in enviados:
+                yield mensaje(datos)
+    finally:
+        canal.cancelar(suscripcion)
+
+
+def pendientes(ultimo_id: int | None) -> str:
+    """Respuesta sin conexión abierta (WSGI): los Eventos posteriores a `ultimo_id`."""
+    if ultimo_id is None:
+        ultimo_id = ultimo_evento()
+    mensajes = [f"retry: {settings.DIRECTO_REINTENTO}\nid: {ultimo_id}\n\n"]
+    mensajes += [mensaje(datos) for datos in eventos_desde(ultimo_id)]
+    return "".join(mensajes)
@@ -0,0 +1,247 @@
+# Copyright (C) 2025-now  p.fernandezf <p@fernandezf.es> & iago.rivas <delthia@delthia.com>
+
+import logging, re
+from collections import defaultdict
+from difflib import SequenceMatcher
+from itertools import combinations
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Max
+
+from gestion.models import Persona
+from gestion.normalizacion import clave_normalizada
+
+logger = logging.getLogger(__name__)
+
+MOTIVOS = (
+    ("DNI", "Mismo DNI"),
+    ("NOMBRE_FECHA", "Mismo nombre y fecha de nacimiento"),
+    ("CORREO", "Correo parecido y nombre o DNI parecido"),
+)
+
+# Bloques mayores que este tamaño se comparan solo con sus vecinos ordenados
+MAXIMO_BLOQUE = 50
+VENTANA_VECINOS = 8
+
+# Un correo parecido solo cuenta si además el nombre (clave fonética) es al menos así
+# de parecido o el DNI difiere en como mucho una errata
+SIMILITUD_NOMBRE = 0.85
+
+# Reglas aproximadas de pronunciación en español, aplicadas en orden
+_REGLAS_FONETICAS = (
+    (re.compile(r"ch"), "x"),
+    (re.compile(r"ll"), "y"),
+    (re.compile(r"qu"), "k"),
+    (re.compile(r"c([ei])"), r"s\1"),
+    (re.compile(r"g([ei])"), r"j\1"),
+    (re.compile(r"gu([ei])"), r"g\1"),
+    (re.compile(r"h"), ""),
+    (re.compile(r"c"), "k"),
+    (re.compile(r"[vw]"), "b"),
+    (re.compile(r"z"), "s"),
+    (re.compile(r"(.)\1+"), r"\1"),
+)
+
+
+def normalizar_dni(dni: str) -> str:
+    return re.sub(r"[^0-9A-Z]", "", dni.upper())
+
+
+def clave_fonetica(nombre: str) -> str:
+    """
+    Clave que coincide para nombres que se pronuncian igual, independientemente
+    del orden de los apellidos ("Ana Vázquez" y "Bazquez, Ana").
+    """
+    palabras = []
+    for palabra in clave_normalizada(nombre).split():
+        for patron, sustitucion in _REGLAS_FONETICAS:
+            palabra = patron.sub(sustitucion, palabra)
+        if palabra:
+            palabras.append(palabra)
+    return " ".join(sorted(palabras))
+
+
+def normalizar_correo(correo: str) -> tuple[str, str]:
+    """Parte local (sin puntos ni sufijo `+etiqueta`) y dominio de un correo."""
+    local, _, dominio = correo.lower().rpartition("@")
+    local = local.split("+", 1)[0].replace(".", "")
+    return local, dominio
+
+
+def erratas_correo(longitud: int) -> int:
+    """
+    Erratas admitidas entre las partes locales de dos correos según la longitud de la
+    menor: en las cortas una errata ya da otro correo plausible de otra persona.
+    """
+    if longitud < 6:
+        return 0
+    return 1 if longitud < 12 else 2
+
+
+def distancia_edicion(a: str, b: str, maximo: int) -> int:
+    """
+    Distancia de edición (inserciones, borrados, sustituciones y transposiciones de
+    caracteres contiguos) entre `a` y `b`, o `maximo + 1` si es mayor que `maximo`.
+    """
+    tope = maximo + 1
+    if abs(len(a) - len(b)) > maximo:
+        return tope
+    if a == b:
+        return 0
+
+    penultima, anterior = None, [min(j, tope) for j in range(len(b) + 1)]
+    for i in range(1, len(a) + 1):
+        actual = [tope] * (len(b) + 1)
+        if i <= maximo:
+            actual[0] = i
+        # Solo la franja de la diagonal: fuera de ella la distancia ya supera `maximo`
+        for j in range(max(1, i - maximo), min(len(b), i + maximo) + 1):
+            valor = anterior[j - 1] + (a[i - 1] != b[j - 1])
+            if anterior[j] + 1 < valor:
+                valor = anterior[j] + 1
+            if actual[j - 1] + 1 < valor:
+                valor = actual[j - 1] + 1
+            if (
+                i > 1
+                and j > 1
+                and a[i - 1] == b[j - 2]
+                and a[i - 2] == b[j - 1]
+                and penultima[j - 2] + 1 < valor
+            ):
+                valor = penultima[j - 2] + 1
+            actual[j] = valor
+        if min(actual) > maximo:
+            return tope
+        penultima, anterior = anterior, actual
+    return min(anterior[-1], tope)
+
+
+def nombres_parecidos(a: str, b: str) -> bool:
+    comparacion = SequenceMatcher(None, a, b)
+    # Las cotas superiores rápidas descartan la mayoría sin calcular `ratio`
+    return (
+        comparacion.real_quick_ratio() >= SIMILITUD_NOMBRE
+        and comparacion.quick_ratio() >= SIMILITUD_NOMBRE
+        and comparacion.ratio() >= SIMILITUD_NOMBRE
+    )
+
+
+def _pares_bloque(miembros: list[int], orden) -> list[tuple[int, int]]:
+    if len(miembros) <= MAXIMO_BLOQUE:
+        return list(combinations(miembros, 2))
+
+    # Vecindad ordenada: en bloques grandes solo se comparan los cercanos
+    miembros = sorted(miembros, key=orden)
+    return [
+        (miembros[i], miembros[j])
+        for i in range(len(miembros))
+        for j in range(i + 1, min(i + 1 + VENTANA_VECINOS, len(miembros)))
+    ]
+
+
+def buscar_duplicados() -> list[dict]:
+    """
+    Busca pares de Personas (Participantes y Mentores) que probablemente
+    sean la misma persona registrada varias veces.
+
+    En lugar de comparar todos los pares, cada Persona se indexa por claves
+    de bloqueo (DNI normalizado, nombre fonético con fecha de nacimiento y
+    fragmentos de la parte local del correo) y solo se comparan las Personas
+    que comparten alguna clave. Un correo parecido solo se considera duplicado
+    si también se parece el nombre o el DNI.
+
+    Salida:
+        Lista de pares, cada uno un diccionario con `correos` (tupla ordenada)
+        y `motivos` (conjunto de claves de `MOTIVOS`).
+    """
+    personas = list(
+        Persona.objects.order_by().values_list(
+            "correo",
+            "nombre",
+            "dni",
+            "participante__fecha_nacimiento",
+            "mentor__fecha_nacimiento",
+        )
+    )
+
+    bloques = defaultdict(list)
+    correos, nombres, dnis = [], [], []
+    for i, (correo, nombre, dni, nacimiento_p, nacimiento_m) in enumerate(personas):
+        dni_normalizado = normalizar_dni(dni)
+        dnis.append(dni_normalizado)
+        if dni_normalizado:
+            bloques[("DNI", dni_normalizado)].append(i)
+
+        nombres.append(clave_fonetica(nombre))
+        nacimiento = nacimiento_p or nacimiento_m
+        if nacimiento:
+            bloques[("NOMBRE_FECHA", nombres[i], nacimiento)].append(i)
+
+        local, _dominio = normalizar_correo(correo)
+        correos.append(local)
+        # Prefijo y sufijo: una errata no puede estar a la vez en ambos extremos
+        bloques[("CORREO", "^" + local[:4])].append(i)
+        bloques[("CORREO", local[-4:] + "$")].append(i)
+
+    pares = defaultdict(set)
+    for clave, miembros in bloques.items():
+        if len(miembros) < 2:
+            continue
+
+        motivo = clave[0]
+        if motivo != "CORREO":
+            for i, j in _pares_bloque(miembros, lambda k: personas[k][0]):
+                pares[(i, j) if i < j else (j, i)].add(motivo)
+            continue
+
+        for i, j in _pares_bloque(miembros, lambda k: correos[k]):
+            par = (i, j) if i < j else (j, i)
+            if par in pares and motivo in pares[par]:
+                continue
+            # Solo la parte local: el dominio suele ser el mismo (gmail.com) y haría
+            # parecer parecidos correos distintos
+            maximo = erratas_correo(min(len(correos[i]), len(correos[j])))
+            if distancia_edicion(correos[i], correos[j], maximo) > maximo:
+                continue
+            # El correo por sí solo no basta (persona99@ y persona997@ se parecen)
+            if (
+                dnis[i]
+                and dnis[j]
+                and distancia_edicion(dnis[i], dnis[j], 1) <= 1
+                or nombres_parecidos(nombres[i], nombres[j])
+            ):
+                pares[par].add(motivo)
+
+    resultado = [
+        {
+            "correos": tuple(sorted((personas[i][0], personas[j][0]))),
+            "motivos": motivos,
+        }
+        for (i, j), motivos in pares.items()
+    ]
+    resultado.sort(key=lambda par: (-len(par["motivos"]), par["correos"]))
+
+    logger.debug(
+        f"Búsqueda de duplicados: {len(resultado)} pares entre {len(personas)} personas"
+    )
+    return resultado
+
+
+def correos_duplicados() -> set[str]:
+    """
+    Correos de las Personas con algún posible duplicado. Se cachea hasta que cambian
+    las Personas registradas (en cualquier proceso) o expira `DUPLICADOS_CACHE_TTL`.
+    """
+    # La caché es local a cada proceso de gunicorn: la versión en la clave la consulta
+    # cada proceso en la base de datos, así que un registro nuevo se tiene en cuenta en todos
+    version = Persona.objects.order_by().aggregate(
+        personas=Count("pk"), ultima=Max("fecha_registro")
+    )
+    ultima = version["ultima"].timestamp() if version["ultima"] else 0
+    clave = f"duplicados:correos:{version['personas']}:{ultima}"
+    correos = cache.get(clave)
+    if correos is None:
+        correos = {correo for par in buscar_duplicados() for correo in par["correos"]}
+        cache.set(clave, correos, settings.DUPLICADOS_CACHE_TTL)
+    return correos
@@ -0,0 +1,123 @@
+# Copyright (C) 2025-now  p.fernandezf <p@fernandezf.es> & iago.rivas <delthia@delthia.com>
+
+from datetime import date, datetime
+
+from django.conf import settings
+from django.db.models import Count, Max, Min
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from gestion import directo
+from gestion.models import Evento, Persona
+
+# Historial de los cambios de estado de las Personas (`Evento`): una fila por
+# transición, insertada en la misma transacción que el cambio. Las acciones sobre
+# muchas personas (aceptar, normalizar) insertan todas sus filas de una vez. El
+# último Evento es la versión de los datos cacheados del panel de gestión
+# (`gestion.panel`) y los de las lecturas de acreditaciones se publican en directo
+# (`gestion.directo`).
+
+
+def registrar(
+    persona: Persona | str,
+    tipo: str,
+    usuario: str = "",
+    detalle: str = "",
+    fecha: datetime | None = None,
+) -> Evento:
+    """
+    Añade un Evento de la Persona (o su correo).
+
+    Argumentos:
+        persona: `Persona` o correo.
+        tipo: Uno de `TIPOS_EVENTO`.
+        usuario: Usuario de gestión que hizo el cambio (Opcional).
+        detalle: Acreditación, tipo de pase, normalización... (Opcional).
+        fecha: Fecha del cambio (Opcional, por defecto ahora).
+    """
+    evento = Evento.objects.create(
+        persona_id=getattr(persona, "pk", persona),
+        tipo=tipo,
+        usuario=usuario,
+        detalle=detalle[:128],
+        fecha=fecha or timezone.now(),
+    )
+    if tipo in directo.TIPOS:
+        directo.publicar(evento, persona if isinstance(persona, Persona) else None)
+    return evento
+
+
+def registrar_lote(
+    correos,
+    tipo: str,
+    usuario: str = "",
+    detalle: str = "",
+    fecha: datetime | None = None,
+) -> int:
+    """
+    Añade el mismo Evento a cada una de las Personas indicadas por correo, en
+    inserciones de `EVENTOS_TAMANO_LOTE` filas.
+
+    Salida:
+        Número de Eventos añadidos.
+    """
+    fecha = fecha or timezone.now()
+    eventos = Evento.objects.bulk_create(
+        (
+            Evento(
+                persona_id=correo,
+                tipo=tipo,
+                usuario=usuario,
+                detalle=detalle[:128],
+                fecha=fecha,
+            )
+            for correo in correos
+        ),
+        batch_size=settings.EVENTOS_TAMANO_LOTE,
+    )
+    return len(eventos)
+
+
+def linea_temporal(correo: str) -> list[dict]:
+    """Eventos de una Persona, del más antiguo al más reciente."""
+    return list(
+        Evento.objects.filter(persona_id=correo)
+        .order_by("fecha", "id_evento")
+        .values("tipo", "fecha", "usuario", "detalle")
+    )
+
+
+def resumen(desde: datetime | None = None, hasta: datetime | None = None) -> dict:
+    """
+    Eventos de todas las Personas entre `desde` y `hasta` (Opcionales): el total, las
+    personas distintas, el primero y el último de cada tipo, y el número por día.
+
+    Salida:
+        {"tipos": {tipo: {...}}, "por_dia": {fecha: {tipo: n}}}
+    """
+    eventos = Evento.objects.order_by()
+    if desde:
+        eventos = eventos.filter(fecha__gte=desde)
+    if hasta:
+        eventos = eventos.filter(fecha__lt=hasta)
+
+    tipos = {
+        fila.pop("tipo"): fila
+        for fila in eventos.values("tipo").annotate(
+            total=Count("pk"),
+            personas=Count("persona", distinct=True),
+            primero=Min("fecha"),
+            ultimo=Max("fecha"),
+        )
+    }
+
+    por_dia: dict[date, dict[str, int]] = {}
+    for fila in (
+        eventos.annotate(dia=TruncDate("fecha"))
+        .values("dia", "tipo")
+        .annotate(total=Count("pk"))
+        .order_by("dia")
+    ):
+        por_dia.setdefault(fila["dia"], {})[fila["tipo"]] = fila["total"]
+
+    return {"tipos": tipos, "por_dia": por_dia}
@@ -0,0 +1,279 @@
+# Copyright (C) 2025-now  p.fernandezf <p@fernandezf.es> & iago.rivas <delthia@delthia.com>
+
+import atexit, contextvars, fcntl, json, logging, os, queue, tempfile, time, uuid
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from pathlib import Path
+
+from django.core.signals import request_finished
+from django.dispatch import receiver
+
+# Logs sin escrituras en los hilos de las peticiones: el logger raíz solo tiene un
+# `ColaHandler` que encola cada registro, y un `QueueListener` por proceso (iniciado en
+# `GestionConfig.ready`) lo escribe en los archivos de cada nivel como una línea JSON
+# con el identificador de la petición y el correo de la persona, si lo hay.
+
+# Identificador de la petición en curso (`ContextoLogsMiddleware`)
+id_peticion = contextvars.ContextVar("id_peticion", default=None)
+
+
+class ColaHandler(QueueHandler):
+    """
+    Prepara el registro en el hilo que lo emite: el mensaje con sus argumentos, la
+    excepción como texto y el contexto de la petición, que el listener no conoce.
+    """
+
+    formato_excepciones = logging.Formatter()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Sin copia: el logger raíz es el último en recibir el registro
+        record.message = record.getMessage()
+        record.msg, record.args = record.message, None
+        if record.exc_info:
+            record.exc_text = self.formato_excepciones.formatException(record.exc_info)
+            record.exc_info = None
+        if getattr(record, "request_id", None) is None:
+            record.request_id = id_peticion.get()
+        if not hasattr(record, "correo"):
+            record.correo = None
+        # La petición de los logs de Django no se puede serializar ni hace falta
+        record.__dict__.pop("request", None)
+        return record
+
+
+class FormatoJSON(logging.Formatter):
+    """Una línea JSON por registro."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        datos = {
+            "fecha": datetime.fromtimestamp(record.created).isoformat(
+                timespec="milliseconds"
+            ),
+            "nivel": record.levelname,
+            "logger": record.name,
+            "linea": record.lineno,
+            "mensaje": record.getMessage(),
+            "request_id": getattr(record, "request_id", None),
+            "correo": getattr(record, "correo", None),
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            datos["excepcion"] = record.exc_text
+        if record.stack_info:
+            datos["pila"] = record.stack_info
+        return json.dumps(datos, ensure_ascii=False, default=str)
+
+
+class ArchivoRotativo(RotatingFileHandler):
+    """
+    `RotatingFileHandler` para un archivo que comparten los procesos de gunicorn: si
+    otro proceso lo ha rotado, se vuelve a abrir antes de escribir. La rotación se hace
+    con un bloqueo del directorio de los logs, y el proceso que lo obtiene comprueba
+    otra vez si hay que rotar: solo uno rota el archivo aunque varios lleguen a la vez
+    al tamaño máximo, sin descartar antes de tiempo las copias de `backupCount`.
+    """
+
+    def _reabrir_si_rotado(self):
+        if self.stream is None:
+            return
+        try:
+            rotado = (
+                os.stat(self.baseFilename).st_ino
+                != os.fstat(self.stream.fileno()).st_ino
+            )
+        except FileNotFoundError:
+            rotado = True
+        if rotado:
+            self.stream.close()
+            self.stream = None  # `emit` lo abre de nuevo
+
+    def emit(self, record: logging.LogRecord):
+        try:
+            self._reabrir_si_rotado()
+            if self.shouldRollover(record):
+                directorio = os.open(os.path.dirname(self.baseFilename), os.O_RDONLY)
+                try:
+                    fcntl.flock(directorio, fcntl.LOCK_EX)
+                    # Otro proceso pudo rotarlo mientras se esperaba el bloqueo
+                    self._reabrir_si_rotado()
+                    if self.shouldRollover(record):
+                        self.doRollover()
+                finally:
+                    os.close(directorio)  # También libera el bloqueo
+            logging.FileHandler.emit(self, record)
+        except Exception:
+            self.handleError(record)
+
+
+_iniciados = set()
+
+
+def iniciar():
+    """Inicia los listeners de los `QueueHandler` configurados en LOGGING, una vez por proceso."""
+    for handler in logging.getLogger().handlers:
+        listener = getattr(handler, "listener", None)
+        if listener is None or listener in _iniciados:
+            continue
+        _iniciados.add(listener)
+        listener.start()
+        # Escribir lo que quede en la cola al terminar el proceso
+        atexit.register(listener.stop)
+
+
+class ContextoLogsMiddleware:
+    """
+    Identificador de cada petición para sus logs: el de la cabecera X-Request-ID (p. ej.
+    de nginx) o uno nuevo. Se devuelve en la misma cabecera.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        identificador = request.headers.get("X-Request-ID", "")[:64] or uuid.uuid4().hex
+        # Se mantiene hasta `request_finished`, para los logs de Django sobre la
+        # respuesta (p. ej. "Not Found"), que se escriben fuera de los middlewares
+        id_peticion.set(identificador)
+        respuesta = self.get_response(request)
+        respuesta["X-Request-ID"] = identificador
+        return respuesta
+
+
+@receiver(request_finished)
+def fin_peticion(sender, **kwargs):
+    id_peticion.set(None)
+
+
+# Medición del coste de los logs por petición (comando `prueba_logs`)
+
+NIVELES_ARCHIVOS = {
+    "debug": logging.DEBUG,
+    "info": logging.INFO,
+    "warning": logging.WARNING,
+    "error": logging.ERROR,
+}
+
+
+def _loggers_sincronos(directorio: Path) -> tuple[logging.Logger, list]:
+    """
+    Configuración anterior: cuatro FileHandler en el logger raíz y otro más de debug en
+    `gestion`, todos escritos en el hilo que emite el registro.
+    """
+    formato = logging.Formatter(
+        "[%(asctime)s] %(levelname)s [%(name)s:%(lineno)s] %(message)s",
+        "%Y-%m-%d %H:%M:%S",
+    )
+    raiz = logging.Logger("raiz")
+    handlers = []
+    for nombre, nivel in NIVELES_ARCHIVOS.items():
+        handler = logging.FileHandler(directorio / f"{nombre}.log")
+        handler.setLevel(nivel)
+        handler.setFormatter(formato)
+        raiz.addHandler(handler)
+        handlers.append(handler)
+    gestion = logging.Logger("gestion")
+    gestion.parent = raiz
+    extra = logging.FileHandler(directorio / "debug.log")
+    extra.setFormatter(formato)
+    gestion.addHandler(extra)
+    handlers.append(extra)
+    return gestion, handlers
+
+
+def _loggers_cola(directorio: Path, tamano: int, copias: int):
+    cola = queue.Queue()
+    handlers = []
+    for nombre, nivel in NIVELES_ARCHIVOS.items():
+        handler = ArchivoRotativo(
+            directorio / f"{nombre}.log", maxBytes=tamano, backupCount=copias
+        )
+        handler.setLevel(nivel)
+        handler.setFormatter(FormatoJSON())
+        handlers.append(handler)
+    listener = QueueListener(cola, *handlers, respect_handler_level=True)
+    gestion = logging.Logger("gestion")
+    gestion.addHandler(ColaHandler(cola))
+    return gestion, handlers, listener
+
+
+def _peticiones(
+    logger: logging.Logger, peticiones: int, registros: int, espera: float
+) -> float:
+    """
+    Segundos por petición emitiendo `registros` logs de debug e info, como una vista,
+    cada uno después de esperar `espera` segundos (una consulta, que libera el GIL).
+    """
+    inicio = time.perf_counter()
+    for i in range(peticiones):
+        token = id_peticion.set(uuid.uuid4().hex)
+        for j in range(registros):
+            time.sleep(espera)
+            if j % 2:
+                logger.info(
+                    "Correo de verificación enviado", extra={"correo": f"p{i}@b.es"}
+                )
+            else:
+                logger.debug(f"Token inválido '{i}-{j}'")
+        id_peticion.reset(token)
+    return (time.perf_counter() - inicio) / peticiones
+
+
+def medir(
+    peticiones: int = 2000,
+    registros: int = 4,
+    nivel: int = logging.DEBUG,
+    espera: float = 0.0002,
+    tamano: int = 10 * 1024**2,
+    copias: int = 2,
+) -> dict:
+    """
+    Coste de los logs de cada petición en el hilo de la petición con la configuración
+    anterior (archivos síncronos) y con la cola, escribiendo en un directorio temporal.
+    Se resta el tiempo de las mismas peticiones sin logs.
+
+    Salida:
+        Microsegundos por petición de cada configuración y lo que tarda el listener en
+        vaciar la cola después.
+    """
+    sin_logs = logging.Logger("gestion", logging.CRITICAL + 1)
+    base = _peticiones(sin_logs, peticiones, registros, espera)
+
+    with tempfile.TemporaryDirectory() as temporal:
+        directorio = Path(temporal)
+
+        (directorio / "sincrono").mkdir()
+        logger, handlers = _loggers_sincronos(directorio / "sincrono")
+        logger.parent.setLevel(nivel)
+        sincrono = _peticiones(logger, peticiones, registros, espera) - base
+        for handler in handlers:
+            handler.close()
+
+        (directorio / "cola").mkdir()
+        logger, handlers, listener = _loggers_cola(directorio / "cola", tamano, copias)
+        logger.setLevel(nivel)
+        listener.start()
+        cola = _peticiones(logger, peticiones, registros, espera) - base
+        inicio = time.perf_counter()
+        listener.stop()
+        vaciado = time.perf_counter() - inicio
+        for handler in handlers:
+            handler.close()
+
+        lineas = {
+            nombre: sum(
+                len(ruta.read_text().splitlines())
+                for ruta in (directorio / nombre).glob("debug.log*")
+            )
+            for nombre in ("sincrono", "cola")
+        }
+
+    return {
+        "peticiones": peticiones,
+        "registros": registros,
+        "base_us": base * 1e6,
+        "sincrono_us": sincrono * 1e6,
+        "cola_us": cola * 1e6,
+        "vaciado_ms": vaciado * 1000,
+        "lineas_debug": lineas,
+    }
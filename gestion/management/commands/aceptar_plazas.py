@@ -0,0 +1,107 @@
+# Copyright (C) 2025-now  p.fernandezf <p@fernandezf.es> & iago.rivas <delthia@delthia.com>
+
+import logging, time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from gestion.seleccion import CAMPOS_SELECCION, aplicar_seleccion, seleccionar
+
+logger = logging.getLogger(__name__)
+
+
+def parsear_cuota(valor: str) -> tuple[str, str, int]:
+    """Convierte "campo=valor:maximo" en una tupla."""
+    try:
+        campo, resto = valor.split("=", 1)
+        valor_campo, maximo = resto.rsplit(":", 1)
+        return campo, valor_campo, int(maximo)
+    except ValueError:
+        raise CommandError(f"Cuota inválida '{valor}'. Formato: campo=valor:maximo")
+
+
+class Command(BaseCommand):
+    help = "Acepta a los candidatos verificados hasta completar las plazas respetando las cuotas."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "-p",
+            "--plazas",
+            help="Plazas totales del evento. (default=PLAZAS_EVENTO)",
+            type=int,
+            default=settings.PLAZAS_EVENTO,
+        )
+        parser.add_argument(
+            "-c",
+            "--cuota",
+            help=f"Máximo de plazas para un valor de un campo, como 'tipo=mentor:20'. Se puede repetir. Campos: {', '.join(CAMPOS_SELECCION)}. (default=CUOTAS_SELECCION)",
+            action="append",
+            default=None,
+        )
+        parser.add_argument(
+            "-o",
+            "--orden",
+            help="Criterio de ordenación de los candidatos ('-' para descendente). Se puede repetir. (default=CRITERIOS_SELECCION)",
+            action="append",
+            default=None,
+        )
+        parser.add_argument(
+            "--dry-run",
+            help="Mostrar el resultado sin aceptar a nadie.",
+            action="store_true",
+            default=False,
+        )
+        parser.add_argument(
+            "--no-input",
+            help="No pedir confirmación antes de aceptar.",
+            action="store_true",
+            default=False,
+        )
+
+    def handle(self, *args, **options):
+        plazas = options.get("plazas")
+        if plazas is None:
+            raise CommandError("Indica las plazas con --plazas o con PLAZAS_EVENTO.")
+
+        cuotas = None
+        if options.get("cuota"):
+            cuotas = {}
+            for campo, valor, maximo in map(parsear_cuota, options["cuota"]):
+                cuotas.setdefault(campo, {})[valor] = maximo
+
+        inicio = time.perf_counter()
+        try:
+            resultado = seleccionar(plazas, cuotas, options.get("orden"))
+        except ValueError as e:
+            raise CommandError(e)
+        duracion = time.perf_counter() - inicio
+
+        self.stdout.write(
+            self.style.HTTP_INFO(
+                f"Plazas: {plazas}. Ocupadas: {resultado['ocupadas']}. "
+                f"A aceptar: {len(resultado['aceptados'])}. En espera: {len(resultado['en_espera'])}. "
+                f"({duracion:.3f}s)"
+            )
+        )
+        for (campo, valor), descartados in resultado["descartados_cuota"].items():
+            self.stdout.write(
+                self.style.WARNING(
+                    f"Cuota {campo}={valor} completa: {descartados} candidatos en espera"
+                )
+            )
+        for campo, valores in resultado["recuento"].items():
+            recuento = ", ".join(
+                f"{valor}: {n}" for valor, n in sorted(valores.items())
+            )
+            self.stdout.write(f"Plazas por {campo} tras la selección: {recuento}")
+
+        if options.get("dry_run") or not resultado["aceptados"]:
+            return
+
+        if not options.get("no_input"):
+            c = input("¿Continuar? [S/n] ")
+            if c.lower() != "s" and c != "":
+                return
+
+        aceptados = aplicar_seleccion(resultado["aceptados"])
+        self.stdout.write(self.style.SUCCESS(f"{len(aceptados)} personas aceptadas."))
@@ -1,11 +1,20 @@
 # Copyright (C) 2025-now  p.fernandezf <p@fernandezf.es> & iago.rivas <delthia@delthia.com>
 
 import logging
+from uuid import uuid4
 
 from django.core.management import BaseCommand, CommandError
 from django.core.validators import validate_email
 
-from gestion.models import Mentor, Participante, Persona, Token, RestriccionAlimentaria
+from gestion.models import (
+    CambioNormalizacion,
+    CorreoPendiente,
+    Evento,
+    Mentor,
+    Participante,
+    Persona,
+    Token,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -35,11 +44,15 @@ class Command(BaseCommand):
         if not subclase:
             raise CommandError("La persona no es ni participante ni mentor.")
 
-        # Actualizar correo de la persona y el participante/mentor
+        # Actualizar correo de la persona y el participante/mentor.
+        # La referencia de los enlaces firmados se recupera al eliminar la persona antigua
+        referencia = persona.referencia
         persona.correo = nuevo
         persona.dni += " "
+        persona.referencia = uuid4()
         subclase.correo = nuevo
         subclase.dni += " "
+        subclase.referencia = persona.referencia
         persona.save()
         subclase.save()
 
@@ -49,14 +62,32 @@ class Command(BaseCommand):
         )
 
         # Actualizar restricciones alimentarias asociadas
-        RestriccionAlimentaria.objects.filter(persona=Persona.objects.get(correo=original)).update(persona=persona)
+        persona.restricciones_alimentarias.set(
+            Persona.objects.get(correo=original).restricciones_alimentarias.all()
+        )
+
+        # Mantener el historial de eventos
+        Evento.objects.filter(persona=Persona.objects.get(correo=original)).update(
+            persona=persona
+        )
+
+        # Correos encolados que aún no se han enviado
+        CorreoPendiente.objects.filter(
+            persona=Persona.objects.get(correo=original)
+        ).update(persona=persona)
+
+        # Mantener los valores anteriores de las normalizaciones, para poder deshacerlas
+        CambioNormalizacion.objects.filter(participante_id=original).update(
+            participante_id=nuevo
+        )
 
         # Eliminar la persona antigua
         Persona.objects.get(correo=original).delete()
 
-        # Corregir los DNIs
+        # Corregir los DNIs y la referencia
         persona.dni = persona.dni.strip()
         subclase.dni = subclase.dni.strip()
+        persona.referencia = subclase.referencia = referencia
         persona.save()
         subclase.save()
 
@@ -0,0 +1,69 @@
+# Copyright (C) 2025-now  p.fernandezf <p@fernandezf.es> & iago.rivas <delthia@delthia.com>
+
+import csv, logging, os, time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from gestion.duplicados import MOTIVOS, buscar_duplicados
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = (
+        "Busca Participantes y Mentores registrados varias veces con distintos datos."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "-m",
+            "--motivo",
+            help="Mostrar solo los pares con este motivo.",
+            choices=[motivo for motivo, _descripcion in MOTIVOS],
+        )
+        parser.add_argument(
+            "-o",
+            "--output",
+            help="Exportar los pares a un CSV.",
+        )
+        parser.add_argument(
+            "--no-overwrite",
+            help="Evitar sobreescribir el archivo de salida.",
+            action="store_true",
+            default=False,
+        )
+
+    def handle(self, *args, **options):
+        archivo = options.get("output")
+        if archivo and os.path.exists(archivo) and options.get("no_overwrite"):
+            raise CommandError(
+                "El archivo de salida existe y se indicó --no-overwrite."
+            )
+
+        inicio = time.perf_counter()
+        pares = buscar_duplicados()
+        duracion = time.perf_counter() - inicio
+
+        if options.get("motivo"):
+            pares = [par for par in pares if options["motivo"] in par["motivos"]]
+
+        descripciones = dict(MOTIVOS)
+        for par in pares:
+            motivos = ", ".join(
+                descripciones[motivo] for motivo in sorted(par["motivos"])
+            )
+            self.stdout.write(f"{par['correos'][0]}\t{par['correos'][1]}\t{motivos}")
+
+        if archivo:
+            with open(archivo, "w") as csvfile:
+                writer = csv.writer(csvfile, quoting=csv.QUOTE_MINIMAL, quotechar='"')
+                writer.writerow(("correo_1", "correo_2", "motivos"))
+                for par in pares:
+                    writer.writerow((*par["correos"], " ".join(sorted(par["motivos"]))))
+
+        logger.info(f"Búsqueda de duplicados: {len(pares)} posibles pares")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{len(pares)} posibles duplicados encontrados en {duracion:.2f}s."
+            )
+        )
@@ -0,0 +1,55 @@
+# Copyright (C) 2025-now  p.fernandezf <p@fernandezf.es> & iago.rivas <delthia@delthia.com>
+
+import logging
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from gestion.copias import ErrorCopia, copia_seguridad
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Crea una copia de seguridad comprimida de la base de datos SQLite sin detener el servidor, comprueba su integridad y elimina las copias antiguas."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "-o",
+            "--output",
+            help=f"Directorio de las copias. Por defecto, {settings.COPIAS_DIRECTORIO}.",
+            default=None,
+        )
+        parser.add_argument(
+            "--conservar",
+            help=f"Número de copias más recientes que se conservan (0 para conservarlas todas). Por defecto, {settings.COPIAS_CONSERVAR}.",
+            type=int,
+            default=None,
+        )
+        parser.add_argument(
+            "--nivel",
+            help=f"Nivel de compresión. Por defecto, {settings.COPIAS_NIVEL_COMPRESION}.",
+            type=int,
+            default=None,
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != "sqlite":
+            raise CommandError(
+                "Las copias de seguridad con este comando solo están disponibles con SQLite"
+            )
+
+        directorio = Path(options.get("output") or settings.COPIAS_DIRECTORIO)
+        try:
+            destino = copia_seguridad(
+                directorio,
+                conservar=options.get("conservar"),
+                nivel=options.get("nivel"),
+            )
+        except (ErrorCopia, OSError) as e:
+            logger.error(f"Error al crear la copia de seguridad: {e}")
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS(f"Copia de seguridad creada: {destino}"))
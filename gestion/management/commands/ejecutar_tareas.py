@@ -0,0 +1,64 @@
+# Copyright (C) 2025-now  p.fernandezf <p@fernandezf.es> & iago.rivas <delthia@delthia.com>
+
+import logging, signal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from gestion.tareas import TAREAS, bucle_tareas, ejecutar_tarea
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Ejecuta las tareas periódicas (correos encolados, recordatorios, lista de espera, limpieza de tokens e índice de CVs) según TAREAS_PERIODICAS."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "-t",
+            "--tarea",
+            help=f"Ejecutar solo esta tarea. Se puede repetir. Tareas: {', '.join(TAREAS)}.",
+            action="append",
+            choices=TAREAS,
+            default=None,
+        )
+        parser.add_argument(
+            "--una-vez",
+            help="Ejecutar las tareas una sola vez y terminar.",
+            action="store_true",
+            default=False,
+        )
+
+    def handle(self, *args, **options):
+        tareas = {
+            nombre: intervalo
+            for nombre, intervalo in settings.TAREAS_PERIODICAS.items()
+            if not options.get("tarea") or nombre in options["tarea"]
+        }
+        for nombre in tareas:
+            if nombre not in TAREAS:
+                raise CommandError(
+                    f"Tarea desconocida en TAREAS_PERIODICAS: '{nombre}'"
+                )
+        for nombre in options.get("tarea") or ():
+            tareas.setdefault(nombre, 60)
+
+        if options.get("una_vez"):
+            for nombre in tareas:
+                resultado = ejecutar_tarea(nombre)
+                self.stdout.write(f"{nombre}: {resultado}")
+            return
+
+        parar = False
+
+        def detener(signum, frame):
+            nonlocal parar
+            parar = True
+
+        signal.signal(signal.SIGTERM, detener)
+        signal.signal(signal.SIGINT, detener)
+
+        logger.info(f"Iniciando tareas periódicas: {tareas}")
+        self.stdout.write(self.style.SUCCESS(f"Ejecutando {', '.join(tareas)}"))
+        bucle_tareas(tareas, lambda: parar)
+        logger.info("Tareas periódicas detenidas")
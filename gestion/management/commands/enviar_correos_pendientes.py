@@ -0,0 +1,31 @@
+# Copyright (C) 2025-now  p.fernandezf <p@fernandezf.es> & iago.rivas <delthia@delthia.com>
+
+import logging
+
+from django.core.management.base import BaseCommand
+
+from gestion.utils import enviar_correos_pendientes
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Envía los correos encolados respetando el límite de mensajes por segundo."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "-n",
+            "--maximo",
+            help="Número máximo de correos a enviar.",
+            type=int,
+            default=None,
+        )
+
+    def handle(self, *args, **options):
+        enviados, errores = enviar_correos_pendientes(options.get("maximo"))
+
+        if errores:
+            self.stdout.write(
+                self.style.ERROR(f"{errores} correos no se pudieron enviar.")
+            )
+        self.stdout.write(self.style.SUCCESS(f"{enviados} correos enviados."))
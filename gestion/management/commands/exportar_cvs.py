@@ -0,0 +1,84 @@
+# Copyright (C) 2025-now  p.fernandezf <p@fernandezf.es> & iago.rivas <delthia@delthia.com>
+
+import logging, os
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from gestion.cvs import cvs_compartidos, escribir_volumenes, zip_cvs
+from gestion.models import NIVELES_ESTUDIO
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Exporta en un ZIP los CVs de los participantes que autorizaron compartirlos, con un manifiesto CSV."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "-o",
+            "--output",
+            help="Archivo de salida",
+            default="cvs.zip",
+        )
+        parser.add_argument(
+            "--no-overwrite",
+            help="Evitar sobreescribir el archivo de salida.",
+            action="store_true",
+            default=False,
+        )
+        parser.add_argument(
+            "--nivel-estudio",
+            help="Exportar solo los participantes con este nivel de estudios.",
+            choices=[nivel for nivel, _nombre in NIVELES_ESTUDIO if nivel],
+        )
+        parser.add_argument(
+            "--centro-estudio",
+            help="Exportar solo los participantes de este centro de estudios.",
+        )
+        parser.add_argument(
+            "--por-volumen",
+            help="Dividir la exportación en volúmenes de este número de CVs. Los volúmenes ya generados no se repiten, por lo que una exportación interrumpida se puede continuar.",
+            type=int,
+            default=0,
+        )
+
+    def handle(self, *args, **options):
+        destino = Path(options.get("output"))
+        por_volumen = options.get("por_volumen")
+        if por_volumen < 0:
+            raise CommandError("El número de CVs por volumen no puede ser negativo.")
+
+        participantes = cvs_compartidos(
+            nivel_estudio=options.get("nivel_estudio"),
+            centro_estudio=options.get("centro_estudio"),
+        )
+        total = participantes.count()
+        if not total:
+            self.stdout.write(self.style.ERROR("Ningún participante comparte su CV"))
+            return
+
+        self.stdout.write(self.style.HTTP_INFO(f"Exportando {total} CVs."))
+
+        if por_volumen:
+            for ruta, existia in escribir_volumenes(
+                participantes, destino, por_volumen
+            ):
+                if existia:
+                    self.stdout.write(f"{ruta} ya existía, se omite")
+                else:
+                    self.stdout.write(self.style.SUCCESS(f"{ruta} generado"))
+        else:
+            if destino.exists() and options.get("no_overwrite"):
+                raise CommandError(
+                    "El archivo de salida existe y se indicó --no-overwrite."
+                )
+
+            parcial = destino.with_name(destino.name + ".part")
+            with open(parcial, "wb") as archivo:
+                for bloque in zip_cvs(participantes):
+                    archivo.write(bloque)
+            os.replace(parcial, destino)
+
+        logger.info(f"ZIP de {total} CVs exportado")
+        self.stdout.write(self.style.SUCCESS(f"ZIP exportado con {total} CVs!"))
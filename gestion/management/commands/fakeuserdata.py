@@ -1,45 +1,77 @@
 # Copyright (C) 2025-now  p.fernandezf <p@fernandezf.es> & iago.rivas <delthia@delthia.com>
 
-from datetime import date
-from random import choice, randint
+import time
 
 from django.core.management.base import BaseCommand, CommandError
-from faker import Faker
 
-from gestion.models import Participante
+from gestion.sinteticos import generar
 
 
 class Command(BaseCommand):
-    help = "Crea datos falsos de participantes de prueba"
+    help = "Crea datos falsos de prueba: participantes y, opcionalmente, mentores y colaboradores, con tokens, restricciones alimentarias, pases y presencias según su estado. Con --semilla se generan siempre los mismos datos."
 
     def add_arguments(self, parser):
         parser.add_argument(
             "cantidad", help="Cantidad de participantes a crear", type=int, default=100
         )
+        parser.add_argument(
+            "--mentores",
+            help="Cantidad de mentores a crear.",
+            type=int,
+            default=0,
+        )
+        parser.add_argument(
+            "--colaboradores",
+            help="Cantidad de colaboradores a crear.",
+            type=int,
+            default=0,
+        )
+        parser.add_argument(
+            "-s",
+            "--semilla",
+            help="Semilla de los datos aleatorios.",
+            type=int,
+            default=None,
+        )
+        parser.add_argument(
+            "--lote",
+            help="Personas por transacción.",
+            type=int,
+            default=2000,
+        )
 
     def handle(self, *args, **options):
+        cantidades = [
+            options.get(opcion) for opcion in ("cantidad", "mentores", "colaboradores")
+        ]
+        if any(cantidad < 0 for cantidad in cantidades):
+            raise CommandError("Las cantidades no pueden ser negativas")
+        if options.get("lote") < 1:
+            raise CommandError("El tamaño del lote debe ser positivo")
+
         self.stdout.write(
-            self.style.SUCCESS(f"Se crearán {options['cantidad']} participantes")
-        )
-        fake = Faker("es_ES")
-
-        for _ in range(options["cantidad"]):
-            Participante(
-                correo=fake.email(),
-                nombre=fake.name(),
-                dni=fake.cif(),  # Lo más parecido a un DNI que hay en faker...
-                genero=choice(
-                    ["H", "M", "O", "-"],
-                ),
-                telefono=fake.phone_number(),
-                fecha_nacimiento=fake.date_between(
-                    date(1990, 1, 1), date(2008, 12, 31)
-                ),
-                nombre_estudio=choice(["GCED", "GEI", "MUEI", "MUNICS"]),
-                centro_estudio=choice(["FIC", "USC", "UVigo", "Otro"]),
-                curso=randint(1, 4),
-                ciudad=fake.city(),
-                quiere_creditos=choice([True, False]),
-                talla_camiseta=choice(["S", "M", "L", "XL"]),
-                compartir_cv=choice([True, False]),
-            ).save()
+            self.style.SUCCESS(
+                f"Se crearán {options['cantidad']} participantes, {options['mentores']} mentores y {options['colaboradores']} colaboradores"
+            )
+        )
+
+        creadas = {}
+
+        def progreso(modelo, personas):
+            creadas[modelo] = creadas.get(modelo, 0) + personas
+            self.stdout.write(f"{modelo}: {creadas[modelo]}")
+
+        inicio = time.perf_counter()
+        filas = generar(
+            *cantidades,
+            semilla=options.get("semilla"),
+            lote=options.get("lote"),
+            progreso=progreso,
+        )
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{sum(filas.values())} filas creadas en {time.perf_counter() - inicio:.1f}s: "
+                + ", ".join(f"{n} {modelo}" for modelo, n in filas.items())
+            )
+        )
@@ -0,0 +1,65 @@
+# Copyright (C) 2025-now  p.fernandezf <p@fernandezf.es> & iago.rivas <delthia@delthia.com>
+
+import logging
+
+from django.core.management.base import BaseCommand, CommandError
+
+from gestion.busqueda import (
+    actualizar_indice,
+    extraer_pendientes,
+    indice_disponible,
+    reconstruir_indice,
+)
+from gestion.models import TextoCV
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Extrae el texto de los CVs pendientes y actualiza el índice de búsqueda de CVs y motivaciones. La tarea periódica 'indexar_cvs' hace lo mismo por lotes."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "-n",
+            "--numero",
+            help="Número máximo de CVs de los que extraer el texto. Por defecto, todos los pendientes.",
+            type=int,
+            default=None,
+        )
+        parser.add_argument(
+            "--todo",
+            help="Volver a extraer el texto de todos los CVs y reconstruir el índice completo.",
+            action="store_true",
+            default=False,
+        )
+
+    def handle(self, *args, **options):
+        if not indice_disponible():
+            raise CommandError(
+                "El índice de búsqueda solo está disponible con SQLite y las migraciones aplicadas"
+            )
+
+        if options.get("todo"):
+            TextoCV.objects.all().delete()
+
+        extraidos = 0
+        while True:
+            lote = extraer_pendientes(options.get("numero"))
+            extraidos += lote
+            if not lote or options.get("numero"):
+                break
+            self.stdout.write(f"{extraidos} CVs procesados...")
+
+        if options.get("todo"):
+            indexadas = reconstruir_indice()
+        else:
+            indexadas = actualizar_indice()
+
+        logger.info(
+            f"{extraidos} CVs extraídos, {indexadas} filas del índice actualizadas"
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{extraidos} CVs extraídos, {indexadas} filas del índice actualizadas"
+            )
+        )
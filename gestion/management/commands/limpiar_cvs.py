@@ -0,0 +1,171 @@
+# Copyright (C) 2025-now  p.fernandezf <p@fernandezf.es> & iago.rivas <delthia@delthia.com>
+
+import logging, os, re, time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from gestion.models import Persona, TextoCV
+from gestion.subidas import ruta_sha256, sha256_archivo
+
+logger = logging.getLogger(__name__)
+
+# Ruta de los CV almacenados por su contenido
+_RUTA_SHA256 = re.compile(r"^cv/([0-9a-f]{2})/\1[0-9a-f]{62}\.pdf$")
+
+# Antigüedad a partir de la que se eliminan los archivos temporales de subidas
+ANTIGUEDAD_TEMPORALES = 24 * 60 * 60
+
+
+class Command(BaseCommand):
+    help = "Elimina los CVs que no pertenecen a ninguna persona. Opcionalmente, migra los CVs antiguos al almacenamiento por contenido (SHA-256) y comprueba su integridad."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--migrar",
+            help="Mover los CVs con nombres antiguos (DNI y correo) a su ruta por contenido y actualizar las personas.",
+            action="store_true",
+            default=False,
+        )
+        parser.add_argument(
+            "--verificar",
+            help="Comprobar que el contenido de los CVs coincide con su SHA-256.",
+            action="store_true",
+            default=False,
+        )
+        parser.add_argument(
+            "--borrar",
+            help="Eliminar los CVs huérfanos. Por defecto solo se listan.",
+            action="store_true",
+            default=False,
+        )
+
+    def handle(self, *args, **options):
+        media = Path(settings.MEDIA_ROOT)
+
+        if options.get("migrar"):
+            self.migrar(media)
+
+        if options.get("verificar"):
+            self.verificar(media)
+
+        if options.get("borrar"):
+            # El texto extraído de los CVs que ya no tiene nadie (ver gestion/busqueda.py)
+            textos = TextoCV.objects.exclude(
+                sha256__in=Persona.objects.filter(cv_sha256__isnull=False).values(
+                    "cv_sha256"
+                )
+            ).delete()[0]
+            if textos:
+                self.stdout.write(f"{textos} textos de CVs huérfanos eliminados")
+
+        referenciados = set(
+            Persona.objects.exclude(cv="")
+            .exclude(cv__isnull=True)
+            .values_list("cv", flat=True)
+        )
+
+        huerfanos = [
+            archivo
+            for archivo in sorted((media / "cv").rglob("*"))
+            if archivo.is_file()
+            and archivo.relative_to(media).as_posix() not in referenciados
+        ]
+        limite = time.time() - ANTIGUEDAD_TEMPORALES
+        huerfanos += [
+            archivo
+            for archivo in Path(settings.CV_DIRECTORIO_TEMPORAL).glob("*")
+            if archivo.is_file() and archivo.stat().st_mtime < limite
+        ]
+
+        if not huerfanos:
+            self.stdout.write(self.style.SUCCESS("No hay CVs huérfanos"))
+            return
+
+        tamano = sum(archivo.stat().st_size for archivo in huerfanos)
+        for archivo in huerfanos:
+            self.stdout.write(str(archivo.relative_to(media)))
+
+        if not options.get("borrar"):
+            self.stdout.write(
+                self.style.WARNING(
+                    f"{len(huerfanos)} CVs huérfanos ({tamano / (1024 * 1024):.1f} MB). Usa --borrar para eliminarlos."
+                )
+            )
+            return
+
+        for archivo in huerfanos:
+            archivo.unlink(missing_ok=True)
+
+        logger.info(f"{len(huerfanos)} CVs huérfanos eliminados")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{len(huerfanos)} CVs huérfanos eliminados ({tamano / (1024 * 1024):.1f} MB)"
+            )
+        )
+
+    def migrar(self, media: Path):
+        antiguos = (
+            Persona.objects.exclude(cv="")
+            .exclude(cv__isnull=True)
+            .values_list("cv", "cv_sha256")
+            .order_by()
+            .distinct()
+        )
+
+        migrados = 0
+        for nombre, sha256 in antiguos:
+            if _RUTA_SHA256.match(nombre) and sha256:
+                continue
+
+            origen = media / nombre
+            if not origen.is_file():
+                self.stdout.write(self.style.ERROR(f"No se encuentra el CV {nombre}"))
+                continue
+
+            with open(origen, "rb") as archivo:
+                sha256 = sha256_archivo(archivo)
+            nuevo = ruta_sha256(sha256)
+            destino = media / nuevo
+
+            # Si ya hay un CV idéntico, el antiguo queda huérfano
+            if not destino.exists():
+                os.makedirs(destino.parent, exist_ok=True)
+                os.replace(origen, destino)
+
+            Persona.objects.filter(cv=nombre).update(cv=nuevo, cv_sha256=sha256)
+            migrados += 1
+
+        logger.info(f"{migrados} CVs migrados al almacenamiento por contenido")
+        self.stdout.write(self.style.SUCCESS(f"{migrados} CVs migrados"))
+
+    def verificar(self, media: Path):
+        errores = 0
+        cvs = (
+            Persona.objects.exclude(cv="")
+            .exclude(cv__isnull=True)
+            .values_list("cv", "cv_sha256")
+            .order_by()
+            .distinct()
+        )
+        for nombre, sha256 in cvs:
+            try:
+                with open(media / nombre, "rb") as archivo:
+                    calculado = sha256_archivo(archivo)
+            except OSError:
+                self.stdout.write(self.style.ERROR(f"No se encuentra el CV {nombre}"))
+                errores += 1
+                continue
+
+            if sha256 and calculado != sha256:
+                self.stdout.write(
+                    self.style.ERROR(f"El contenido del CV {nombre} no coincide")
+                )
+                errores += 1
+
+        if errores:
+            logger.error(f"{errores} CVs ausentes o modificados")
+        self.stdout.write(
+            self.style.SUCCESS(f"{len(cvs)} CVs comprobados, {errores} errores")
+        )
@@ -0,0 +1,106 @@
+# Copyright (C) 2025-now  p.fernandezf <p@fernandezf.es> & iago.rivas <delthia@delthia.com>
+
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from gestion.perfilado import agregado, borrar_instantaneas, instantaneas, resumen
+
+ORDEN = {
+    "total": lambda fila: fila["peticiones"] * fila["total_ms"]["media"],
+    "p95": lambda fila: fila["total_ms"]["p95"],
+    "consultas": lambda fila: fila["consultas"]["media"],
+    "peticiones": lambda fila: fila["peticiones"],
+}
+
+
+class Command(BaseCommand):
+    help = "Muestra el perfilado de las vistas (PERFILADO_ACTIVO) sumado de todos los procesos de gunicorn: peticiones medidas, tiempo total, consultas y tiempo de base de datos, plantillas y correo por vista."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "-o",
+            "--ordenar",
+            help="Ordenar por tiempo total acumulado (por defecto), p95, consultas por petición o número de peticiones.",
+            choices=ORDEN.keys(),
+            default="total",
+        )
+        parser.add_argument(
+            "--json",
+            help="Mostrar el resumen en JSON.",
+            action="store_true",
+            default=False,
+        )
+        parser.add_argument(
+            "--reiniciar",
+            help="Borrar las instantáneas guardadas después de mostrarlas.",
+            action="store_true",
+            default=False,
+        )
+
+    def handle(self, *args, **options):
+        lista = instantaneas()
+        filas = sorted(
+            resumen(agregado(lista)), key=ORDEN[options.get("ordenar")], reverse=True
+        )
+
+        if options.get("json"):
+            self.stdout.write(json.dumps(filas, indent=2))
+        elif not filas:
+            self.stdout.write(
+                self.style.WARNING(
+                    f"No hay datos de perfilado en {settings.PERFILADO_DIRECTORIO}"
+                    + (
+                        ""
+                        if settings.PERFILADO_ACTIVO
+                        else " (PERFILADO_ACTIVO = False)"
+                    )
+                )
+            )
+        else:
+            self.stdout.write(
+                f"{len(lista)} procesos, {sum(f['peticiones'] for f in filas)} peticiones medidas"
+            )
+            self.stdout.write(self.tabla(filas))
+
+        if options.get("reiniciar"):
+            borrar_instantaneas()
+            self.stdout.write(self.style.SUCCESS("Instantáneas borradas"))
+
+    def tabla(self, filas: list[dict]) -> str:
+        cabecera = [
+            "Vista",
+            "Pet.",
+            "Media ms",
+            "p95 ms",
+            "Máx ms",
+            "Consultas",
+            "Máx cons.",
+            "BD ms",
+            "Plant. ms",
+            "Correo ms",
+        ]
+        datos = [cabecera] + [
+            [
+                fila["vista"],
+                str(fila["peticiones"]),
+                f"{fila['total_ms']['media']:.1f}",
+                f"{fila['total_ms']['p95']:.0f}",
+                f"{fila['total_ms']['maximo']:.0f}",
+                f"{fila['consultas']['media']:.1f}",
+                f"{fila['consultas']['maximo']:.0f}",
+                f"{fila['bd_ms']['media']:.1f}",
+                f"{fila['plantillas_ms']['media']:.1f}",
+                f"{fila['correo_ms']['media']:.1f}",
+            ]
+            for fila in filas
+        ]
+        anchos = [max(len(fila[i]) for fila in datos) for i in range(len(cabecera))]
+        return "\n".join(
+            "  ".join(
+                valor.ljust(ancho) if i == 0 else valor.rjust(ancho)
+                for i, (valor, ancho) in enumerate(zip(fila, anchos))
+            )
+            for fila in datos
+        )
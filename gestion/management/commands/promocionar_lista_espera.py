@@ -0,0 +1,43 @@
+# Copyright (C) 2025-now  p.fernandezf <p@fernandezf.es> & iago.rivas <delthia@delthia.com>
+
+import logging
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from gestion.seleccion import lista_espera, promocionar_lista_espera
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Ofrece las plazas liberadas (rechazos y tokens caducados) a la lista de espera."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            help="Mostrar la lista de espera sin promocionar a nadie.",
+            action="store_true",
+            default=False,
+        )
+
+    def handle(self, *args, **options):
+        if settings.PLAZAS_EVENTO is None:
+            raise CommandError(
+                "No se han definido las plazas del evento (PLAZAS_EVENTO)."
+            )
+
+        if options.get("dry_run"):
+            for posicion, correo in enumerate(lista_espera(), start=1):
+                self.stdout.write(f"{posicion}\t{correo}")
+            return
+
+        promocionados = promocionar_lista_espera()
+        for correo in promocionados:
+            self.stdout.write(self.style.HTTP_INFO(f"Promocionado {correo}"))
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{len(promocionados)} personas promocionadas. Sus correos de confirmación están encolados."
+            )
+        )
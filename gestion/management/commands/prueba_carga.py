@@ -0,0 +1,237 @@
+# Copyright (C) 2025-now  p.fernandezf <p@fernandezf.es> & iago.rivas <delthia@delthia.com>
+
+import json, logging, tempfile
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from gestion.carga import (
+    ESCENARIOS,
+    ClienteDjango,
+    ClienteHttp,
+    bloqueos_registro,
+    ejecutar,
+    entorno_gunicorn,
+    entorno_prueba,
+    escrituras,
+    gunicorn_disponible,
+    preparar,
+    servidor_gunicorn,
+    tamano_registro_avisos,
+)
+from gestion.sqlite import metricas_escrituras
+
+logger = logging.getLogger(__name__)
+
+COLUMNAS = (
+    ("modo", "Modo", "{}"),
+    ("configuracion", "Conf.", "{}"),
+    ("escenario", "Escenario", "{}"),
+    ("peticiones", "Pet.", "{}"),
+    ("errores", "Errores", "{}"),
+    ("bloqueos", "Bloqueos", "{}"),
+    ("reintentos", "Reint.", "{}"),
+    ("escrituras", "Escrit.", "{}"),
+    ("por_segundo", "Pet/s", "{:.1f}"),
+    ("p50", "p50 ms", "{:.1f}"),
+    ("p95", "p95 ms", "{:.1f}"),
+    ("p99", "p99 ms", "{:.1f}"),
+    ("maximo", "Máx ms", "{:.1f}"),
+)
+
+
+def configuracion(valor: str) -> tuple[int, int]:
+    try:
+        workers, threads = (int(n) for n in valor.lower().split("x"))
+    except ValueError:
+        raise CommandError(f"Configuración '{valor}' inválida: usa PROCESOSxHILOS")
+    if workers < 1 or threads < 1:
+        raise CommandError(f"Configuración '{valor}' inválida")
+    return workers, threads
+
+
+class Command(BaseCommand):
+    help = "Prueba de carga de las vistas de registro, verificación de correo, pases y presencia sobre una base de datos temporal, con el cliente de pruebas de Django y contra gunicorn con distintos procesos e hilos. Muestra las peticiones por segundo, los percentiles de la latencia y los errores por base de datos bloqueada."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "-m",
+            "--modo",
+            help="Cliente de pruebas de Django (en este proceso), gunicorn o ambos.",
+            choices=["cliente", "gunicorn", "ambos"],
+            default="cliente",
+        )
+        parser.add_argument(
+            "-e",
+            "--escenarios",
+            help="Escenarios a probar.",
+            nargs="+",
+            choices=ESCENARIOS,
+            default=list(ESCENARIOS),
+        )
+        parser.add_argument(
+            "-n",
+            "--peticiones",
+            help="Peticiones por escenario.",
+            type=int,
+            default=200,
+        )
+        parser.add_argument(
+            "-c",
+            "--concurrencia",
+            help="Clientes simultáneos.",
+            type=int,
+            default=8,
+        )
+        parser.add_argument(
+            "--configuraciones",
+            help="Configuraciones de gunicorn a probar, como PROCESOSxHILOS.",
+            nargs="+",
+            default=["1x1", "2x2", "4x2"],
+        )
+        parser.add_argument(
+            "--puerto",
+            help="Puerto local para gunicorn.",
+            type=int,
+            default=8765,
+        )
+        parser.add_argument(
+            "--tamano-cv",
+            help="Tamaño de los CVs en KB.",
+            type=int,
+            default=200,
+        )
+        parser.add_argument(
+            "--smtp",
+            help="Enviar los correos a un servidor SMTP local (HOST:PUERTO, sin SSL), p. ej. `python -m aiosmtpd -n -l localhost:1025`. Por defecto se guardan en memoria.",
+            default=None,
+        )
+        parser.add_argument(
+            "--json",
+            help="Guardar los resultados en este archivo JSON.",
+            default=None,
+        )
+
+    def handle(self, *args, **options):
+        if options.get("peticiones") < 1 or options.get("concurrencia") < 1:
+            raise CommandError("Las peticiones y la concurrencia deben ser positivas")
+
+        modo = options.get("modo")
+        configuraciones = []
+        if modo in ("gunicorn", "ambos"):
+            if not gunicorn_disponible():
+                raise CommandError("gunicorn no está instalado")
+            configuraciones = [configuracion(c) for c in options.get("configuraciones")]
+
+        smtp = None
+        if options.get("smtp"):
+            host, _, puerto = options.get("smtp").rpartition(":")
+            if not host or not puerto.isdigit():
+                raise CommandError("El servidor SMTP debe ser HOST:PUERTO")
+            smtp = (host, int(puerto))
+
+        self.fase = 0
+        resultados = []
+        with tempfile.TemporaryDirectory(prefix="prueba-carga-") as temporal:
+            directorio = Path(temporal)
+            with entorno_prueba(directorio, smtp) as contrasena:
+                self.contrasena = contrasena
+
+                if modo in ("cliente", "ambos"):
+                    for escenario in options.get("escenarios"):
+                        antes = metricas_escrituras()
+                        resultado = self.fase_carga(ClienteDjango, escenario, options)
+                        despues = metricas_escrituras()
+                        resultado["reintentos"] = (
+                            despues["reintentos"] - antes["reintentos"]
+                        )
+                        resultados.append(
+                            self.mostrar(
+                                "cliente",
+                                f"1x{options['concurrencia']}",
+                                escenario,
+                                resultado,
+                            )
+                        )
+
+                entorno = entorno_gunicorn(smtp)
+                for workers, threads in configuraciones:
+                    with servidor_gunicorn(
+                        workers, threads, options.get("puerto"), directorio, entorno
+                    ) as url:
+                        for escenario in options.get("escenarios"):
+                            posicion = tamano_registro_avisos()
+                            resultado = self.fase_carga(
+                                lambda: ClienteHttp(url), escenario, options
+                            )
+                            # Los bloqueos de gunicorn solo se ven en su log
+                            resultado["reintentos"], resultado["bloqueos"] = (
+                                bloqueos_registro(posicion)
+                            )
+                            resultados.append(
+                                self.mostrar(
+                                    "gunicorn",
+                                    f"{workers}x{threads}",
+                                    escenario,
+                                    resultado,
+                                )
+                            )
+
+        self.stdout.write("")
+        self.stdout.write(self.tabla(resultados))
+
+        if options.get("json"):
+            with open(options.get("json"), "w") as archivo:
+                json.dump(resultados, archivo, indent=2)
+
+        logger.info(f"Prueba de carga terminada: {len(resultados)} escenarios")
+
+    def fase_carga(self, fabrica, escenario: str, options) -> dict:
+        self.fase += 1
+        datos = preparar(
+            escenario,
+            options.get("peticiones"),
+            self.fase,
+            options.get("tamano_cv") * 1024,
+        )
+        datos["contrasena"] = self.contrasena
+        resultado = ejecutar(
+            fabrica, datos, options.get("peticiones"), options.get("concurrencia")
+        )
+        resultado["escrituras"] = escrituras(datos)
+        return resultado
+
+    def mostrar(self, modo: str, configuracion: str, escenario: str, resultado: dict):
+        resultado = {
+            "modo": modo,
+            "configuracion": configuracion,
+            "escenario": escenario,
+            **resultado,
+        }
+        estilo = (
+            self.style.WARNING
+            if resultado["errores"] or resultado["bloqueos"]
+            else self.style.SUCCESS
+        )
+        self.stdout.write(
+            estilo(
+                f"{modo} {configuracion} {escenario}: {resultado['por_segundo']:.1f} pet/s, "
+                f"p95 {resultado['p95']:.1f} ms, {resultado['errores']} errores, "
+                f"{resultado['bloqueos']} bloqueos"
+            )
+        )
+        return resultado
+
+    def tabla(self, resultados: list[dict]) -> str:
+        filas = [[titulo for _, titulo, _ in COLUMNAS]] + [
+            [formato.format(r[clave]) for clave, _, formato in COLUMNAS]
+            for r in resultados
+        ]
+        anchos = [max(len(fila[i]) for fila in filas) for i in range(len(COLUMNAS))]
+        return "\n".join(
+            "  ".join(
+                valor.ljust(ancho) if i < 3 else valor.rjust(ancho)
+                for i, (valor, ancho) in enumerate(zip(fila, anchos))
+            )
+            for fila in filas
+        )
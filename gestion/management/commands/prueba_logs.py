@@ -0,0 +1,85 @@
+# Copyright (C) 2025-now  p.fernandezf <p@fernandezf.es> & iago.rivas <delthia@delthia.com>
+
+import json, logging
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from gestion.logs import medir
+
+
+class Command(BaseCommand):
+    help = "Mide el coste de los logs por petición en el hilo de la petición: archivos escritos directamente (configuración anterior) frente a la cola con el listener en segundo plano. Escribe en un directorio temporal."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "-n",
+            "--peticiones",
+            help="Peticiones simuladas.",
+            type=int,
+            default=2000,
+        )
+        parser.add_argument(
+            "-r",
+            "--registros",
+            help="Logs por petición (la mitad de debug y la mitad de info).",
+            type=int,
+            default=4,
+        )
+        parser.add_argument(
+            "--nivel",
+            help="Nivel del logger.",
+            choices=["DEBUG", "INFO"],
+            default="DEBUG",
+        )
+        parser.add_argument(
+            "-e",
+            "--espera",
+            help="Microsegundos de espera antes de cada log, como una consulta a la base de datos (por defecto 200).",
+            type=int,
+            default=200,
+        )
+        parser.add_argument(
+            "--json",
+            help="Mostrar el resultado en JSON.",
+            action="store_true",
+            default=False,
+        )
+
+    def handle(self, *args, **options):
+        if options.get("peticiones") < 1 or options.get("registros") < 1:
+            raise CommandError("Las peticiones y los registros deben ser positivos")
+        if options.get("espera") < 0:
+            raise CommandError("La espera no puede ser negativa")
+
+        resultado = medir(
+            options.get("peticiones"),
+            options.get("registros"),
+            getattr(logging, options.get("nivel")),
+            options.get("espera") / 1e6,
+            settings.LOGFILE_SIZE,
+            settings.LOGFILE_COUNT,
+        )
+
+        if options.get("json"):
+            self.stdout.write(json.dumps(resultado, indent=2))
+            return
+
+        self.stdout.write(
+            f"{resultado['peticiones']} peticiones con {resultado['registros']} logs ({options['nivel']}), "
+            f"{resultado['base_us']:.0f} µs por petición sin logs"
+        )
+        self.stdout.write(
+            f"Archivos síncronos: {resultado['sincrono_us']:.1f} µs por petición, "
+            f"{resultado['lineas_debug']['sincrono']} líneas en debug.log"
+        )
+        self.stdout.write(
+            f"Cola:               {resultado['cola_us']:.1f} µs por petición, "
+            f"{resultado['lineas_debug']['cola']} líneas en debug.log "
+            f"(vaciada {resultado['vaciado_ms']:.0f} ms después)"
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Con la cola, los logs ocupan el {resultado['cola_us'] / max(resultado['sincrono_us'], 0.1) * 100:.0f}% del tiempo en la petición"
+            )
+        )
@@ -0,0 +1,217 @@
+# Copyright (C) 2025-now  p.fernandezf <p@fernandezf.es> & iago.rivas <delthia@delthia.com>
+
+import atexit, json, logging, os, threading, time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from gestion.perfilado import SIN_RESOLVER, anadir, combinar, histograma_vacio
+
+logger = logging.getLogger(__name__)
+
+# Métricas de la aplicación en formato de texto de Prometheus (/metrics). Cada proceso
+# acumula sus contadores e histogramas en memoria y un hilo los guarda cada
+# `METRICAS_INTERVALO` segundos, si cambiaron, en `METRICAS_DIRECTORIO/<pid>.json`. La exposición suma los archivos de todos
+# los procesos (gunicorn, ejecutar_tareas). gunicorn borra el directorio al arrancar.
+
+PREFIJO = "hackackathon_"
+LIMITES_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+# Métricas en el orden en el que se exponen
+REGISTRO = {}
+
+_bloqueo = threading.Lock()
+# {nombre: {etiquetas: valor o histograma}}
+_valores = {}
+# Proceso en el que se inició el hilo de guardado (tras un fork hay que iniciar otro)
+_estado = {"pid": None, "cambios": False}
+
+
+def _escapar(valor) -> str:
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _etiquetas(etiquetas: dict) -> str:
+    """Etiquetas en el formato de la exposición, que sirve también de clave."""
+    return ",".join(
+        f'{clave}="{_escapar(valor)}"' for clave, valor in sorted(etiquetas.items())
+    )
+
+
+class Metrica:
+    tipo = ""
+
+    def __init__(self, nombre: str, ayuda: str):
+        self.nombre = PREFIJO + nombre
+        self.ayuda = ayuda
+        REGISTRO[self.nombre] = self
+
+    def _actualizar(self, etiquetas: dict, funcion):
+        if not settings.METRICAS_ACTIVAS:
+            return
+        clave = _etiquetas(etiquetas)
+        with _bloqueo:
+            funcion(_valores.setdefault(self.nombre, {}), clave)
+            _estado["cambios"] = True
+            if _estado["pid"] != os.getpid():
+                if _estado["pid"] is None:
+                    # Lo que quede sin guardar al terminar el proceso (también tras un fork)
+                    atexit.register(guardar)
+                _estado["pid"] = os.getpid()
+                threading.Thread(
+                    target=_guardar_periodicamente, name="metricas", daemon=True
+                ).start()
+
+
+class Contador(Metrica):
+    tipo = "counter"
+
+    def inc(self, valor: float = 1, **etiquetas):
+        def sumar(valores, clave):
+            valores[clave] = valores.get(clave, 0) + valor
+
+        self._actualizar(etiquetas, sumar)
+
+
+class Histograma(Metrica):
+    tipo = "histogram"
+
+    def __init__(self, nombre: str, ayuda: str, limites=LIMITES_SEGUNDOS):
+        super().__init__(nombre, ayuda)
+        self.limites = limites
+
+    def observar(self, valor: float, **etiquetas):
+        def anotar(valores, clave):
+            if clave not in valores:
+                valores[clave] = histograma_vacio(self.limites)
+            anadir(valores[clave], self.limites, valor)
+
+        self._actualizar(etiquetas, anotar)
+
+
+registros = Contador("registros_total", "Registros por tipo de persona")
+verificaciones = Contador("verificaciones_total", "Correos verificados")
+plazas = Contador("plazas_total", "Plazas confirmadas o rechazadas")
+correos = Contador("correos_total", "Correos enviados y con error por tipo")
+duracion_correos = Histograma(
+    "correo_duracion_segundos", "Duración del envío de los correos por tipo"
+)
+lecturas = Contador(
+    "lecturas_total",
+    "Acreditaciones leídas en cada puesto (usuario) en el registro, los pases y la presencia",
+)
+sqlite_reintentos = Contador(
+    "sqlite_reintentos_total",
+    "Escrituras reintentadas por tener la base de datos bloqueada",
+)
+sqlite_bloqueos = Contador(
+    "sqlite_bloqueos_total",
+    "Escrituras que fallaron por tener la base de datos bloqueada tras los reintentos",
+)
+peticiones = Histograma(
+    "peticion_duracion_segundos", "Duración de las peticiones por vista"
+)
+
+
+def guardar():
+    """Escribe los valores de este proceso en `METRICAS_DIRECTORIO/<pid>.json`."""
+    with _bloqueo:
+        contenido = json.dumps({"pid": os.getpid(), "valores": _valores})
+        _estado["cambios"] = False
+    directorio = Path(settings.METRICAS_DIRECTORIO)
+    directorio.mkdir(parents=True, exist_ok=True)
+    ruta = directorio / f"{os.getpid()}.json"
+    temporal = ruta.with_suffix(".tmp")
+    temporal.write_text(contenido)
+    os.replace(temporal, ruta)
+
+
+def _guardar_periodicamente():
+    pid = os.getpid()
+    while _estado["pid"] == pid:
+        time.sleep(settings.METRICAS_INTERVALO)
+        if not _estado["cambios"]:
+            continue
+        try:
+            guardar()
+        except OSError as e:
+            logger.warning(f"No se pudieron guardar las métricas: {e}")
+
+
+def agregado() -> dict:
+    """Valores sumados de los archivos de todos los procesos."""
+    total = {}
+    for ruta in Path(settings.METRICAS_DIRECTORIO).glob("*.json"):
+        try:
+            valores = json.loads(ruta.read_text())["valores"]
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Métricas de {ruta.name} ilegibles: {e}")
+            continue
+        for nombre, series in valores.items():
+            metrica = REGISTRO.get(nombre)
+            if metrica is None:
+                continue
+            destino = total.setdefault(nombre, {})
+            for clave, valor in series.items():
+                if isinstance(metrica, Histograma):
+                    if clave not in destino:
+                        destino[clave] = histograma_vacio(metrica.limites)
+                    combinar(destino[clave], valor)
+                else:
+                    destino[clave] = destino.get(clave, 0) + valor
+    return total
+
+
+def _serie(nombre: str, etiquetas: str, valor) -> str:
+    return f"{nombre}{{{etiquetas}}} {valor}" if etiquetas else f"{nombre} {valor}"
+
+
+def exposicion() -> str:
+    """Todas las métricas en el formato de texto de Prometheus."""
+    if settings.METRICAS_ACTIVAS:
+        guardar()
+    total = agregado()
+
+    lineas = []
+    for nombre, metrica in REGISTRO.items():
+        lineas.append(f"# HELP {nombre} {metrica.ayuda}")
+        lineas.append(f"# TYPE {nombre} {metrica.tipo}")
+        for etiquetas, valor in sorted(total.get(nombre, {}).items()):
+            if isinstance(metrica, Contador):
+                lineas.append(_serie(nombre, etiquetas, valor))
+                continue
+            acumulado = 0
+            separador = "," if etiquetas else ""
+            for limite, cuenta in zip([*metrica.limites, "+Inf"], valor["cuentas"]):
+                acumulado += cuenta
+                lineas.append(
+                    _serie(
+                        f"{nombre}_bucket",
+                        f'{etiquetas}{separador}le="{limite}"',
+                        acumulado,
+                    )
+                )
+            lineas.append(_serie(f"{nombre}_sum", etiquetas, valor["suma"]))
+            lineas.append(_serie(f"{nombre}_count", etiquetas, acumulado))
+    return "\n".join(lineas) + "\n"
+
+
+class MetricasMiddleware:
+    """Duración de cada petición por vista y clase de estado (2xx, 3xx...), si `METRICAS_ACTIVAS`."""
+
+    def __init__(self, get_response):
+        if not settings.METRICAS_ACTIVAS:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        inicio = time.perf_counter()
+        respuesta = self.get_response(request)
+        coincidencia = getattr(request, "resolver_match", None)
+        peticiones.observar(
+            time.perf_counter() - inicio,
+            vista=coincidencia.view_name if coincidencia else SIN_RESOLVER,
+            estado=f"{respuesta.status_code // 100}xx",
+        )
+        return respuesta
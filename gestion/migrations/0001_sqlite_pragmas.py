@@ -1,6 +1,33 @@
 from django.db import migrations
 
 
+# Solo para SQLite: con otras bases de datos no hace nada.
+# journal_mode se guarda en la base de datos; el resto de pragmas son por conexión
+# y se aplican en gestion/sqlite.py.
+def activar_wal(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    for pragma in (
+        "journal_mode=WAL",
+        "synchronous=normal",
+        "busy_timeout=5000",
+        "foreign_keys=ON",
+    ):
+        schema_editor.execute(f"PRAGMA {pragma}")
+
+
+def desactivar_wal(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    for pragma in (
+        "journal_mode=DELETE",
+        "synchronous=FULL",
+        "busy_timeout=0",
+        "foreign_keys=OFF",
+    ):
+        schema_editor.execute(f"PRAGMA {pragma}")
+
+
 class Migration(migrations.Migration):
 
     initial = True
@@ -10,8 +37,5 @@ class Migration(migrations.Migration):
     atomic = False
 
     operations = [
-        migrations.RunSQL(
-            sql="PRAGMA journal_mode=WAL; PRAGMA synchronous=normal; PRAGMA busy_timeout=5000; PRAGMA foreign_keys=ON;",
-            reverse_sql="PRAGMA journal_mode=DELETE; PRAGMA synchronous=FULL; PRAGMA busy_timeout=0; PRAGMA foreign_keys=OFF;",
-        ),
+        migrations.RunPython(activar_wal, desactivar_wal),
     ]
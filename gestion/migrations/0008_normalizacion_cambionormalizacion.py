@@ -0,0 +1,78 @@
+# Generated by Django 5.2.7 on 2026-10-19 16:47
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("gestion", "0007_colaborador_telefono"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Normalizacion",
+            fields=[
+                (
+                    "id_normalizacion",
+                    models.AutoField(primary_key=True, serialize=False),
+                ),
+                ("campo", models.CharField(max_length=32)),
+                (
+                    "reemplazo",
+                    models.CharField(max_length=128, verbose_name="Valor de reemplazo"),
+                ),
+                ("usuario", models.CharField(max_length=150)),
+                ("fecha", models.DateTimeField(auto_now_add=True)),
+                (
+                    "fecha_deshecha",
+                    models.DateTimeField(
+                        blank=True,
+                        default=None,
+                        null=True,
+                        verbose_name="Fecha de deshacer",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Normalización",
+                "verbose_name_plural": "Normalizaciones",
+                "ordering": ["-fecha"],
+            },
+        ),
+        migrations.AlterField(
+            model_name="colaborador",
+            name="telefono",
+            field=models.CharField(
+                blank=True, max_length=16, null=True, verbose_name="Teléfono"
+            ),
+        ),
+        migrations.CreateModel(
+            name="CambioNormalizacion",
+            fields=[
+                ("id_cambio", models.BigAutoField(primary_key=True, serialize=False)),
+                ("valor_anterior", models.CharField(max_length=128, null=True)),
+                (
+                    "participante",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="gestion.participante",
+                    ),
+                ),
+                (
+                    "normalizacion",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="cambios",
+                        to="gestion.normalizacion",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Cambio de normalización",
+                "verbose_name_plural": "Cambios de normalización",
+            },
+        ),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 5.2.7 on 2026-10-19 16:50
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("gestion", "0008_normalizacion_cambionormalizacion"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CorreoPendiente",
+            fields=[
+                ("id_correo", models.BigAutoField(primary_key=True, serialize=False)),
+                (
+                    "tipo",
+                    models.CharField(
+                        choices=[("CONFIRMACION", "Confirmación plaza")], max_length=50
+                    ),
+                ),
+                (
+                    "fecha_creacion",
+                    models.DateTimeField(
+                        auto_now_add=True, verbose_name="Fecha de creación"
+                    ),
+                ),
+                (
+                    "fecha_envio",
+                    models.DateTimeField(
+                        blank=True,
+                        default=None,
+                        null=True,
+                        verbose_name="Fecha de envío",
+                    ),
+                ),
+                ("intentos", models.PositiveSmallIntegerField(default=0)),
+                (
+                    "error",
+                    models.TextField(
+                        blank=True, default=None, max_length=4096, null=True
+                    ),
+                ),
+                (
+                    "persona",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="correos_pendientes",
+                        to="gestion.persona",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Correo pendiente",
+                "verbose_name_plural": "Correos pendientes",
+                "ordering": ["fecha_creacion"],
+                "indexes": [
+                    models.Index(
+                        fields=["fecha_envio", "fecha_creacion"],
+                        name="gestion_cor_fecha_e_d6a404_idx",
+                    )
+                ],
+            },
+        ),
+    ]
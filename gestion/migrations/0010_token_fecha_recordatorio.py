@@ -0,0 +1,35 @@
+# Generated by Django 5.2.7 on 2026-10-19 16:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("gestion", "0009_correopendiente"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="token",
+            name="fecha_recordatorio",
+            field=models.DateTimeField(
+                blank=True,
+                default=None,
+                null=True,
+                verbose_name="Fecha del recordatorio de expiración",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="correopendiente",
+            name="tipo",
+            field=models.CharField(
+                choices=[
+                    ("CONFIRMACION", "Confirmación plaza"),
+                    ("RECORDATORIO_VERIFICACION", "Recordatorio verificación correo"),
+                    ("RECORDATORIO_CONFIRMACION", "Recordatorio confirmación plaza"),
+                ],
+                max_length=50,
+            ),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.7 on 2026-10-19 17:02
+
+import django.core.validators
+import gestion.models
+import gestion.subidas
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("gestion", "0010_token_fecha_recordatorio"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="persona",
+            name="cv_sha256",
+            field=models.CharField(
+                blank=True,
+                db_index=True,
+                editable=False,
+                max_length=64,
+                null=True,
+                verbose_name="SHA-256 del CV",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="persona",
+            name="cv",
+            field=models.FileField(
+                null=True,
+                storage=gestion.subidas.almacen_cv,
+                upload_to=gestion.models.ruta_cv,
+                validators=[
+                    django.core.validators.FileExtensionValidator(["pdf"]),
+                    gestion.models.validador_pdf,
+                ],
+                verbose_name="CV",
+            ),
+        ),
+    ]
@@ -0,0 +1,72 @@
+# Generated by Django 5.2.7 on 2026-10-19 17:06
+
+import logging
+
+from django.db import OperationalError, migrations, models, transaction
+
+logger = logging.getLogger(__name__)
+
+
+# Índice de búsqueda de gestion/busqueda.py. Solo existe con SQLite compilado con FTS5;
+# sin él (y con otras bases de datos) la búsqueda usa `icontains`.
+def crear_indice(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    try:
+        with transaction.atomic(using=schema_editor.connection.alias):
+            schema_editor.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS gestion_busqueda USING fts5("
+                "correo UNINDEXED, cv_sha256 UNINDEXED, motivacion, cv, "
+                "tokenize = 'unicode61 remove_diacritics 2')"
+            )
+    except OperationalError as error:
+        # "no such module: fts5"
+        logger.warning(f"No se crea el índice de búsqueda: {error}")
+
+
+def borrar_indice(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    schema_editor.execute("DROP TABLE IF EXISTS gestion_busqueda")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("gestion", "0011_persona_cv_sha256"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TextoCV",
+            fields=[
+                (
+                    "sha256",
+                    models.CharField(
+                        max_length=64,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="SHA-256",
+                    ),
+                ),
+                ("texto", models.TextField(blank=True, default="")),
+                (
+                    "fecha_extraccion",
+                    models.DateTimeField(
+                        auto_now=True, verbose_name="Fecha de extracción"
+                    ),
+                ),
+                (
+                    "error",
+                    models.TextField(
+                        blank=True, default=None, max_length=4096, null=True
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Texto de CV",
+                "verbose_name_plural": "Textos de CV",
+            },
+        ),
+        migrations.RunPython(crear_indice, borrar_indice),
+    ]
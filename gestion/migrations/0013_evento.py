@@ -0,0 +1,104 @@
+# Generated by Django 5.2.7 on 2026-10-19 17:38
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+# Eventos de lo ocurrido antes de esta migración, a partir de las fechas de cada Persona
+# y de sus pases y presencias (sin usuario, que no se guardaba).
+ESTADOS = {
+    "REGISTRO": "fecha_registro",
+    "VERIFICACION": "fecha_verificacion_correo",
+    "ACEPTACION": "fecha_aceptacion",
+    "CONFIRMACION": "fecha_confirmacion_plaza",
+    "RECHAZO": "fecha_rechazo_plaza",
+}
+
+
+def eventos_anteriores(apps, schema_editor):
+    consultas = [
+        "INSERT INTO gestion_evento (persona_id, tipo, fecha, usuario, detalle) "
+        f"SELECT correo, '{tipo}', {campo}, '', '' FROM gestion_persona "
+        f"WHERE {campo} IS NOT NULL"
+        for tipo, campo in ESTADOS.items()
+    ]
+    consultas.append(
+        "INSERT INTO gestion_evento (persona_id, tipo, fecha, usuario, detalle) "
+        "SELECT p.persona_id, 'PASE', p.fecha, '', SUBSTR(t.nombre, 1, 128) "
+        "FROM gestion_pase p JOIN gestion_tipopase t ON t.id_tipo_pase = p.tipo_pase_id"
+    )
+    consultas.extend(
+        "INSERT INTO gestion_evento (persona_id, tipo, fecha, usuario, detalle) "
+        f"SELECT persona_id, '{tipo}', {campo}, '', '' FROM gestion_presencia "
+        f"WHERE {campo} IS NOT NULL"
+        for tipo, campo in (("ENTRADA", "entrada"), ("SALIDA", "salida"))
+    )
+    for consulta in consultas:
+        schema_editor.execute(consulta)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("gestion", "0012_textocv"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Evento",
+            fields=[
+                ("id_evento", models.BigAutoField(primary_key=True, serialize=False)),
+                (
+                    "tipo",
+                    models.CharField(
+                        choices=[
+                            ("REGISTRO", "Registro"),
+                            ("VERIFICACION", "Verificación correo"),
+                            ("ACEPTACION", "Aceptación"),
+                            ("CONFIRMACION", "Confirmación plaza"),
+                            ("RECHAZO", "Rechazo plaza"),
+                            ("ACREDITACION", "Asignación de acreditación"),
+                            ("PASE", "Pase"),
+                            ("ENTRADA", "Entrada"),
+                            ("SALIDA", "Salida"),
+                            ("NORMALIZACION", "Normalización"),
+                            ("NORMALIZACION_DESHECHA", "Normalización deshecha"),
+                        ],
+                        max_length=24,
+                    ),
+                ),
+                ("fecha", models.DateTimeField(default=django.utils.timezone.now)),
+                (
+                    "usuario",
+                    models.CharField(blank=True, default="", max_length=150),
+                ),
+                (
+                    "detalle",
+                    models.CharField(blank=True, default="", max_length=128),
+                ),
+                (
+                    "persona",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="eventos",
+                        to="gestion.persona",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Evento",
+                "verbose_name_plural": "Eventos",
+                "ordering": ["-fecha"],
+                "indexes": [
+                    models.Index(
+                        fields=["persona", "fecha"],
+                        name="gestion_eve_persona_a8cd70_idx",
+                    ),
+                    models.Index(
+                        fields=["tipo", "fecha"], name="gestion_eve_tipo_b3f522_idx"
+                    ),
+                ],
+            },
+        ),
+        migrations.RunPython(eventos_anteriores, migrations.RunPython.noop),
+    ]
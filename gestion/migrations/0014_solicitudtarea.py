@@ -0,0 +1,31 @@
+# Generated by Django 5.2.7 on 2026-10-19 18:01
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("gestion", "0013_evento"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SolicitudTarea",
+            fields=[
+                (
+                    "nombre",
+                    models.CharField(max_length=64, primary_key=True, serialize=False),
+                ),
+                (
+                    "fecha_solicitud",
+                    models.DateTimeField(default=django.utils.timezone.now),
+                ),
+            ],
+            options={
+                "verbose_name": "Solicitud de tarea",
+                "verbose_name_plural": "Solicitudes de tareas",
+            },
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.7 on 2026-10-19 19:12
+
+import uuid
+
+from django.db import migrations, models
+
+
+def generar_referencias(apps, schema_editor):
+    # Un valor distinto por fila: el valor por defecto de AddField sería el mismo para todas
+    Persona = apps.get_model("gestion", "Persona")
+    personas = list(Persona.objects.only("pk"))
+    for persona in personas:
+        persona.referencia = uuid.uuid4()
+    Persona.objects.bulk_update(personas, ["referencia"], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("gestion", "0014_solicitudtarea"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="persona",
+            name="referencia",
+            field=models.UUIDField(editable=False, null=True),
+        ),
+        migrations.RunPython(generar_referencias, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="persona",
+            name="referencia",
+            field=models.UUIDField(
+                default=uuid.uuid4,
+                editable=False,
+                unique=True,
+                verbose_name="Referencia",
+            ),
+        ),
+    ]
@@ -3,12 +3,22 @@
 import logging
 from uuid import uuid4
 
+from django.conf import settings
 from django.contrib import admin
 from django.core.exceptions import ValidationError
 from django.core.validators import FileExtensionValidator
 from django.db import models
 from django.utils import timezone
 
+from gestion.subidas import (
+    MARGEN_PDF,
+    almacen_cv,
+    es_cabecera_pdf,
+    es_final_pdf,
+    ruta_sha256,
+    sha256_archivo,
+)
+
 logger = logging.getLogger(__name__)
 
 GENEROS = (
@@ -42,14 +52,53 @@ TIPOS_TOKEN = (
     ("CONFIRMACION", "Confirmación plaza"),
 )
 
+TIPOS_CORREO_PENDIENTE = (
+    ("CONFIRMACION", "Confirmación plaza"),
+    ("RECORDATORIO_VERIFICACION", "Recordatorio verificación correo"),
+    ("RECORDATORIO_CONFIRMACION", "Recordatorio confirmación plaza"),
+)
+
+
+TIPOS_EVENTO = (
+    ("REGISTRO", "Registro"),
+    ("VERIFICACION", "Verificación correo"),
+    ("ACEPTACION", "Aceptación"),
+    ("CONFIRMACION", "Confirmación plaza"),
+    ("RECHAZO", "Rechazo plaza"),
+    ("ACREDITACION", "Asignación de acreditación"),
+    ("PASE", "Pase"),
+    ("ENTRADA", "Entrada"),
+    ("SALIDA", "Salida"),
+    ("NORMALIZACION", "Normalización"),
+    ("NORMALIZACION_DESHECHA", "Normalización deshecha"),
+)
+
 
 def ruta_cv(instance, filename):
-    correo = instance.correo.replace("@", "-").replace(".", "-")
-    return f"cv/{instance.dni}_{correo}.pdf"
+    # El resumen se calcula al subir el archivo (`CVUploadHandler`) y, si no, aquí.
+    # `cv_sha256` va después de `cv` para guardarse ya actualizado.
+    archivo = instance.cv.file
+    instance.cv_sha256 = getattr(archivo, "sha256", None) or sha256_archivo(archivo)
+    return ruta_sha256(instance.cv_sha256)
 
 
 def validador_pdf(value):
-    if value.file.content_type != "application/pdf":
+    # Los archivos ya guardados se comprobaron al subirlos
+    if getattr(value, "_committed", False):
+        return
+
+    # El tipo indicado por el navegador no es fiable: se comprueba el contenido
+    es_pdf = getattr(value.file, "es_pdf", None)
+    if es_pdf is None:
+        posicion = value.file.tell()
+        value.file.seek(0)
+        cabecera = value.file.read(MARGEN_PDF)
+        value.file.seek(max(0, value.size - MARGEN_PDF))
+        final = value.file.read(MARGEN_PDF)
+        value.file.seek(posicion)
+        es_pdf = es_cabecera_pdf(cabecera) and es_final_pdf(final)
+
+    if not es_pdf:
         logger.debug(f"Se ha subido un CV inválido (no es un PDF).")
         raise ValidationError("El archivo no es un PDF")
 
@@ -124,6 +173,10 @@ class Colaborador(PersonaAbstracta):
 
 class Persona(PersonaAbstracta):
     dni = models.CharField(max_length=9, unique=True, null=False, verbose_name="DNI")
+    # Identifica a la Persona en los enlaces firmados sin incluir su correo
+    referencia = models.UUIDField(
+        default=uuid4, unique=True, editable=False, verbose_name="Referencia"
+    )
     genero = models.CharField(
         max_length=10, choices=GENEROS, null=False, verbose_name="Género"
     )
@@ -136,10 +189,19 @@ class Persona(PersonaAbstracta):
 
     cv = models.FileField(
         upload_to=ruta_cv,
+        storage=almacen_cv,
         null=True,
         validators=[FileExtensionValidator(["pdf"]), validador_pdf],
         verbose_name="CV",
     )
+    cv_sha256 = models.CharField(
+        max_length=64,
+        null=True,
+        blank=True,
+        editable=False,
+        db_index=True,
+        verbose_name="SHA-256 del CV",
+    )
     compartir_cv = models.BooleanField(
         default=False, verbose_name="Autoriza a compartir el CV"
     )
@@ -368,6 +430,12 @@ class Token(models.Model):
     fecha_uso = models.DateTimeField(
         null=True, blank=True, default=None, verbose_name="Fecha de uso"
     )
+    fecha_recordatorio = models.DateTimeField(
+        null=True,
+        blank=True,
+        default=None,
+        verbose_name="Fecha del recordatorio de expiración",
+    )
 
     @admin.display(boolean=True, ordering="fecha_creacion", description="Usado")
     def usado(self):
@@ -377,5 +445,143 @@ class Token(models.Model):
     def valido(self):
         return self.fecha_expiracion > timezone.now() and not self.usado()
 
+    def enlace(self) -> str:
+        """Valor del Token en los enlaces: firmado si `TOKENS_FIRMADOS` o el UUID."""
+        if settings.TOKENS_FIRMADOS:
+            from gestion.tokens import firmar
+
+            return firmar(self)
+        return str(self.token)
+
     def __str__(self):
         return f"Token de {self.tipo.capitalize()} de {self.persona.nombre}"
+
+
+class Normalizacion(models.Model):
+    id_normalizacion = models.AutoField(primary_key=True)
+    campo = models.CharField(max_length=32)
+    reemplazo = models.CharField(max_length=128, verbose_name="Valor de reemplazo")
+    usuario = models.CharField(max_length=150)
+    fecha = models.DateTimeField(auto_now_add=True)
+    fecha_deshecha = models.DateTimeField(
+        null=True, blank=True, default=None, verbose_name="Fecha de deshacer"
+    )
+
+    class Meta:
+        verbose_name = "Normalización"
+        verbose_name_plural = "Normalizaciones"
+        ordering = ["-fecha"]
+
+    def __str__(self):
+        return f"{self.campo} -> '{self.reemplazo}' ({self.fecha})"
+
+
+class CambioNormalizacion(models.Model):
+    """Valor anterior de un Participante modificado por una Normalizacion."""
+
+    id_cambio = models.BigAutoField(primary_key=True)
+    normalizacion = models.ForeignKey(
+        Normalizacion, on_delete=models.CASCADE, related_name="cambios"
+    )
+    participante = models.ForeignKey(
+        Participante, on_delete=models.CASCADE, related_name="+"
+    )
+    valor_anterior = models.CharField(max_length=128, null=True)
+
+    class Meta:
+        verbose_name = "Cambio de normalización"
+        verbose_name_plural = "Cambios de normalización"
+
+
+class CorreoPendiente(models.Model):
+    """Correo encolado para enviarse en segundo plano respetando el límite de envío."""
+
+    id_correo = models.BigAutoField(primary_key=True)
+    persona = models.ForeignKey(
+        Persona, on_delete=models.CASCADE, related_name="correos_pendientes"
+    )
+    tipo = models.CharField(max_length=50, choices=TIPOS_CORREO_PENDIENTE)
+    fecha_creacion = models.DateTimeField(
+        auto_now_add=True, verbose_name="Fecha de creación"
+    )
+    fecha_envio = models.DateTimeField(
+        null=True, blank=True, default=None, verbose_name="Fecha de envío"
+    )
+    intentos = models.PositiveSmallIntegerField(default=0)
+    error = models.TextField(max_length=4096, null=True, blank=True, default=None)
+
+    class Meta:
+        verbose_name = "Correo pendiente"
+        verbose_name_plural = "Correos pendientes"
+        ordering = ["fecha_creacion"]
+
+        indexes = [models.Index(fields=["fecha_envio", "fecha_creacion"])]
+
+    def __str__(self):
+        return f"Correo de {self.tipo.capitalize()} a {self.persona_id}"
+
+
+class TextoCV(models.Model):
+    """Texto extraído de un CV para la búsqueda, por el SHA-256 de su contenido (`Persona.cv_sha256`)."""
+
+    sha256 = models.CharField(max_length=64, primary_key=True, verbose_name="SHA-256")
+    texto = models.TextField(blank=True, default="")
+    fecha_extraccion = models.DateTimeField(
+        auto_now=True, verbose_name="Fecha de extracción"
+    )
+    error = models.TextField(max_length=4096, null=True, blank=True, default=None)
+
+    class Meta:
+        verbose_name = "Texto de CV"
+        verbose_name_plural = "Textos de CV"
+
+    def __str__(self):
+        return f"Texto del CV {self.sha256}"
+
+
+class Evento(models.Model):
+    """
+    Cambio de estado de una Persona (gestion/eventos.py). Solo se añaden filas: es el
+    historial de las transiciones, también de las que se deshacen después.
+    """
+
+    id_evento = models.BigAutoField(primary_key=True)
+    persona = models.ForeignKey(
+        Persona, on_delete=models.CASCADE, related_name="eventos"
+    )
+    tipo = models.CharField(max_length=24, choices=TIPOS_EVENTO)
+    fecha = models.DateTimeField(default=timezone.now)
+    # Usuario de gestión que hizo el cambio; vacío si fue la propia persona o una tarea
+    usuario = models.CharField(max_length=150, blank=True, default="")
+    # Acreditación, tipo de pase, normalización...
+    detalle = models.CharField(max_length=128, blank=True, default="")
+
+    class Meta:
+        verbose_name = "Evento"
+        verbose_name_plural = "Eventos"
+        ordering = ["-fecha"]
+
+        indexes = [
+            models.Index(fields=["persona", "fecha"]),
+            models.Index(fields=["tipo", "fecha"]),
+        ]
+
+    def __str__(self):
+        return f"{self.get_tipo_display()} de {self.persona_id} ({self.fecha})"
+
+
+class SolicitudTarea(models.Model):
+    """
+    Ejecución de una tarea periódica (gestion/tareas.py) pedida desde una petición, para
+    que la haga el proceso de las tareas sin esperar a su intervalo. Una fila por tarea.
+    """
+
+    nombre = models.CharField(max_length=64, primary_key=True)
+    fecha_solicitud = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name = "Solicitud de tarea"
+        verbose_name_plural = "Solicitudes de tareas"
+
+    def __str__(self):
+        return f"Tarea {self.nombre} solicitada ({self.fecha_solicitud})"
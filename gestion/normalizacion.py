@@ -0,0 +1,331 @@
+# Copyright (C) 2025-now  p.fernandezf <p@fernandezf.es> & iago.rivas <delthia@delthia.com>
+
+import logging, re, unicodedata
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from gestion.eventos import registrar_lote
+from gestion.models import CambioNormalizacion, Normalizacion, Participante
+
+logger = logging.getLogger(__name__)
+
+CAMPOS_NORMALIZABLES = ("nombre_estudio", "centro_estudio", "curso", "ciudad")
+
+# Palabras ignoradas al construir acrónimos ("Facultade de Informática da Coruña" -> "fic")
+PALABRAS_VACIAS = frozenset(
+    (
+        "a",
+        "da",
+        "das",
+        "de",
+        "del",
+        "do",
+        "dos",
+        "e",
+        "el",
+        "en",
+        "la",
+        "las",
+        "los",
+        "y",
+    )
+)
+
+TAMANO_NGRAMA = 3
+
+
+def clave_normalizada(valor: str) -> str:
+    """
+    Clave de comparación de un valor: sin mayúsculas, tildes, signos de puntuación
+    ni espacios repetidos.
+    """
+    descompuesto = unicodedata.normalize("NFKD", valor.casefold())
+    sin_tildes = "".join(c for c in descompuesto if not unicodedata.combining(c))
+    return " ".join(re.sub(r"[^\w\s]", " ", sin_tildes).split())
+
+
+def ngramas(clave: str) -> frozenset[str]:
+    relleno = f" {clave} "
+    return frozenset(
+        relleno[i : i + TAMANO_NGRAMA]
+        for i in range(max(1, len(relleno) - TAMANO_NGRAMA + 1))
+    )
+
+
+def acronimo(clave: str) -> str | None:
+    palabras = [p for p in clave.split() if p not in PALABRAS_VACIAS]
+    if len(palabras) < 2:
+        return None
+    return "".join(p[0] for p in palabras)
+
+
+class _Conjuntos:
+    """Union-find sobre índices enteros."""
+
+    def __init__(self, n: int):
+        self.padre = list(range(n))
+
+    def raiz(self, i: int) -> int:
+        while self.padre[i] != i:
+            self.padre[i] = self.padre[self.padre[i]]
+            i = self.padre[i]
+        return i
+
+    def unir(self, i: int, j: int):
+        ri, rj = self.raiz(i), self.raiz(j)
+        if ri != rj:
+            self.padre[max(ri, rj)] = min(ri, rj)
+
+
+def agrupar_valores(
+    frecuencias: dict[str, int], umbral: float | None = None
+) -> list[dict]:
+    """
+    Agrupa valores equivalentes de un campo.
+
+    Dos valores pertenecen al mismo grupo si comparten clave normalizada, si
+    la similitud (Dice) de sus n-gramas supera el umbral o si uno es el
+    acrónimo del otro. Para no comparar todos los pares, solo se comparan
+    las claves que comparten algún n-grama poco frecuente (índice de bloqueo).
+
+    Argumentos:
+        frecuencias: Número de apariciones de cada valor distinto.
+        umbral: Similitud mínima entre 0 y 1 (Opcional).
+
+    Salida:
+        Lista de grupos con más de un valor, ordenada por número de apariciones.
+        Cada grupo es un diccionario con `valores` (lista de `(valor, apariciones)`),
+        `propuesta` (valor más frecuente) y `total`.
+    """
+    if umbral is None:
+        umbral = settings.NORMALIZACION_UMBRAL_SIMILITUD
+
+    # 1. Agrupar por clave normalizada
+    valores_por_clave = defaultdict(list)
+    for valor, n in frecuencias.items():
+        if valor is None or not str(valor).strip():
+            continue
+        valores_por_clave[clave_normalizada(str(valor))].append((valor, n))
+
+    claves = list(valores_por_clave)
+    conjuntos = _Conjuntos(len(claves))
+    gramas = [ngramas(clave) for clave in claves]
+
+    # 2. Índice de bloqueo: n-grama -> claves que lo contienen.
+    # Los n-gramas muy frecuentes (" de", "de ") no discriminan y se descartan.
+    indice = defaultdict(list)
+    for i, conjunto in enumerate(gramas):
+        for grama in conjunto:
+            indice[grama].append(i)
+    maximo_bloque = max(50, len(claves) // 20)
+
+    for i, conjunto in enumerate(gramas):
+        compartidos = defaultdict(int)
+        for grama in conjunto:
+            bloque = indice[grama]
+            if len(bloque) > maximo_bloque:
+                continue
+            for j in bloque:
+                if j > i:
+                    compartidos[j] += 1
+
+        for j, n in compartidos.items():
+            # Descarte rápido si comparten pocos n-gramas discriminantes; evita
+            # calcular la intersección completa en la mayoría de los casos
+            if 2 * n / (len(conjunto) + len(gramas[j])) < umbral / 2:
+                continue
+            comun = len(conjunto & gramas[j])
+            if 2 * comun / (len(conjunto) + len(gramas[j])) >= umbral:
+                conjuntos.unir(i, j)
+
+    # 3. Acrónimos contra claves de una sola palabra
+    por_acronimo = defaultdict(list)
+    for i, clave in enumerate(claves):
+        siglas = acronimo(clave)
+        if siglas and len(siglas) >= 2:
+            por_acronimo[siglas].append(i)
+    for i, clave in enumerate(claves):
+        for j in por_acronimo.get(clave, ()):
+            conjuntos.unir(i, j)
+
+    grupos = defaultdict(list)
+    for i, clave in enumerate(claves):
+        grupos[conjuntos.raiz(i)].extend(valores_por_clave[clave])
+
+    resultado = []
+    for valores in grupos.values():
+        if len(valores) < 2:
+            continue
+        valores.sort(key=lambda v: (-v[1], str(v[0])))
+        resultado.append(
+            {
+                "valores": valores,
+                "propuesta": valores[0][0],
+                "total": sum(n for _valor, n in valores),
+            }
+        )
+
+    resultado.sort(key=lambda g: (-g["total"], str(g["propuesta"])))
+    return resultado
+
+
+def frecuencias_campo(campo: str) -> dict[str, int]:
+    return dict(
+        Participante.objects.order_by()
+        .values(campo)
+        .annotate(n=Count("pk"))
+        .values_list(campo, "n")
+    )
+
+
+def _clave_cache(campo: str) -> str:
+    # La caché es local a cada proceso de gunicorn: la versión en la clave (normalizaciones
+    # aplicadas y deshechas del campo) la consulta cada proceso en la base de datos, así
+    # que ninguno propone grupos de antes de una normalización hecha en otro.
+    version = Normalizacion.objects.filter(campo=campo).aggregate(
+        aplicadas=Count("pk"), deshechas=Count("fecha_deshecha")
+    )
+    return f"normalizacion:grupos:{campo}:{version['aplicadas']}:{version['deshechas']}"
+
+
+def grupos_campo(campo: str) -> list[dict]:
+    """
+    Grupos propuestos para un campo de Participante. Se cachean por campo
+    hasta que se normaliza el campo (en cualquier proceso) o expira
+    `NORMALIZACION_CACHE_TTL`.
+    """
+    if campo not in CAMPOS_NORMALIZABLES:
+        raise ValueError(f"El campo '{campo}' no es normalizable")
+
+    clave = _clave_cache(campo)
+    grupos = cache.get(clave)
+    if grupos is None:
+        grupos = agrupar_valores(frecuencias_campo(campo))
+        cache.set(clave, grupos, settings.NORMALIZACION_CACHE_TTL)
+        logger.debug(f"Calculados {len(grupos)} grupos de normalización de {campo}")
+
+    return grupos
+
+
+def aplicar_normalizacion(
+    campo: str, originales: list[str], reemplazo: str, usuario: str
+) -> Normalizacion:
+    """
+    Sustituye los valores originales de un campo por el reemplazo, guardando
+    el valor anterior de cada Participante modificado para poder deshacerlo.
+
+    Argumentos:
+        campo: Campo de Participante a normalizar.
+        originales: Valores a sustituir.
+        reemplazo: Valor que sustituye a los originales.
+        usuario: Nombre del usuario que realiza la normalización.
+
+    Salida:
+        La `Normalizacion` creada.
+    """
+    if campo not in CAMPOS_NORMALIZABLES:
+        raise ValueError(f"El campo '{campo}' no es normalizable")
+
+    lote = settings.NORMALIZACION_TAMANO_LOTE
+
+    with transaction.atomic():
+        afectados = list(
+            Participante.objects.filter(**{f"{campo}__in": originales})
+            .exclude(**{campo: reemplazo})
+            .order_by()
+            .values_list("pk", campo)
+        )
+
+        normalizacion = Normalizacion.objects.create(
+            campo=campo, reemplazo=reemplazo, usuario=usuario
+        )
+        CambioNormalizacion.objects.bulk_create(
+            (
+                CambioNormalizacion(
+                    normalizacion=normalizacion,
+                    participante_id=pk,
+                    valor_anterior=anterior,
+                )
+                for pk, anterior in afectados
+            ),
+            batch_size=lote,
+        )
+
+        # Actualizar por clave primaria para modificar exactamente las filas registradas
+        for i in range(0, len(afectados), lote):
+            Participante.objects.filter(
+                pk__in=[pk for pk, _anterior in afectados[i : i + lote]]
+            ).update(**{campo: reemplazo})
+
+        registrar_lote(
+            (pk for pk, _anterior in afectados),
+            "NORMALIZACION",
+            usuario=usuario,
+            detalle=f"{normalizacion.pk} {campo}: {reemplazo}",
+            fecha=normalizacion.fecha,
+        )
+
+    logger.info(
+        f"Normalización {normalizacion.pk} de {campo} por {usuario}: {len(originales)} valores sustituidos por '{reemplazo}' en {len(afectados)} participantes"
+    )
+    return normalizacion
+
+
+def deshacer_normalizacion(normalizacion: Normalizacion, usuario: str) -> int:
+    """
+    Restaura los valores anteriores a una normalización.
+    Los Participantes cuyo valor se modificó después de la normalización no se restauran.
+
+    Argumentos:
+        normalizacion: `Normalizacion` a deshacer.
+        usuario: Nombre del usuario que la deshace.
+
+    Salida:
+        Número de participantes restaurados.
+    """
+    campo = normalizacion.campo
+
+    with transaction.atomic():
+        # Marcarla como deshecha solo si nadie lo hizo antes, en la misma transacción,
+        # para que dos peticiones simultáneas no la deshagan las dos
+        fecha = timezone.now()
+        marcadas = Normalizacion.objects.filter(
+            pk=normalizacion.pk, fecha_deshecha__isnull=True
+        ).update(fecha_deshecha=fecha)
+        if not marcadas:
+            raise ValueError("La normalización ya se había deshecho")
+        normalizacion.fecha_deshecha = fecha
+
+        actuales = set(
+            Participante.objects.filter(**{campo: normalizacion.reemplazo})
+            .order_by()
+            .values_list("pk", flat=True)
+        )
+        restaurados = [
+            Participante(pk=pk, **{campo: anterior})
+            for pk, anterior in normalizacion.cambios.values_list(
+                "participante_id", "valor_anterior"
+            )
+            if pk in actuales
+        ]
+        Participante.objects.bulk_update(
+            restaurados, [campo], batch_size=settings.NORMALIZACION_TAMANO_LOTE
+        )
+
+        registrar_lote(
+            (participante.pk for participante in restaurados),
+            "NORMALIZACION_DESHECHA",
+            usuario=usuario,
+            detalle=f"{normalizacion.pk} {campo}",
+            fecha=normalizacion.fecha_deshecha,
+        )
+
+    logger.info(
+        f"Normalización {normalizacion.pk} de {campo} deshecha por {usuario}: {len(restaurados)} participantes restaurados"
+    )
+    return len(restaurados)
@@ -0,0 +1,205 @@
+# Copyright (C) 2025-now  p.fernandezf <p@fernandezf.es> & iago.rivas <delthia@delthia.com>
+
+import logging
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Case, Count, Max, Q, Value, When
+from django.utils import timezone
+
+from gestion.models import (
+    NIVELES_ESTUDIO,
+    TALLAS_CAMISETA,
+    Colaborador,
+    Evento,
+    Participante,
+    Persona,
+    Presencia,
+    RestriccionAlimentaria,
+    TipoPase,
+)
+
+logger = logging.getLogger(__name__)
+
+# Resumen del índice de gestión: el embudo de estados por tipo de persona, las tallas de
+# camiseta, las restricciones alimentarias para el catering, los niveles de estudio y
+# los pases usados. Cada bloque es una consulta agrupada y el resultado se cachea
+# durante `PANEL_CACHE_TTL`. La caché es local a cada proceso de gunicorn: la clave
+# incluye el último Evento (`gestion.eventos`), que cada proceso consulta en la base de
+# datos, así que ninguno sirve los datos de antes de un cambio de estado hecho en otro.
+
+CLAVE_CACHE = "panel:datos"
+
+# Personas con plaza: aceptadas sin rechazo y, de ellas, las que la confirmaron
+CON_PLAZA = Q(fecha_aceptacion__isnull=False, fecha_rechazo_plaza__isnull=True)
+CONFIRMADAS = CON_PLAZA & Q(fecha_confirmacion_plaza__isnull=False)
+
+
+def embudo() -> dict[str, dict[str, int]]:
+    """Personas en cada estado (acumulado, como en el README) por participantes y mentores."""
+    filas = (
+        Persona.objects.order_by()
+        .annotate(
+            tipo=Case(
+                When(participante__isnull=False, then=Value("participantes")),
+                default=Value("mentores"),
+            )
+        )
+        .values("tipo")
+        .annotate(
+            registradas=Count("pk"),
+            error_correo=Count(
+                "pk",
+                filter=Q(
+                    motivo_error_correo_verificacion__isnull=False,
+                    fecha_verificacion_correo__isnull=True,
+                ),
+            ),
+            verificadas=Count("pk", filter=Q(fecha_verificacion_correo__isnull=False)),
+            aceptadas=Count("pk", filter=Q(fecha_aceptacion__isnull=False)),
+            pendientes=Count(
+                "pk", filter=CON_PLAZA & Q(fecha_confirmacion_plaza__isnull=True)
+            ),
+            confirmadas=Count("pk", filter=CONFIRMADAS),
+            rechazadas=Count("pk", filter=Q(fecha_rechazo_plaza__isnull=False)),
+            acreditadas=Count("pk", filter=Q(acreditacion__isnull=False)),
+        )
+    )
+    return {fila.pop("tipo"): fila for fila in filas}
+
+
+def tallas() -> list[dict]:
+    """Camisetas por talla de las personas con plaza y de las que la confirmaron."""
+    totales = {
+        fila["talla_camiseta"]: fila
+        for fila in Persona.objects.order_by()
+        .filter(CON_PLAZA)
+        .values("talla_camiseta")
+        .annotate(
+            con_plaza=Count("pk"),
+            confirmadas=Count("pk", filter=Q(fecha_confirmacion_plaza__isnull=False)),
+        )
+    }
+    return [
+        {
+            "talla": talla,
+            "con_plaza": totales.get(talla, {}).get("con_plaza", 0),
+            "confirmadas": totales.get(talla, {}).get("confirmadas", 0),
+        }
+        for talla, _nombre in TALLAS_CAMISETA
+        if talla
+    ]
+
+
+def restricciones() -> list[dict]:
+    """
+    Personas que confirmaron su plaza y colaboradores con cada restricción
+    alimentaria, sin las restricciones que no tiene nadie.
+    """
+    personas = dict(
+        Persona.restricciones_alimentarias.through.objects.order_by()
+        .filter(
+            persona__fecha_confirmacion_plaza__isnull=False,
+            persona__fecha_rechazo_plaza__isnull=True,
+        )
+        .values("restriccionalimentaria_id")
+        .annotate(n=Count("pk"))
+        .values_list("restriccionalimentaria_id", "n")
+    )
+    colaboradores = dict(
+        Colaborador.restricciones_alimentarias.through.objects.order_by()
+        .values("restriccionalimentaria_id")
+        .annotate(n=Count("pk"))
+        .values_list("restriccionalimentaria_id", "n")
+    )
+    return [
+        {
+            "nombre": restriccion.nombre,
+            "personas": personas.get(restriccion.pk, 0),
+            "colaboradores": colaboradores.get(restriccion.pk, 0),
+        }
+        for restriccion in RestriccionAlimentaria.objects.all()
+        if restriccion.pk in personas or restriccion.pk in colaboradores
+    ]
+
+
+def detalles_restricciones() -> list[tuple[str, int]]:
+    """Textos de los detalles de las restricciones (confirmadas y colaboradores), de más a menos repetido."""
+    con_detalle = Q(detalle_restricciones_alimentarias__isnull=False) & ~Q(
+        detalle_restricciones_alimentarias=""
+    )
+    textos = (
+        Persona.objects.order_by()
+        .filter(CONFIRMADAS & con_detalle)
+        .values_list("detalle_restricciones_alimentarias", flat=True)
+        .union(
+            Colaborador.objects.order_by()
+            .filter(con_detalle)
+            .values_list("detalle_restricciones_alimentarias", flat=True),
+            all=True,
+        )
+    )
+    return Counter(texto.strip() for texto in textos).most_common()
+
+
+def niveles_estudio() -> list[dict]:
+    """Participantes por nivel de estudios: registrados, con plaza y confirmados."""
+    totales = {
+        fila["nivel_estudio"]: fila
+        for fila in Participante.objects.order_by()
+        .values("nivel_estudio")
+        .annotate(
+            registradas=Count("pk"),
+            con_plaza=Count("pk", filter=CON_PLAZA),
+            confirmadas=Count("pk", filter=CONFIRMADAS),
+        )
+    }
+    vacio = {"registradas": 0, "con_plaza": 0, "confirmadas": 0}
+    return [
+        {"nivel": nombre, **{k: totales.get(nivel, vacio)[k] for k in vacio}}
+        for nivel, nombre in NIVELES_ESTUDIO
+        if nivel
+    ]
+
+
+def pases() -> list[dict]:
+    """Pases usados de cada tipo."""
+    return list(
+        TipoPase.objects.annotate(usados=Count("pases")).values(
+            "nombre", "inicio_validez", "usados"
+        )
+    )
+
+
+def calcular() -> dict:
+    """Datos del panel, sin caché."""
+    return {
+        "embudo": embudo(),
+        "dentro": Presencia.objects.filter(
+            entrada__isnull=False, salida__isnull=True
+        ).count(),
+        "tallas": tallas(),
+        "restricciones": restricciones(),
+        "detalles_restricciones": detalles_restricciones(),
+        "niveles_estudio": niveles_estudio(),
+        "pases": pases(),
+        "fecha": timezone.now(),
+    }
+
+
+def clave_cache() -> str:
+    """Clave de los datos cacheados, con el último Evento como versión."""
+    ultimo = Evento.objects.aggregate(ultimo=Max("id_evento"))["ultimo"] or 0
+    return f"{CLAVE_CACHE}:{ultimo}"
+
+
+def datos() -> dict:
+    """Datos del panel. Se cachean durante `PANEL_CACHE_TTL` o hasta el siguiente cambio de estado."""
+    clave = clave_cache()
+    resultado = cache.get(clave)
+    if resultado is None:
+        resultado = calcular()
+        cache.set(clave, resultado, settings.PANEL_CACHE_TTL)
+        logger.debug("Datos del panel de gestión calculados")
+    return resultado
@@ -0,0 +1,322 @@
+# Copyright (C) 2025-now  p.fernandezf <p@fernandezf.es> & iago.rivas <delthia@delthia.com>
+
+import logging, re, zlib
+
+logger = logging.getLogger(__name__)
+
+# Extracción aproximada del texto de un PDF, sin dependencias externas.
+# Cubre los PDF habituales de los CV (Word, LibreOffice, LaTeX, navegadores):
+# streams sin comprimir o con FlateDecode, streams de objetos y fuentes con
+# ToUnicode. Los PDF escaneados (solo imágenes) no tienen texto que extraer.
+
+_OBJETO = re.compile(rb"(\d+)\s+\d+\s+obj\b(.*?)\bendobj", re.S)
+_STREAM = re.compile(rb"\bstream\r?\n(.*?)\r?\n?endstream", re.S)
+_REFERENCIA = re.compile(rb"/([^\s/\[\]()<>]+)\s+(\d+)\s+\d+\s+R")
+_FUENTES = re.compile(rb"/Font\s*(?:<<(.*?)>>|(\d+)\s+\d+\s+R)", re.S)
+_TO_UNICODE = re.compile(rb"/ToUnicode\s+(\d+)\s+\d+\s+R")
+_BFCHAR = re.compile(rb"beginbfchar(.*?)endbfchar", re.S)
+_BFRANGE = re.compile(rb"beginbfrange(.*?)endbfrange", re.S)
+_HEX = re.compile(rb"<([0-9A-Fa-f\s]*)>")
+_RANGO = re.compile(
+    rb"<([0-9A-Fa-f]+)>\s*<([0-9A-Fa-f]+)>\s*(<[0-9A-Fa-f]+>|\[.*?\])", re.S
+)
+
+_ESCAPES = {
+    ord("n"): b"\n",
+    ord("r"): b"\r",
+    ord("t"): b"\t",
+    ord("b"): b"\b",
+    ord("f"): b"\f",
+    ord("("): b"(",
+    ord(")"): b")",
+    ord("\\"): b"\\",
+}
+_DELIMITADORES = b"()<>[]{}/%"
+_ESPACIOS = b" \t\r\n\f\x00"
+
+# Desplazamiento en un array TJ a partir del que se considera que hay un espacio
+_SEPARACION_TJ = 200
+
+# Bytes de todos los streams de un PDF que se procesan como mucho. Unos pocos KB
+# comprimidos pueden ocupar GB al descomprimirse: lo que pase de aquí se ignora.
+DESCOMPRIMIDO_MAXIMO = 16 * 1024 * 1024
+
+
+def _descomprimir(diccionario: bytes, datos: bytes, maximo: int) -> bytes | None:
+    """Datos de un stream, descomprimidos hasta `maximo` bytes (mayor que 0)."""
+    if b"/Image" in diccionario:
+        return None
+    if b"/FlateDecode" in diccionario or b"/Fl " in diccionario:
+        try:
+            return zlib.decompressobj().decompress(datos, maximo)
+        except zlib.error:
+            return None
+    if b"/Filter" in diccionario:
+        # Otros filtros que no contienen texto
+        return None
+    return datos[:maximo]
+
+
+def _objetos(contenido: bytes) -> dict[int, tuple[bytes, bytes | None]]:
+    """Diccionario y stream (descomprimido) de cada objeto, incluidos los de los streams de objetos."""
+    objetos = {}
+    restante = DESCOMPRIMIDO_MAXIMO
+    for coincidencia in _OBJETO.finditer(contenido):
+        numero, cuerpo = int(coincidencia.group(1)), coincidencia.group(2)
+        stream = _STREAM.search(cuerpo)
+        if not stream:
+            objetos[numero] = (cuerpo, None)
+            continue
+
+        diccionario = cuerpo[: stream.start()]
+        datos = None
+        if restante > 0:
+            datos = _descomprimir(diccionario, stream.group(1), restante)
+            restante -= len(datos or b"")
+            if restante <= 0:
+                logger.debug("PDF con demasiados datos: se ignora el resto de streams")
+        objetos[numero] = (diccionario, datos)
+
+    for diccionario, datos in list(objetos.values()):
+        if datos is None or b"/ObjStm" not in diccionario:
+            continue
+        primero = re.search(rb"/First\s+(\d+)", diccionario)
+        if not primero:
+            continue
+        primero = int(primero.group(1))
+        cabecera = [int(n) for n in datos[:primero].split()]
+        posiciones = list(zip(cabecera[::2], cabecera[1::2]))
+        for i, (numero, desplazamiento) in enumerate(posiciones):
+            fin = posiciones[i + 1][1] if i + 1 < len(posiciones) else None
+            inicio = primero + desplazamiento
+            objetos.setdefault(
+                numero, (datos[inicio : primero + fin if fin else None], None)
+            )
+
+    return objetos
+
+
+def _cmap(datos: bytes) -> tuple[dict[int, str], int]:
+    """Correspondencia de códigos a texto de un CMap ToUnicode y bytes por código."""
+    correspondencia = {}
+    ancho = 1
+
+    def texto(hexadecimal: bytes) -> str:
+        try:
+            return bytes.fromhex(hexadecimal.decode()).decode("utf-16-be", "ignore")
+        except ValueError:
+            return ""
+
+    for bloque in _BFCHAR.findall(datos):
+        valores = _HEX.findall(bloque)
+        for origen, destino in zip(valores[::2], valores[1::2]):
+            origen = re.sub(rb"\s", b"", origen)
+            ancho = max(ancho, len(origen) // 2)
+            correspondencia[int(origen or b"0", 16)] = texto(destino)
+
+    for bloque in _BFRANGE.findall(datos):
+        for inicio, fin, destino in _RANGO.findall(bloque):
+            ancho = max(ancho, len(inicio) // 2)
+            inicio, fin = int(inicio, 16), int(fin, 16)
+            if fin - inicio > 0xFFFF:
+                continue
+            if destino.startswith(b"["):
+                for i, valor in enumerate(_HEX.findall(destino)):
+                    correspondencia[inicio + i] = texto(valor)
+            else:
+                base = texto(destino[1:-1])
+                if not base:
+                    continue
+                for i in range(fin - inicio + 1):
+                    correspondencia[inicio + i] = base[:-1] + chr(ord(base[-1]) + i)
+
+    return correspondencia, ancho
+
+
+def _fuentes(objetos: dict) -> dict[bytes, tuple[dict[int, str], int]]:
+    """CMap ToUnicode de cada nombre de fuente de los recursos de las páginas."""
+    cmaps = {}
+    for numero, (diccionario, _datos) in objetos.items():
+        to_unicode = _TO_UNICODE.search(diccionario)
+        if to_unicode:
+            cmap = objetos.get(int(to_unicode.group(1)), (b"", None))[1]
+            if cmap:
+                cmaps[numero] = _cmap(cmap)
+
+    fuentes = {}
+    if not cmaps:
+        return fuentes
+
+    for diccionario, _datos in objetos.values():
+        for directo, referencia in _FUENTES.findall(diccionario):
+            if referencia:
+                directo = objetos.get(int(referencia), (b"", None))[0]
+            for nombre, numero in _REFERENCIA.findall(directo):
+                if int(numero) in cmaps:
+                    fuentes.setdefault(nombre, cmaps[int(numero)])
+    return fuentes
+
+
+def _cadena_literal(datos: bytes, i: int) -> tuple[bytes, int]:
+    """Cadena entre paréntesis que empieza en `i`, con su posición final."""
+    resultado = bytearray()
+    nivel = 1
+    i += 1
+    while i < len(datos) and nivel:
+        caracter = datos[i]
+        if caracter == ord("\\") and i + 1 < len(datos):
+            i += 1
+            siguiente = datos[i]
+            if siguiente in _ESCAPES:
+                resultado += _ESCAPES[siguiente]
+            elif ord("0") <= siguiente <= ord("7"):
+                octal = datos[i : i + 3]
+                longitud = 1
+                while longitud < len(octal) and ord("0") <= octal[longitud] <= ord("7"):
+                    longitud += 1
+                resultado.append(int(octal[:longitud], 8) & 0xFF)
+                i += longitud - 1
+            elif siguiente in b"\r\n":
+                pass
+            else:
+                resultado.append(siguiente)
+        elif caracter == ord("("):
+            nivel += 1
+            resultado.append(caracter)
+        elif caracter == ord(")"):
+            nivel -= 1
+            if nivel:
+                resultado.append(caracter)
+        else:
+            resultado.append(caracter)
+        i += 1
+    return bytes(resultado), i
+
+
+def _tokens(datos: bytes):
+    """Tokens de un stream de contenido: cadenas (bytes), números, nombres y operadores (str)."""
+    i = 0
+    longitud = len(datos)
+    while i < longitud:
+        caracter = datos[i]
+        if caracter in _ESPACIOS:
+            i += 1
+        elif caracter == ord("%"):
+            while i < longitud and datos[i] not in b"\r\n":
+                i += 1
+        elif caracter == ord("("):
+            cadena, i = _cadena_literal(datos, i)
+            yield cadena
+        elif datos.startswith(b"<<", i) or datos.startswith(b">>", i):
+            i += 2
+        elif caracter == ord("<"):
+            fin = datos.find(b">", i)
+            fin = longitud if fin < 0 else fin
+            hexadecimal = re.sub(rb"[^0-9A-Fa-f]", b"", datos[i + 1 : fin])
+            if len(hexadecimal) % 2:
+                hexadecimal += b"0"
+            yield bytes.fromhex(hexadecimal.decode())
+            i = fin + 1
+        elif caracter in b"[]":
+            yield chr(caracter)
+            i += 1
+        else:
+            inicio = i
+            i += 1
+            while (
+                i < longitud
+                and datos[i] not in _ESPACIOS
+                and datos[i] not in _DELIMITADORES
+            ):
+                i += 1
+            palabra = datos[inicio:i].decode("latin-1")
+            try:
+                yield float(palabra)
+            except ValueError:
+                yield palabra
+
+
+def _decodificar(cadena: bytes, cmap: tuple[dict[int, str], int] | None) -> str:
+    if cmap:
+        correspondencia, ancho = cmap
+        return "".join(
+            correspondencia.get(int.from_bytes(cadena[i : i + ancho]), "")
+            for i in range(0, len(cadena), ancho)
+        )
+    if cadena.startswith(b"\xfe\xff"):
+        return cadena[2:].decode("utf-16-be", "ignore")
+    return cadena.decode("cp1252", "replace")
+
+
+def _texto_contenido(datos: bytes, fuentes: dict, partes: list[str]):
+    operandos = []
+    array = None
+    cmap = None
+
+    for token in _tokens(datos):
+        if token == "[":
+            array = []
+        elif token == "]":
+            operandos.append(array or [])
+            array = None
+        elif array is not None:
+            array.append(token)
+        elif isinstance(token, str) and not token.startswith("/"):
+            if token == "Tf" and len(operandos) >= 2:
+                nombre = operandos[-2]
+                if isinstance(nombre, str):
+                    cmap = fuentes.get(nombre[1:].encode("latin-1"))
+            elif token in ("Tj", "'", '"') and operandos:
+                if token != "Tj":
+                    partes.append("\n")
+                if isinstance(operandos[-1], bytes):
+                    partes.append(_decodificar(operandos[-1], cmap))
+            elif token == "TJ" and operandos and isinstance(operandos[-1], list):
+                for elemento in operandos[-1]:
+                    if isinstance(elemento, bytes):
+                        partes.append(_decodificar(elemento, cmap))
+                    elif isinstance(elemento, float) and elemento < -_SEPARACION_TJ:
+                        partes.append(" ")
+            elif token in ("Td", "TD") and len(operandos) >= 2:
+                partes.append("\n" if operandos[-1] != 0 else " ")
+            elif token == "T*":
+                partes.append("\n")
+            elif token in ("Tm", "ET"):
+                partes.append(" ")
+            operandos = []
+        else:
+            operandos.append(token)
+
+
+def extraer_texto(contenido: bytes, maximo: int | None = None) -> str:
+    """
+    Texto de un PDF, con los espacios normalizados.
+
+    Argumentos:
+        contenido: Bytes del PDF.
+        maximo: Número máximo de caracteres a devolver (Opcional).
+    """
+    objetos = _objetos(contenido)
+    fuentes = _fuentes(objetos)
+
+    partes = []
+    for diccionario, datos in objetos.values():
+        if not datos or b"/ObjStm" in diccionario or b"/XRef" in diccionario:
+            continue
+        # Los streams de contenido no tienen tipo; las fuentes, imágenes y CMaps sí
+        if re.search(rb"/(Type|Subtype|Length1|CMapName)\b", diccionario) and not (
+            b"/Form" in diccionario
+        ):
+            continue
+        if b"BT" not in datos:
+            continue
+        _texto_contenido(datos, fuentes, partes)
+        partes.append("\n")
+        if maximo and sum(map(len, partes)) > maximo * 2:
+            break
+
+    # Sin los caracteres de control de las fuentes sin correspondencia a Unicode
+    texto = "".join(c for c in "".join(partes) if c.isprintable() or c == "\n")
+    lineas = (" ".join(linea.split()) for linea in texto.splitlines())
+    texto = "\n".join(linea for linea in lineas if linea)
+    return texto[:maximo] if maximo else texto
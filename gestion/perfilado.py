@@ -0,0 +1,280 @@
+# Copyright (C) 2025-now  p.fernandezf <p@fernandezf.es> & iago.rivas <delthia@delthia.com>
+
+import bisect, functools, json, logging, os, random, threading, time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+from django.template.backends.django import Template
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+# Perfilado de las vistas: `PerfiladoMiddleware` mide en una muestra de las peticiones
+# las consultas y su tiempo, el tiempo de las plantillas, del envío de correos y el total,
+# y los acumula en histogramas por vista (nombre de la URL). Cada proceso guarda
+# periódicamente su instantánea en `PERFILADO_DIRECTORIO` para poder juntar las de todos
+# los procesos de gunicorn (comando `perfilado` y /gestion/estado/perfilado).
+
+# Límites superiores de los intervalos de los histogramas (el último, sin límite)
+LIMITES_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+LIMITES_CONSULTAS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+METRICAS = {
+    "total_ms": LIMITES_MS,
+    "consultas": LIMITES_CONSULTAS,
+    "bd_ms": LIMITES_MS,
+    "plantillas_ms": LIMITES_MS,
+    "correo_ms": LIMITES_MS,
+}
+
+SIN_RESOLVER = "<sin resolver>"
+
+
+def histograma_vacio(limites) -> dict:
+    return {"cuentas": [0] * (len(limites) + 1), "suma": 0.0, "maximo": 0.0}
+
+
+def anadir(histograma: dict, limites, valor: float):
+    histograma["cuentas"][bisect.bisect_left(limites, valor)] += 1
+    histograma["suma"] += valor
+    histograma["maximo"] = max(histograma["maximo"], valor)
+
+
+def combinar(destino: dict, origen: dict):
+    for i, cuenta in enumerate(origen["cuentas"]):
+        destino["cuentas"][i] += cuenta
+    destino["suma"] += origen["suma"]
+    destino["maximo"] = max(destino["maximo"], origen["maximo"])
+
+
+def percentil(histograma: dict, limites, p: float) -> float:
+    """
+    Percentil aproximado: el límite superior del intervalo en el que cae (o el máximo
+    observado, si es el último intervalo o menor que el límite).
+    """
+    total = sum(histograma["cuentas"])
+    if not total:
+        return 0.0
+    acumulado = 0
+    for i, cuenta in enumerate(histograma["cuentas"]):
+        acumulado += cuenta
+        if acumulado >= total * p / 100:
+            if i == len(limites):
+                return histograma["maximo"]
+            return min(limites[i], histograma["maximo"])
+    return histograma["maximo"]
+
+
+# Medición de la petición en curso en cada hilo, para las plantillas y los correos
+_actual = threading.local()
+
+
+class Medicion:
+    def __init__(self):
+        self.consultas = 0
+        self.bd = 0.0
+        self.plantillas = 0.0
+        self.correo = 0.0
+
+    def consulta(self, execute, sql, params, many, context):
+        """`execute_wrapper` de la conexión: cuenta y mide cada consulta."""
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.bd += time.perf_counter() - inicio
+            self.consultas += 1
+
+
+def _medir(atributo: str, funcion):
+    """Envuelve `funcion` para sumar su duración al `atributo` de la medición en curso."""
+
+    @functools.wraps(funcion)
+    def envoltorio(*args, **kwargs):
+        medicion = getattr(_actual, "medicion", None)
+        # Solo el nivel más externo: una plantilla puede renderizar otras
+        if medicion is None or getattr(_actual, "midiendo", None):
+            return funcion(*args, **kwargs)
+        _actual.midiendo = atributo
+        inicio = time.perf_counter()
+        try:
+            return funcion(*args, **kwargs)
+        finally:
+            _actual.midiendo = None
+            setattr(
+                medicion,
+                atributo,
+                getattr(medicion, atributo) + time.perf_counter() - inicio,
+            )
+
+    envoltorio._perfilado = True
+    return envoltorio
+
+
+def instrumentar():
+    """
+    Envuelve el renderizado de las plantillas de Django y el envío de correos del
+    backend configurado. Fuera de una petición medida solo añade una comprobación.
+    """
+    if not getattr(Template.render, "_perfilado", False):
+        Template.render = _medir("plantillas", Template.render)
+
+    backend = import_string(settings.EMAIL_BACKEND)
+    if not getattr(backend.send_messages, "_perfilado", False):
+        backend.send_messages = _medir("correo", backend.send_messages)
+
+
+class Perfil:
+    """Histogramas por vista de este proceso."""
+
+    def __init__(self):
+        self.bloqueo = threading.Lock()
+        self.vistas = {}
+        self.inicio = time.time()
+        self.ultimo_guardado = time.monotonic()
+
+    def registrar(self, vista: str, valores: dict):
+        with self.bloqueo:
+            if vista not in self.vistas:
+                self.vistas[vista] = {
+                    metrica: histograma_vacio(limites)
+                    for metrica, limites in METRICAS.items()
+                }
+            for metrica, limites in METRICAS.items():
+                anadir(self.vistas[vista][metrica], limites, valores[metrica])
+
+    def instantanea(self) -> dict:
+        with self.bloqueo:
+            vistas = json.loads(json.dumps(self.vistas))
+        return {
+            "pid": os.getpid(),
+            "inicio": self.inicio,
+            "fecha": time.time(),
+            "vistas": vistas,
+        }
+
+    def guardar(self):
+        """Escribe la instantánea en `PERFILADO_DIRECTORIO/<pid>.json` (se reemplaza de una vez)."""
+        directorio = Path(settings.PERFILADO_DIRECTORIO)
+        directorio.mkdir(parents=True, exist_ok=True)
+        ruta = directorio / f"{os.getpid()}.json"
+        temporal = ruta.with_suffix(".tmp")
+        temporal.write_text(json.dumps(self.instantanea()))
+        os.replace(temporal, ruta)
+        self.ultimo_guardado = time.monotonic()
+
+    def guardar_si_toca(self):
+        if time.monotonic() - self.ultimo_guardado < settings.PERFILADO_INTERVALO:
+            return
+        try:
+            self.guardar()
+        except OSError as e:
+            logger.warning(f"No se pudo guardar el perfilado: {e}")
+            self.ultimo_guardado = time.monotonic()
+
+    def reiniciar(self):
+        with self.bloqueo:
+            self.vistas = {}
+            self.inicio = time.time()
+
+
+perfil = Perfil()
+
+
+def instantaneas() -> list[dict]:
+    """Instantáneas guardadas de todos los procesos."""
+    resultado = []
+    for ruta in sorted(Path(settings.PERFILADO_DIRECTORIO).glob("*.json")):
+        try:
+            resultado.append(json.loads(ruta.read_text()))
+        except (OSError, ValueError) as e:
+            logger.warning(f"Instantánea de perfilado {ruta.name} ilegible: {e}")
+    return resultado
+
+
+def agregado(lista: list[dict] | None = None) -> dict:
+    """Histogramas por vista sumados de todas las instantáneas."""
+    if lista is None:
+        lista = instantaneas()
+    vistas = {}
+    for instantanea in lista:
+        for vista, metricas in instantanea["vistas"].items():
+            if vista not in vistas:
+                vistas[vista] = {
+                    metrica: histograma_vacio(limites)
+                    for metrica, limites in METRICAS.items()
+                }
+            for metrica in METRICAS:
+                combinar(vistas[vista][metrica], metricas[metrica])
+    return vistas
+
+
+def resumen(vistas: dict) -> list[dict]:
+    """Peticiones, medias, percentiles y máximos de cada vista, de la más lenta en total a la más rápida."""
+    filas = []
+    for vista, metricas in vistas.items():
+        peticiones = sum(metricas["total_ms"]["cuentas"])
+        if not peticiones:
+            continue
+        fila = {"vista": vista, "peticiones": peticiones}
+        for metrica, limites in METRICAS.items():
+            histograma = metricas[metrica]
+            fila[metrica] = {
+                "media": histograma["suma"] / peticiones,
+                "p50": percentil(histograma, limites, 50),
+                "p95": percentil(histograma, limites, 95),
+                "p99": percentil(histograma, limites, 99),
+                "maximo": histograma["maximo"],
+            }
+        filas.append(fila)
+    filas.sort(key=lambda f: f["peticiones"] * f["total_ms"]["media"], reverse=True)
+    return filas
+
+
+def borrar_instantaneas():
+    for ruta in Path(settings.PERFILADO_DIRECTORIO).glob("*.json"):
+        ruta.unlink(missing_ok=True)
+    perfil.reiniciar()
+
+
+class PerfiladoMiddleware:
+    """
+    Mide una fracción `PERFILADO_MUESTREO` de las peticiones si `PERFILADO_ACTIVO`.
+    Debe ir el primero en MIDDLEWARE para que el tiempo total incluya el resto.
+    """
+
+    def __init__(self, get_response):
+        if not settings.PERFILADO_ACTIVO:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        instrumentar()
+
+    def __call__(self, request):
+        if random.random() >= settings.PERFILADO_MUESTREO:
+            return self.get_response(request)
+
+        medicion = Medicion()
+        _actual.medicion = medicion
+        inicio = time.perf_counter()
+        try:
+            with connection.execute_wrapper(medicion.consulta):
+                respuesta = self.get_response(request)
+        finally:
+            total = time.perf_counter() - inicio
+            _actual.medicion = None
+
+        coincidencia = getattr(request, "resolver_match", None)
+        perfil.registrar(
+            coincidencia.view_name if coincidencia else SIN_RESOLVER,
+            {
+                "total_ms": total * 1000,
+                "consultas": medicion.consultas,
+                "bd_ms": medicion.bd * 1000,
+                "plantillas_ms": medicion.plantillas * 1000,
+                "correo_ms": medicion.correo * 1000,
+            },
+        )
+        perfil.guardar_si_toca()
+        return respuesta
@@ -0,0 +1,293 @@
+# Copyright (C) 2025-now  p.fernandezf <p@fernandezf.es> & iago.rivas <delthia@delthia.com>
+
+import logging
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from gestion.eventos import registrar_lote
+from gestion.models import Persona, Token
+from gestion.sqlite import escritura
+from gestion.utils import encolar_correos
+
+logger = logging.getLogger(__name__)
+
+# Campos por los que se pueden definir cuotas u ordenar a los candidatos.
+# "tipo" distingue entre participantes y mentores.
+CAMPOS_SELECCION = (
+    "tipo",
+    "genero",
+    "nivel_estudio",
+    "centro_estudio",
+    "quiere_creditos",
+    "fecha_registro",
+    "fecha_verificacion_correo",
+)
+
+_COLUMNAS = {
+    "correo": "correo",
+    "genero": "genero",
+    "fecha_registro": "fecha_registro",
+    "fecha_verificacion_correo": "fecha_verificacion_correo",
+    "fecha_aceptacion": "fecha_aceptacion",
+    "fecha_rechazo_plaza": "fecha_rechazo_plaza",
+    "nivel_estudio": "participante__nivel_estudio",
+    "centro_estudio": "participante__centro_estudio",
+    "quiere_creditos": "participante__quiere_creditos",
+    "mentor": "mentor__correo",
+}
+
+
+def _filas(personas=None) -> list[dict]:
+    if personas is None:
+        personas = Persona.objects.all()
+
+    filas = []
+    for valores in personas.order_by().values_list(*_COLUMNAS.values()):
+        fila = dict(zip(_COLUMNAS, valores))
+        fila["tipo"] = "mentor" if fila.pop("mentor") else "participante"
+        filas.append(fila)
+    return filas
+
+
+def _plazas_caducadas() -> set[str]:
+    """
+    Correos de las Personas aceptadas que dejaron caducar su token de confirmación
+    sin confirmar la plaza ni tener otro token válido. Su plaza queda libre.
+    """
+    ahora = timezone.now()
+    confirmacion = Token.objects.filter(
+        tipo="CONFIRMACION",
+        fecha_uso__isnull=True,
+        persona__fecha_confirmacion_plaza__isnull=True,
+    ).order_by()
+    caducados = set(
+        confirmacion.filter(fecha_expiracion__lt=ahora).values_list(
+            "persona_id", flat=True
+        )
+    )
+    if not caducados:
+        return caducados
+
+    validos = confirmacion.filter(fecha_expiracion__gte=ahora).values_list(
+        "persona_id", flat=True
+    )
+    return caducados.difference(validos)
+
+
+def _ocupa_plaza(fila: dict, caducadas: set[str]) -> bool:
+    return (
+        fila["fecha_aceptacion"] is not None
+        and fila["fecha_rechazo_plaza"] is None
+        and fila["correo"] not in caducadas
+    )
+
+
+def _es_candidato(fila: dict) -> bool:
+    return (
+        fila["fecha_verificacion_correo"] is not None
+        and fila["fecha_aceptacion"] is None
+        and fila["fecha_rechazo_plaza"] is None
+    )
+
+
+def ordenar_candidatos(filas: list[dict], criterios: list[str]) -> list[dict]:
+    """
+    Ordena los candidatos según los criterios indicados, de mayor a menor prioridad.
+    Un criterio precedido de "-" ordena de forma descendente. Los valores vacíos van al final.
+    """
+    ordenadas = list(filas)
+    # Ordenación estable: se aplica del criterio menos prioritario al más prioritario
+    for criterio in reversed(criterios):
+        descendente = criterio.startswith("-")
+        campo = criterio.lstrip("-")
+        if campo not in CAMPOS_SELECCION:
+            raise ValueError(f"Criterio de ordenación desconocido: '{campo}'")
+
+        con_valor = [fila for fila in ordenadas if fila[campo] is not None]
+        sin_valor = [fila for fila in ordenadas if fila[campo] is None]
+        con_valor.sort(key=lambda fila: fila[campo], reverse=descendente)
+        ordenadas = con_valor + sin_valor
+
+    return ordenadas
+
+
+def seleccionar(
+    plazas: int,
+    cuotas: dict[str, dict[str, int]] | None = None,
+    criterios: list[str] | None = None,
+    personas=None,
+) -> dict:
+    """
+    Calcula qué Personas aceptar sin superar las plazas ni las cuotas.
+    No modifica la base de datos (ver `aplicar_seleccion`).
+
+    Las Personas aceptadas que no han rechazado la plaza ni la han dejado
+    caducar ocupan plaza y cuentan para las cuotas. Los candidatos (correo
+    verificado, sin aceptar ni rechazar) se recorren una sola vez en el orden
+    indicado por los criterios.
+
+    Argumentos:
+        plazas: Número total de plazas del evento.
+        cuotas: Máximo de plazas por valor de un campo (Opcional).
+            Por ejemplo: `{"tipo": {"mentor": 20}, "nivel_estudio": {"MASTER": 30}}`.
+        criterios: Campos de ordenación de los candidatos (Opcional).
+        personas: Queryset de Persona al que limitar los candidatos (Opcional).
+
+    Salida:
+        Diccionario con los correos `aceptados`, las plazas `ocupadas` previamente,
+        los candidatos `en_espera`, los `descartados_cuota` por cada cuota y el
+        `recuento` final de cada campo con cuota.
+    """
+    cuotas = cuotas if cuotas is not None else settings.CUOTAS_SELECCION
+    criterios = criterios if criterios is not None else settings.CRITERIOS_SELECCION
+
+    for campo in cuotas:
+        if campo not in CAMPOS_SELECCION:
+            raise ValueError(f"Campo de cuota desconocido: '{campo}'")
+
+    filas = _filas()
+    caducadas = _plazas_caducadas()
+    if personas is not None:
+        permitidos = set(personas.order_by().values_list("pk", flat=True))
+    else:
+        permitidos = None
+
+    ocupadas = 0
+    recuento = {campo: Counter() for campo in cuotas}
+    candidatos = []
+    for fila in filas:
+        if _ocupa_plaza(fila, caducadas):
+            ocupadas += 1
+            for campo in cuotas:
+                recuento[campo][str(fila[campo])] += 1
+        elif _es_candidato(fila) and (
+            permitidos is None or fila["correo"] in permitidos
+        ):
+            candidatos.append(fila)
+
+    aceptados = []
+    en_espera = []
+    descartados_cuota = Counter()
+    libres = max(0, plazas - ocupadas)
+
+    for fila in ordenar_candidatos(candidatos, criterios):
+        if len(aceptados) >= libres:
+            en_espera.append(fila["correo"])
+            continue
+
+        cuota_llena = next(
+            (
+                (campo, str(fila[campo]))
+                for campo, maximos in cuotas.items()
+                if str(fila[campo]) in maximos
+                and recuento[campo][str(fila[campo])] >= maximos[str(fila[campo])]
+            ),
+            None,
+        )
+        if cuota_llena:
+            descartados_cuota[cuota_llena] += 1
+            en_espera.append(fila["correo"])
+            continue
+
+        aceptados.append(fila["correo"])
+        for campo in cuotas:
+            recuento[campo][str(fila[campo])] += 1
+
+    return {
+        "aceptados": aceptados,
+        "ocupadas": ocupadas,
+        "en_espera": en_espera,
+        "descartados_cuota": dict(descartados_cuota),
+        "recuento": {campo: dict(valores) for campo, valores in recuento.items()},
+    }
+
+
+def aplicar_seleccion(aceptados: list[str], usuario: str = "") -> list[str]:
+    """
+    Acepta a las Personas indicadas que sigan pendientes de aceptar y añade su Evento.
+    `usuario` es el usuario de gestión que la aplica (Opcional).
+
+    Salida:
+        Correos de las Personas aceptadas, en el orden de `aceptados`. Las que ya
+        no estaban pendientes (p. ej. aceptadas entre medias) no se incluyen.
+    """
+    ahora = timezone.now()
+    lote = settings.SELECCION_TAMANO_LOTE
+    actualizados = []
+
+    with transaction.atomic():
+        for i in range(0, len(aceptados), lote):
+            correos = aceptados[i : i + lote]
+            Persona.objects.filter(
+                correo__in=correos,
+                fecha_verificacion_correo__isnull=False,
+                fecha_aceptacion__isnull=True,
+                fecha_rechazo_plaza__isnull=True,
+            ).update(fecha_aceptacion=ahora)
+            # Las aceptadas ahora son las que tienen esta misma fecha, en el orden dado
+            nuevos = set(
+                Persona.objects.filter(
+                    correo__in=correos, fecha_aceptacion=ahora
+                ).values_list("correo", flat=True)
+            )
+            nuevos = [correo for correo in correos if correo in nuevos]
+            registrar_lote(nuevos, "ACEPTACION", usuario=usuario, fecha=ahora)
+            actualizados += nuevos
+
+    logger.info(f"Selección aplicada: {len(actualizados)} personas aceptadas")
+    return actualizados
+
+
+def lista_espera() -> list[str]:
+    """Correos de los candidatos sin plaza, en el orden en el que se promocionarían."""
+    plazas = settings.PLAZAS_EVENTO or 0
+    resultado = seleccionar(plazas)
+    return resultado["aceptados"] + resultado["en_espera"]
+
+
+@escritura
+def promocionar_lista_espera() -> list[str]:
+    """
+    Acepta a los siguientes candidatos de la lista de espera si hay plazas libres
+    (por rechazos o tokens de confirmación caducados), les crea el token de
+    confirmación y encola su correo. Sin `PLAZAS_EVENTO` no hace nada.
+
+    La selección se calcula dentro de la misma transacción de escritura que la
+    aplica, para que dos promociones simultáneas no repartan las mismas plazas.
+    Recorre todas las Personas: se ejecuta en las tareas periódicas, no en las
+    peticiones (ver `gestion.tareas.solicitar_tarea`).
+
+    Salida:
+        Correos de las Personas promocionadas.
+    """
+    if settings.PLAZAS_EVENTO is None:
+        return []
+
+    promocionados = aplicar_seleccion(seleccionar(settings.PLAZAS_EVENTO)["aceptados"])
+    if not promocionados:
+        return []
+
+    fecha_expiracion = (
+        (timezone.now() + timedelta(days=14))
+        .astimezone(timezone.get_default_timezone())
+        .replace(hour=23, minute=59, second=59)
+    )
+    Token.objects.bulk_create(
+        (
+            Token(
+                persona_id=correo,
+                tipo="CONFIRMACION",
+                fecha_expiracion=fecha_expiracion,
+            )
+            for correo in promocionados
+        ),
+        batch_size=settings.SELECCION_TAMANO_LOTE,
+    )
+    encolar_correos("CONFIRMACION", promocionados)
+
+    logger.info(f"{len(promocionados)} personas promocionadas de la lista de espera")
+    return promocionados
@@ -0,0 +1,524 @@
+# Copyright (C) 2025-now  p.fernandezf <p@fernandezf.es> & iago.rivas <delthia@delthia.com>
+
+import logging, random, re
+from datetime import date, datetime, timedelta
+from itertools import batched
+from uuid import UUID
+
+from django.conf import settings
+from django.db import transaction
+from faker import Faker
+
+from gestion.bd import insertar
+from gestion.models import (
+    Colaborador,
+    Empresa,
+    Evento,
+    Mentor,
+    Participante,
+    Pase,
+    Persona,
+    Presencia,
+    RestriccionAlimentaria,
+    TipoPase,
+    Token,
+)
+
+logger = logging.getLogger(__name__)
+
+# Datos falsos para pruebas de rendimiento: participantes, mentores y colaboradores con
+# los estados del proceso de selección repartidos como en una edición real, sus tokens,
+# restricciones alimentarias, sus eventos y, los que confirmaron plaza, acreditación,
+# pases y presencias. Con la misma semilla y la misma base de datos de partida se generan
+# exactamente los mismos datos.
+
+# Proporciones de cada estado
+VERIFICADOS = 0.88
+ERROR_CORREO = 0.01  # De los no verificados, con error en el envío del correo
+ACEPTADOS = 0.45  # De los verificados
+CONFIRMADOS = 0.75  # De los aceptados
+RECHAZADOS = 0.10  # De los aceptados
+ACREDITADOS = 0.85  # De los confirmados
+CON_RESTRICCIONES = 0.15
+USO_PASE = 0.7  # Probabilidad de usar cada tipo de pase
+COMPARTIR_CV = 0.6
+
+# Duración del plazo de registro anterior a FECHA_FIN_REGISTRO y de la selección posterior
+PLAZO_REGISTRO = timedelta(days=60)
+PLAZO_SELECCION = timedelta(days=7)
+
+RESTRICCIONES = (
+    "Intolerancia al gluten",
+    "Intolerancia a la lactosa",
+    "Vegetarianismo",
+    "Veganismo",
+    "Diabetes",
+    "Alergia (Especificar en detalles)",
+    "Otro (Especificar en detalles)",
+)
+ESTUDIOS = (
+    ("UNIVERSIDAD", "GEI", "FIC"),
+    ("UNIVERSIDAD", "GCED", "FIC"),
+    ("UNIVERSIDAD", "Grado en Ingeniería Informática", "USC"),
+    ("UNIVERSIDAD", "Enxeñaría Informática", "UVigo"),
+    ("MASTER", "MUEI", "FIC"),
+    ("MASTER", "MUNICS", "FIC"),
+    ("FORMACION_PROFESIONAL", "DAM", "IES Fernando Wirtz"),
+    ("FORMACION_PROFESIONAL", "ASIR", "CIFP Someso"),
+    ("OTRO", None, None),
+)
+GENEROS = ("H", "M", "O", "-")
+TALLAS = ("S", "M", "L", "XL", "2XL", "3XL")
+LETRAS_DNI = "TRWAGMYFPDXBNJZSQVHLCKE"
+# Correos de las personas y colaboradores generados
+CORREO_GENERADO = r"^persona([0-9]+)@(empresa\.)?example\.com$"
+
+# Tamaño de las listas de valores de Faker que se combinan (generarlos uno a uno es lento)
+TAMANO_MUESTRAS = 500
+
+
+def dni(numero: int) -> str:
+    numero %= 10**8
+    return f"{numero:08d}{LETRAS_DNI[numero % 23]}"
+
+
+class Generador:
+    """
+    Genera los datos por lotes, cada uno en una transacción, con inserciones múltiples
+    (`gestion.bd.insertar`). Los correos, DNIs y acreditaciones continúan la numeración
+    de los mayores que ya hay en la base de datos, sin repetir los DNIs de las personas
+    reales, así que se puede ejecutar varias veces aunque se hayan eliminado filas.
+    """
+
+    def __init__(self, semilla: int | None = None, lote: int = 2000):
+        self.numero = self.ultimo_numero()
+        self.dnis_ocupados = self.dnis_reales()
+        self.acreditacion = self.ultima_acreditacion()
+        # Con la misma semilla, cada ejecución sobre la anterior genera otros UUID
+        self.azar = random.Random(
+            None if semilla is None else f"{semilla}:{self.numero}"
+        )
+        self.lote = lote
+        fake = Faker("es_ES")
+        fake.seed_instance(semilla)
+
+        self.nombres = [fake.first_name() for _ in range(TAMANO_MUESTRAS)]
+        self.apellidos = [fake.last_name() for _ in range(TAMANO_MUESTRAS)]
+        self.ciudades = [fake.city() for _ in range(TAMANO_MUESTRAS // 5)]
+        self.textos = [
+            fake.paragraph(nb_sentences=5) for _ in range(TAMANO_MUESTRAS // 5)
+        ]
+        self.empresas_nombres = [fake.company() for _ in range(TAMANO_MUESTRAS // 10)]
+
+        # Las fechas dependen solo de la configuración, no del momento de la ejecución
+        self.fin_registro = settings.FECHA_FIN_REGISTRO
+        self.fin_seleccion = self.fin_registro + PLAZO_SELECCION
+        self.restricciones = self.restricciones_alimentarias()
+        self.tipos_pase = self.pases_evento()
+
+    def ultimo_numero(self) -> int:
+        """Mayor número de los correos generados en ejecuciones anteriores."""
+        return max(
+            (
+                int(re.match(CORREO_GENERADO, correo)[1])
+                for modelo in (Persona, Colaborador)
+                for correo in modelo.objects.filter(
+                    correo__regex=CORREO_GENERADO
+                ).values_list("correo", flat=True)
+            ),
+            default=0,
+        )
+
+    def dnis_reales(self) -> set[str]:
+        """DNIs de las personas y colaboradores que no se generaron."""
+        return {
+            dni
+            for modelo in (Persona, Colaborador)
+            for dni in modelo.objects.exclude(
+                correo__regex=CORREO_GENERADO
+            ).values_list("dni", flat=True)
+        }
+
+    def ultima_acreditacion(self) -> int:
+        """Mayor acreditación numérica, sea generada o real."""
+        return max(
+            map(
+                int,
+                Persona.objects.filter(acreditacion__regex=r"^[0-9]+$").values_list(
+                    "acreditacion", flat=True
+                ),
+            ),
+            default=0,
+        )
+
+    def restricciones_alimentarias(self) -> list[int]:
+        """Restricciones de la fixture `restriccion_alimentaria`, creadas si no se cargó."""
+        if not RestriccionAlimentaria.objects.exists():
+            RestriccionAlimentaria.objects.bulk_create(
+                RestriccionAlimentaria(nombre=nombre) for nombre in RESTRICCIONES
+            )
+        return list(
+            RestriccionAlimentaria.objects.order_by("pk").values_list("pk", flat=True)
+        )
+
+    def pases_evento(self) -> list[TipoPase]:
+        """Tipos de pase existentes o, si no hay, las comidas de cada día del evento."""
+        if not TipoPase.objects.exists():
+            tipos = []
+            dia = settings.FECHA_INICIO_EVENTO.replace(hour=0, minute=0, second=0)
+            while dia <= settings.FECHA_FIN_EVENTO:
+                for nombre, hora in (("Desayuno", 8), ("Comida", 13), ("Cena", 20)):
+                    tipos.append(
+                        TipoPase(
+                            nombre=f"{nombre} {dia:%d/%m}",
+                            inicio_validez=dia.replace(hour=hora),
+                        )
+                    )
+                dia += timedelta(days=1)
+            TipoPase.objects.bulk_create(tipos)
+        return list(TipoPase.objects.order_by("inicio_validez"))
+
+    # Valores -----------------------------------------------------------------
+
+    def fecha_entre(self, inicio: datetime, fin: datetime) -> datetime:
+        if fin <= inicio:
+            return inicio
+        return inicio + timedelta(
+            seconds=self.azar.uniform(0, (fin - inicio).total_seconds())
+        )
+
+    def siguiente(self) -> int:
+        self.numero += 1
+        while dni(self.numero) in self.dnis_ocupados:
+            self.numero += 1
+        return self.numero
+
+    def uuid(self) -> UUID:
+        return UUID(int=self.azar.getrandbits(128), version=4)
+
+    def nombre(self) -> str:
+        return (
+            f"{self.azar.choice(self.nombres)} {self.azar.choice(self.apellidos)} "
+            f"{self.azar.choice(self.apellidos)}"
+        )
+
+    def comunes(self, numero: int, dominio: str) -> dict:
+        """Campos de PersonaAbstracta."""
+        return {
+            "correo": f"persona{numero}@{dominio}",
+            "nombre": self.nombre(),
+            "detalle_restricciones_alimentarias": None,
+        }
+
+    def datos_persona(self, numero: int) -> dict:
+        """Campos de Persona, con el estado del proceso de selección."""
+        azar = self.azar
+        registro = self.fecha_entre(
+            self.fin_registro - PLAZO_REGISTRO, self.fin_registro
+        )
+        datos = {
+            **self.comunes(numero, "example.com"),
+            "dni": dni(numero),
+            "referencia": self.uuid(),
+            "genero": azar.choice(GENEROS),
+            "talla_camiseta": azar.choice(TALLAS),
+            "compartir_cv": azar.random() < COMPARTIR_CV,
+            "fecha_registro": registro,
+        }
+
+        if azar.random() >= VERIFICADOS:
+            if azar.random() < ERROR_CORREO:
+                datos["motivo_error_correo_verificacion"] = "SMTPRecipientsRefused"
+            return datos
+
+        datos["fecha_verificacion_correo"] = self.fecha_entre(
+            registro, registro + timedelta(days=2)
+        )
+        if azar.random() >= ACEPTADOS:
+            return datos
+
+        aceptacion = self.fecha_entre(
+            datos["fecha_verificacion_correo"], self.fin_seleccion
+        )
+        datos["fecha_aceptacion"] = aceptacion
+        estado = azar.random()
+        if estado < CONFIRMADOS:
+            datos["fecha_confirmacion_plaza"] = self.fecha_entre(
+                aceptacion, aceptacion + timedelta(days=7)
+            )
+            if azar.random() < ACREDITADOS:
+                self.acreditacion += 1
+                datos["acreditacion"] = f"{self.acreditacion:06d}"
+        elif estado < CONFIRMADOS + RECHAZADOS:
+            datos["fecha_rechazo_plaza"] = self.fecha_entre(
+                aceptacion, aceptacion + timedelta(days=7)
+            )
+        return datos
+
+    def participante(self) -> Participante:
+        numero = self.siguiente()
+        nivel, estudio, centro = self.azar.choice(ESTUDIOS)
+        return Participante(
+            **self.datos_persona(numero),
+            telefono=f"6{self.azar.randrange(10**8):08d}",
+            fecha_nacimiento=date(1990, 1, 1)
+            + timedelta(days=self.azar.randrange(19 * 365)),
+            nivel_estudio=nivel,
+            nombre_estudio=estudio,
+            centro_estudio=centro,
+            curso=str(self.azar.randint(1, 4)) if estudio else None,
+            ciudad=self.azar.choice(self.ciudades),
+            quiere_creditos=centro == "FIC" and self.azar.random() < 0.5,
+            motivacion=self.azar.choice(self.textos),
+        )
+
+    def mentor(self) -> Mentor:
+        numero = self.siguiente()
+        return Mentor(
+            **self.datos_persona(numero),
+            telefono=f"6{self.azar.randrange(10**8):08d}",
+            fecha_nacimiento=date(1975, 1, 1)
+            + timedelta(days=self.azar.randrange(25 * 365)),
+            ciudad=self.azar.choice(self.ciudades),
+            motivacion=self.azar.choice(self.textos),
+        )
+
+    # Datos relacionados --------------------------------------------------------
+
+    def restricciones_persona(self, correo: str) -> list:
+        if self.azar.random() >= CON_RESTRICCIONES:
+            return []
+        Relacion = Persona.restricciones_alimentarias.through
+        return [
+            Relacion(persona_id=correo, restriccionalimentaria_id=restriccion)
+            for restriccion in self.azar.sample(
+                self.restricciones, self.azar.randint(1, 2)
+            )
+        ]
+
+    def tokens(self, persona: Persona) -> list[Token]:
+        """Token de verificación de todos y de confirmación de los aceptados, usados según su estado."""
+        tokens = [
+            Token(
+                token=self.uuid(),
+                tipo="VERIFICACION",
+                persona_id=persona.correo,
+                fecha_creacion=persona.fecha_registro,
+                fecha_expiracion=persona.fecha_registro + timedelta(days=7),
+                fecha_uso=persona.fecha_verificacion_correo,
+            )
+        ]
+        if persona.fecha_aceptacion:
+            tokens.append(
+                Token(
+                    token=self.uuid(),
+                    tipo="CONFIRMACION",
+                    persona_id=persona.correo,
+                    fecha_creacion=persona.fecha_aceptacion,
+                    fecha_expiracion=persona.fecha_aceptacion + timedelta(days=14),
+                    fecha_uso=persona.fecha_confirmacion_plaza
+                    or persona.fecha_rechazo_plaza,
+                )
+            )
+        return tokens
+
+    def asistencia(self, persona: Persona) -> tuple[list[Presencia], list[Pase]]:
+        """Entradas y salidas durante el evento y pases usados de los acreditados."""
+        if not persona.acreditacion:
+            return [], []
+
+        presencias = []
+        momento = self.fecha_entre(
+            settings.FECHA_INICIO_EVENTO,
+            settings.FECHA_INICIO_EVENTO + timedelta(hours=4),
+        )
+        for _ in range(self.azar.randint(1, 4)):
+            if momento >= settings.FECHA_FIN_EVENTO:
+                break
+            salida = momento + timedelta(minutes=self.azar.randint(30, 12 * 60))
+            # Algunas salidas no se registran
+            presencias.append(
+                Presencia(
+                    persona_id=persona.correo,
+                    entrada=momento,
+                    salida=salida if self.azar.random() < 0.9 else None,
+                )
+            )
+            momento = salida + timedelta(minutes=self.azar.randint(10, 8 * 60))
+
+        pases = [
+            Pase(
+                persona_id=persona.correo,
+                tipo_pase_id=tipo.pk,
+                fecha=tipo.inicio_validez + timedelta(minutes=self.azar.randint(0, 90)),
+            )
+            for tipo in self.tipos_pase
+            if self.azar.random() < USO_PASE
+        ]
+        return presencias, pases
+
+    def eventos(
+        self, persona: Persona, presencias: list[Presencia], pases: list[Pase]
+    ) -> list[Evento]:
+        """Historial de la persona según sus fechas, pases y presencias."""
+        eventos = [
+            Evento(persona_id=persona.correo, tipo=tipo, fecha=fecha)
+            for tipo, fecha in (
+                ("REGISTRO", persona.fecha_registro),
+                ("VERIFICACION", persona.fecha_verificacion_correo),
+                ("ACEPTACION", persona.fecha_aceptacion),
+                ("CONFIRMACION", persona.fecha_confirmacion_plaza),
+                ("RECHAZO", persona.fecha_rechazo_plaza),
+            )
+            if fecha
+        ]
+        if persona.acreditacion:
+            eventos.append(
+                Evento(
+                    persona_id=persona.correo,
+                    tipo="ACREDITACION",
+                    fecha=settings.FECHA_INICIO_EVENTO,
+                    detalle=persona.acreditacion,
+                )
+            )
+        nombres = {tipo.pk: tipo.nombre for tipo in self.tipos_pase}
+        eventos += [
+            Evento(
+                persona_id=persona.correo,
+                tipo="PASE",
+                fecha=pase.fecha,
+                detalle=nombres[pase.tipo_pase_id],
+            )
+            for pase in pases
+        ]
+        for presencia in presencias:
+            eventos.append(
+                Evento(
+                    persona_id=persona.correo, tipo="ENTRADA", fecha=presencia.entrada
+                )
+            )
+            if presencia.salida:
+                eventos.append(
+                    Evento(
+                        persona_id=persona.correo, tipo="SALIDA", fecha=presencia.salida
+                    )
+                )
+        return eventos
+
+    # Generación ----------------------------------------------------------------
+
+    def personas(self, cantidad: int, crear, progreso=None) -> dict:
+        """
+        Crea `cantidad` Participantes o Mentores (según `crear`) con sus datos relacionados.
+
+        Salida:
+            Filas creadas por modelo.
+        """
+        filas = {}
+
+        def sumar(modelo, n):
+            filas[modelo] = filas.get(modelo, 0) + n
+
+        for bloque in batched(range(cantidad), self.lote):
+            personas = [crear() for _ in bloque]
+            restricciones, tokens, presencias, pases, eventos = [], [], [], [], []
+            for persona in personas:
+                restricciones += self.restricciones_persona(persona.correo)
+                tokens += self.tokens(persona)
+                entradas, usados = self.asistencia(persona)
+                presencias += entradas
+                pases += usados
+                eventos += self.eventos(persona, entradas, usados)
+
+            with transaction.atomic():
+                sumar(type(persona).__name__, insertar(personas, lote=self.lote))
+                Persona.restricciones_alimentarias.through.objects.bulk_create(
+                    restricciones, batch_size=self.lote
+                )
+                sumar("Restricciones", len(restricciones))
+                sumar("Token", insertar(tokens, lote=self.lote))
+                sumar("Presencia", insertar(presencias, lote=self.lote))
+                sumar("Pase", insertar(pases, lote=self.lote))
+                sumar("Evento", insertar(eventos, lote=self.lote))
+
+            if progreso:
+                progreso(type(persona).__name__, len(personas))
+        return filas
+
+    def colaboradores(self, cantidad: int) -> dict:
+        """Colaboradores de unas pocas empresas, con las comidas de cada uno."""
+        if not cantidad:
+            return {}
+        Empresa.objects.bulk_create(
+            (Empresa(nombre=nombre) for nombre in self.empresas_nombres),
+            ignore_conflicts=True,
+        )
+        empresas = list(Empresa.objects.values_list("pk", flat=True))
+        comidas_colaborador = Colaborador.comidas.through
+
+        filas = {"Colaborador": 0, "Comidas": 0}
+        for bloque in batched(range(cantidad), self.lote):
+            colaboradores = []
+            comidas = []
+            for _ in bloque:
+                numero = self.siguiente()
+                colaborador = Colaborador(
+                    **self.comunes(numero, "empresa.example.com"),
+                    empresa_id=self.azar.choice(empresas),
+                    dni=dni(numero),
+                    telefono=f"6{self.azar.randrange(10**8):08d}",
+                    fecha_registro=self.fecha_entre(
+                        self.fin_registro - PLAZO_REGISTRO, self.fin_registro
+                    ),
+                )
+                colaboradores.append(colaborador)
+                comidas += [
+                    comidas_colaborador(
+                        colaborador_id=colaborador.correo, tipopase_id=tipo.pk
+                    )
+                    for tipo in self.tipos_pase
+                    if self.azar.random() < USO_PASE
+                ]
+
+            with transaction.atomic():
+                filas["Colaborador"] += insertar(colaboradores, lote=self.lote)
+                comidas_colaborador.objects.bulk_create(comidas, batch_size=self.lote)
+                filas["Comidas"] += len(comidas)
+        return filas
+
+
+def generar(
+    participantes: int,
+    mentores: int = 0,
+    colaboradores: int = 0,
+    semilla: int | None = None,
+    lote: int = 2000,
+    progreso=None,
+) -> dict:
+    """
+    Genera datos falsos a escala con `Generador`.
+
+    Argumentos:
+        participantes, mentores, colaboradores: Cantidad de cada uno.
+        semilla: Semilla para generar siempre los mismos datos (Opcional).
+        lote: Personas por transacción e inserción.
+        progreso: Función a la que se llama con el modelo y las personas de cada lote (Opcional).
+
+    Salida:
+        Filas creadas por modelo.
+    """
+    generador = Generador(semilla, lote)
+    filas = {}
+    for resultado in (
+        generador.personas(participantes, generador.participante, progreso),
+        generador.personas(mentores, generador.mentor, progreso),
+        generador.colaboradores(colaboradores),
+    ):
+        for modelo, n in resultado.items():
+            filas[modelo] = filas.get(modelo, 0) + n
+
+    logger.info(
+        "Datos falsos generados: "
+        + ", ".join(f"{n} {modelo}" for modelo, n in filas.items())
+    )
+    return filas
@@ -0,0 +1,307 @@
+# Copyright (C) 2025-now  p.fernandezf <p@fernandezf.es> & iago.rivas <delthia@delthia.com>
+
+import functools, logging, os, random, sqlite3, struct, threading, time
+from pathlib import Path
+
+from django.conf import settings
+from django.db import OperationalError, connection, transaction
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.utils import timezone
+
+from gestion import metricas
+
+logger = logging.getLogger(__name__)
+
+# Gestión del WAL de SQLite. Las pragmas de cada conexión limitan cuánto crece el WAL
+# entre checkpoints, y un hilo en cada proceso de gunicorn hace checkpoints PASSIVE
+# (que no esperan ni bloquean a nadie) cuando el WAL crece o la web está inactiva,
+# en lugar de dejarlo en manos de la escritura que cruza `wal_autocheckpoint`.
+# Las escrituras de las vistas usan `escritura`, que reintenta si la base de datos sigue bloqueada.
+
+
+@receiver(connection_created)
+def configurar_conexion(sender, connection, **kwargs):
+    """
+    Pragmas por conexión: no se guardan en la base de datos como `journal_mode`.
+    El `busy_timeout` lo configura la opción `timeout` de DATABASES.
+    """
+    if connection.vendor != "sqlite":
+        return
+    with connection.cursor() as cursor:
+        cursor.execute("PRAGMA synchronous = NORMAL")
+        cursor.execute(
+            f"PRAGMA wal_autocheckpoint = {int(settings.SQLITE_WAL_AUTOCHECKPOINT)}"
+        )
+        # Tras un checkpoint completo, el WAL se trunca a este tamaño en lugar de quedarse con el máximo alcanzado
+        cursor.execute(
+            f"PRAGMA journal_size_limit = {int(settings.SQLITE_WAL_TAMANO_LIMITE)}"
+        )
+
+
+def ruta_bd() -> Path:
+    return Path(settings.DATABASES["default"]["NAME"])
+
+
+def tamano_wal() -> int:
+    try:
+        return os.stat(f"{ruta_bd()}-wal").st_size
+    except OSError:
+        return 0
+
+
+def paginas_pendientes() -> tuple[int, int] | None:
+    """
+    Páginas escritas en el WAL (mxFrame) y cuántas de ellas aún no se han copiado a la
+    base de datos, leídas de la cabecera del wal-index (`-shm`, https://sqlite.org/walformat.html).
+    El tamaño del archivo del WAL no sirve para esto: tras un checkpoint se reutiliza sin encogerse.
+    None si no hay WAL.
+    """
+    try:
+        with open(f"{ruta_bd()}-shm", "rb") as archivo:
+            cabecera = archivo.read(100)
+    except OSError:
+        return None
+    if len(cabecera) < 100:
+        return None
+    # Enteros en el orden de bytes nativo: mxFrame en el byte 16 y nBackfill en el 96
+    (escritas,) = struct.unpack_from("=I", cabecera, 16)
+    (copiadas,) = struct.unpack_from("=I", cabecera, 96)
+    return escritas, max(escritas - copiadas, 0)
+
+
+def tamano_pagina() -> int:
+    try:
+        with open(f"{ruta_bd()}-shm", "rb") as archivo:
+            cabecera = archivo.read(16)
+        (tamano,) = struct.unpack_from("=H", cabecera, 14)
+    except (OSError, struct.error):
+        return 4096
+    return 65536 if tamano == 1 else tamano or 4096
+
+
+class Checkpointer:
+    """
+    Hilo que cada `SQLITE_CHECKPOINT_INTERVALO` segundos comprueba las páginas del WAL
+    pendientes de copiar a la base de datos y hace un checkpoint PASSIVE si ocupan más
+    de `SQLITE_CHECKPOINT_TAMANO` bytes o si no ha habido escrituras en
+    `SQLITE_CHECKPOINT_INACTIVIDAD` segundos. Guarda las métricas en `metricas`.
+    """
+
+    def __init__(self):
+        self.parar = threading.Event()
+        self.hilo = None
+        self.bloqueo = threading.Lock()
+        self.metricas = {
+            "pid": os.getpid(),
+            "checkpoints": 0,
+            "checkpoints_incompletos": 0,
+            "errores": 0,
+            "duracion_total": 0.0,
+            "duracion_maxima": 0.0,
+            "pendiente_maximo": 0,
+            "ultimo": None,
+        }
+
+    def iniciar(self):
+        if self.hilo is not None and self.hilo.is_alive():
+            return
+        self.parar.clear()
+        self.metricas["pid"] = os.getpid()
+        self.hilo = threading.Thread(
+            target=self.bucle, name="sqlite-checkpoint", daemon=True
+        )
+        self.hilo.start()
+        logger.info(f"Checkpoints del WAL en segundo plano iniciados ({os.getpid()})")
+
+    def detener(self):
+        self.parar.set()
+        if self.hilo is not None:
+            self.hilo.join(timeout=5)
+
+    def bucle(self):
+        ultimas_escritas = None
+        ultimo_cambio = time.monotonic()
+
+        while not self.parar.wait(settings.SQLITE_CHECKPOINT_INTERVALO):
+            paginas = paginas_pendientes()
+            if paginas is None:
+                continue
+            escritas, pendientes = paginas
+
+            ahora = time.monotonic()
+            if escritas != ultimas_escritas:
+                ultimas_escritas = escritas
+                ultimo_cambio = ahora
+
+            pendiente = pendientes * tamano_pagina()
+            with self.bloqueo:
+                self.metricas["pendiente_maximo"] = max(
+                    self.metricas["pendiente_maximo"], pendiente
+                )
+
+            if pendientes and (
+                pendiente >= settings.SQLITE_CHECKPOINT_TAMANO
+                or ahora - ultimo_cambio >= settings.SQLITE_CHECKPOINT_INACTIVIDAD
+            ):
+                # Si quedan páginas sin copiar (lectores activos), se reintenta en la próxima comprobación
+                self.checkpoint("PASSIVE")
+
+    def checkpoint(self, modo: str = "PASSIVE") -> bool:
+        """
+        Hace un checkpoint del WAL con una conexión propia.
+
+        Salida:
+            True si se copiaron a la base de datos todas las páginas del WAL.
+        """
+        inicio = time.perf_counter()
+        try:
+            conexion = sqlite3.connect(ruta_bd(), timeout=0)
+            try:
+                ocupado, paginas, copiadas = conexion.execute(
+                    f"PRAGMA wal_checkpoint({modo})"
+                ).fetchone()
+            finally:
+                conexion.close()
+        except sqlite3.Error as e:
+            logger.warning(f"Error en el checkpoint del WAL: {e}")
+            with self.bloqueo:
+                self.metricas["errores"] += 1
+            return False
+
+        duracion = time.perf_counter() - inicio
+        completo = not ocupado and paginas == copiadas
+        with self.bloqueo:
+            self.metricas["checkpoints"] += 1
+            self.metricas["checkpoints_incompletos"] += not completo
+            self.metricas["duracion_total"] += duracion
+            self.metricas["duracion_maxima"] = max(
+                self.metricas["duracion_maxima"], duracion
+            )
+            self.metricas["ultimo"] = {
+                "fecha": timezone.now().isoformat(),
+                "modo": modo,
+                "duracion": duracion,
+                "paginas_wal": paginas,
+                "paginas_copiadas": copiadas,
+                "completo": completo,
+            }
+
+        logger.debug(
+            f"Checkpoint {modo} del WAL en {duracion * 1000:.1f}ms: {copiadas}/{paginas} páginas"
+        )
+        return completo
+
+    def estado(self) -> dict:
+        with self.bloqueo:
+            metricas = dict(self.metricas)
+        metricas["activo"] = self.hilo is not None and self.hilo.is_alive()
+        metricas["tamano_wal"] = tamano_wal()
+        paginas = paginas_pendientes()
+        metricas["pendiente_wal"] = paginas[1] * tamano_pagina() if paginas else 0
+        metricas["escrituras"] = metricas_escrituras()
+        return metricas
+
+
+checkpointer = Checkpointer()
+
+
+def iniciar_checkpoints():
+    """Inicia el hilo de checkpoints en este proceso si `SQLITE_CHECKPOINT_AUTOMATICO` y la BD es SQLite."""
+    if not settings.SQLITE_CHECKPOINT_AUTOMATICO:
+        return
+    if settings.DATABASES["default"]["ENGINE"] != "django.db.backends.sqlite3":
+        return
+    checkpointer.iniciar()
+
+
+# Esperas por el bloqueo de escritura y reintentos de `escritura` en este proceso
+_metricas_escrituras = {
+    "transacciones": 0,
+    "esperas": 0,
+    "espera_total": 0.0,
+    "espera_maxima": 0.0,
+    "bloqueos": 0,
+    "reintentos": 0,
+    "fallos": 0,
+}
+_bloqueo_escrituras = threading.Lock()
+
+# Espera a partir de la que se considera que la transacción esperó por el bloqueo
+ESPERA_MINIMA = 0.001
+
+
+def metricas_escrituras() -> dict:
+    with _bloqueo_escrituras:
+        return dict(_metricas_escrituras)
+
+
+def _anotar(**valores):
+    with _bloqueo_escrituras:
+        for clave, valor in valores.items():
+            _metricas_escrituras[clave] += valor
+
+
+def es_bloqueo(error: Exception) -> bool:
+    mensaje = str(error).lower()
+    return "database is locked" in mensaje or "database table is locked" in mensaje
+
+
+def escritura(funcion):
+    """
+    Ejecuta `funcion` en una transacción, que con SQLite toma el bloqueo de escritura
+    al empezar (`transaction_mode` IMMEDIATE en DATABASES) y espera hasta `timeout`.
+    Si aun así la base de datos sigue bloqueada, se reintenta hasta `SQLITE_REINTENTOS`
+    veces con esperas aleatorias crecientes. Como el bloqueo se pide antes de ejecutar
+    nada, reintentar no repite ninguna escritura.
+
+    La función no debe enviar correos ni hacer otras operaciones lentas: mientras se
+    ejecuta, el resto de escrituras esperan.
+    """
+
+    @functools.wraps(funcion)
+    def envoltorio(*args, **kwargs):
+        # Dentro de otra transacción el bloqueo ya se tiene y no se puede reintentar
+        if connection.in_atomic_block:
+            return funcion(*args, **kwargs)
+
+        intento = 0
+        while True:
+            inicio = time.perf_counter()
+            try:
+                with transaction.atomic():
+                    espera = time.perf_counter() - inicio
+                    with _bloqueo_escrituras:
+                        _metricas_escrituras["transacciones"] += 1
+                        if espera >= ESPERA_MINIMA:
+                            _metricas_escrituras["esperas"] += 1
+                            _metricas_escrituras["espera_total"] += espera
+                            _metricas_escrituras["espera_maxima"] = max(
+                                _metricas_escrituras["espera_maxima"], espera
+                            )
+                    return funcion(*args, **kwargs)
+            except OperationalError as e:
+                if not es_bloqueo(e):
+                    raise
+                # El intento fallido también esperó hasta `timeout`
+                _anotar(
+                    bloqueos=1, esperas=1, espera_total=time.perf_counter() - inicio
+                )
+                if intento >= settings.SQLITE_REINTENTOS:
+                    _anotar(fallos=1)
+                    metricas.sqlite_bloqueos.inc()
+                    logger.error(
+                        f"Base de datos bloqueada tras {intento + 1} intentos en {funcion.__qualname__}"
+                    )
+                    raise
+
+            pausa = random.uniform(0, settings.SQLITE_REINTENTO_ESPERA * 2**intento)
+            logger.warning(
+                f"Base de datos bloqueada en {funcion.__qualname__}, reintento en {pausa * 1000:.0f}ms"
+            )
+            _anotar(reintentos=1)
+            metricas.sqlite_reintentos.inc()
+            intento += 1
+            time.sleep(pausa)
+
+    return envoltorio
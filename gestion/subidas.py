@@ -0,0 +1,186 @@
+# Copyright (C) 2025-now  p.fernandezf <p@fernandezf.es> & iago.rivas <delthia@delthia.com>
+
+import hashlib, logging, os, tempfile
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import TemporaryUploadedFile, UploadedFile
+from django.core.files.uploadhandler import (
+    FileUploadHandler,
+    SkipFile,
+    StopFutureHandlers,
+    StopUpload,
+)
+from django.forms import BaseForm
+from django.http import HttpRequest
+
+logger = logging.getLogger(__name__)
+
+# Campos de los formularios que contienen un CV
+CAMPOS_CV = ("cv",)
+
+# La cabecera y el marcador de fin pueden ir precedidos o seguidos de bytes basura
+CABECERA_PDF = b"%PDF-"
+FIN_PDF = b"%%EOF"
+MARGEN_PDF = 1024
+
+
+def es_cabecera_pdf(datos: bytes) -> bool:
+    return CABECERA_PDF in datos[:MARGEN_PDF]
+
+
+def es_final_pdf(datos: bytes) -> bool:
+    return FIN_PDF in datos[-MARGEN_PDF:]
+
+
+def ruta_sha256(sha256: str) -> str:
+    """Ruta de un CV por su contenido, repartidos en subdirectorios por los dos primeros caracteres."""
+    return f"cv/{sha256[:2]}/{sha256}.pdf"
+
+
+def sha256_archivo(archivo) -> str:
+    """SHA-256 de un archivo abierto, leído por bloques sin modificar su posición."""
+    posicion = archivo.tell()
+    archivo.seek(0)
+    resumen = hashlib.sha256()
+    while bloque := archivo.read(64 * 1024):
+        resumen.update(bloque)
+    archivo.seek(posicion)
+    return resumen.hexdigest()
+
+
+class AlmacenCV(FileSystemStorage):
+    """
+    Almacenamiento de los CV por su contenido (ver `ruta_sha256`): un archivo con
+    el mismo nombre tiene el mismo contenido, así que no se vuelve a escribir.
+    """
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault("allow_overwrite", True)
+        super().__init__(**kwargs)
+
+    def _save(self, name, content):
+        if self.exists(name):
+            return name
+        # Si dos subidas idénticas coinciden, el segundo rename reemplaza el archivo por otro igual
+        return super()._save(name, content)
+
+
+def almacen_cv():
+    return _almacen_cv
+
+
+_almacen_cv = AlmacenCV()
+
+
+class CVTemporal(TemporaryUploadedFile):
+    """
+    CV subido, guardado en `CV_DIRECTORIO_TEMPORAL`. Al estar en el mismo sistema
+    de ficheros que MEDIA_ROOT, el almacenamiento lo mueve a su ruta final con un
+    `rename` atómico en lugar de copiarlo.
+    """
+
+    def __init__(self, name, content_type, size, charset, content_type_extra=None):
+        os.makedirs(settings.CV_DIRECTORIO_TEMPORAL, exist_ok=True)
+        file = tempfile.NamedTemporaryFile(
+            suffix=".upload.pdf", dir=settings.CV_DIRECTORIO_TEMPORAL
+        )
+        UploadedFile.__init__(
+            self, file, name, content_type, size, charset, content_type_extra
+        )
+
+
+class CVUploadHandler(FileUploadHandler):
+    """
+    Recibe los CV a un archivo temporal comprobando mientras llegan que no superan
+    `CV_TAMANO_MAXIMO` y que empiezan por la cabecera de un PDF. Si no, descarta el
+    archivo sin seguir escribiéndolo y guarda el motivo en `request.errores_subida`
+    para mostrarlo en el formulario (`anadir_errores_subida`). Al terminar anota en
+    `es_pdf` si además tiene el marcador de fin, para `validador_pdf`, y en `sha256`
+    su resumen, calculado mientras se recibe, para `ruta_cv`.
+
+    Un archivo que no es un PDF se salta y se sigue leyendo el resto de la petición.
+    Uno demasiado grande detiene la subida sin leer lo que queda (`StopUpload` con
+    `connection_reset`): los campos posteriores del formulario se pierden y el servidor
+    cierra la conexión. El límite de la petición completa lo pone `client_max_body_size`
+    en nginx (doc/nginx-default), que debe ser algo mayor que `CV_TAMANO_MAXIMO`.
+
+    El resto de archivos pasan a los siguientes manejadores de FILE_UPLOAD_HANDLERS.
+    """
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.activo = False
+        self.cabecera = b""
+        self.final = b""
+
+    def descartar(self, motivo: str, detener: bool = False):
+        """Descarta el archivo y, con `detener`, el resto de la petición."""
+        logger.debug(f"CV descartado durante la subida: {motivo}")
+        if self.request is not None:
+            if not hasattr(self.request, "errores_subida"):
+                self.request.errores_subida = {}
+            self.request.errores_subida[self.field_name] = motivo
+        if detener:
+            raise StopUpload(connection_reset=True)
+        raise SkipFile(motivo)
+
+    def new_file(self, field_name, *args, **kwargs):
+        super().new_file(field_name, *args, **kwargs)
+        self.activo = field_name in CAMPOS_CV
+        if not self.activo:
+            return
+
+        self.cabecera = b""
+        self.final = b""
+        self.resumen = hashlib.sha256()
+        self.file = CVTemporal(
+            self.file_name, self.content_type, 0, self.charset, self.content_type_extra
+        )
+        if self.content_length and self.content_length > settings.CV_TAMANO_MAXIMO:
+            self.descartar(self.mensaje_tamano(), detener=True)
+
+        # Ningún otro manejador recibe este archivo
+        raise StopFutureHandlers()
+
+    def receive_data_chunk(self, raw_data, start):
+        if not self.activo:
+            return raw_data
+
+        if start + len(raw_data) > settings.CV_TAMANO_MAXIMO:
+            self.descartar(self.mensaje_tamano(), detener=True)
+
+        if len(self.cabecera) < MARGEN_PDF:
+            self.cabecera += raw_data[: MARGEN_PDF - len(self.cabecera)]
+            if len(self.cabecera) >= MARGEN_PDF and not es_cabecera_pdf(self.cabecera):
+                self.descartar("El archivo no es un PDF")
+
+        self.final = (self.final + raw_data)[-MARGEN_PDF:]
+        self.resumen.update(raw_data)
+        self.file.write(raw_data)
+        return None
+
+    def file_complete(self, file_size):
+        if not self.activo:
+            return None
+
+        # Aquí ya no se puede descartar el archivo: el resultado lo comprueba `validador_pdf`
+        self.file.es_pdf = es_cabecera_pdf(self.cabecera) and es_final_pdf(self.final)
+        self.file.sha256 = self.resumen.hexdigest()
+        self.file.seek(0)
+        self.file.size = file_size
+        return self.file
+
+    def mensaje_tamano(self) -> str:
+        return f"El CV no puede ocupar más de {settings.CV_TAMANO_MAXIMO / (1024 * 1024):g} MB"
+
+
+def anadir_errores_subida(request: HttpRequest, form: BaseForm):
+    """
+    Muestra en el formulario los archivos descartados durante la subida por `CVUploadHandler`,
+    en lugar del error genérico de campo obligatorio.
+    """
+    for campo, motivo in getattr(request, "errores_subida", {}).items():
+        if campo in form.fields:
+            form.errors.pop(campo, None)
+            form.add_error(campo, motivo)
@@ -0,0 +1,194 @@
+# Copyright (C) 2025-now  p.fernandezf <p@fernandezf.es> & iago.rivas <delthia@delthia.com>
+
+import logging, time
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import Q
+from django.utils import timezone
+
+from gestion.busqueda import actualizar_indice, extraer_pendientes
+from gestion.models import SolicitudTarea, Token
+from gestion.seleccion import promocionar_lista_espera
+from gestion.utils import encolar_correos, enviar_correos_pendientes
+
+logger = logging.getLogger(__name__)
+
+
+def recordatorios_tokens() -> int:
+    """
+    Encola un recordatorio para cada token sin usar que expira dentro de
+    `RECORDATORIO_TOKENS_ANTELACION` y del que aún no se ha avisado.
+
+    Salida:
+        Número de recordatorios encolados.
+    """
+    ahora = timezone.now()
+    proximos = Token.objects.filter(
+        fecha_uso__isnull=True,
+        fecha_recordatorio__isnull=True,
+        fecha_expiracion__gt=ahora,
+        fecha_expiracion__lte=ahora + settings.RECORDATORIO_TOKENS_ANTELACION,
+    ).filter(
+        Q(tipo="VERIFICACION", persona__fecha_verificacion_correo__isnull=True)
+        | Q(
+            tipo="CONFIRMACION",
+            persona__fecha_confirmacion_plaza__isnull=True,
+            persona__fecha_rechazo_plaza__isnull=True,
+        )
+    )
+
+    encolados = 0
+    tokens = list(proximos.order_by().values_list("pk", "tipo", "persona_id"))
+    for tipo in ("VERIFICACION", "CONFIRMACION"):
+        # Un solo recordatorio por persona aunque tenga varios tokens
+        correos = list({correo for _pk, t, correo in tokens if t == tipo})
+        if correos:
+            encolados += encolar_correos(f"RECORDATORIO_{tipo}", correos)
+
+    lote = settings.TOKENS_TAMANO_LOTE
+    for i in range(0, len(tokens), lote):
+        Token.objects.filter(pk__in=[pk for pk, *_ in tokens[i : i + lote]]).update(
+            fecha_recordatorio=ahora
+        )
+
+    return encolados
+
+
+def limpieza_tokens() -> int:
+    """
+    Elimina por lotes los tokens expirados sin usar que ya no pueden servir:
+    los de verificación de Personas ya verificadas y los de confirmación de
+    Personas que ya confirmaron o rechazaron la plaza, una vez pasado
+    `TOKENS_RETENCION` desde su expiración.
+
+    Los tokens usados se conservan porque son el enlace con el que cada Persona
+    consulta sus datos, y los de confirmación caducados de Personas pendientes
+    indican que su plaza quedó libre.
+
+    Salida:
+        Número de tokens eliminados.
+    """
+    caducados = Token.objects.filter(
+        fecha_uso__isnull=True,
+        fecha_expiracion__lt=timezone.now() - settings.TOKENS_RETENCION,
+    ).filter(
+        Q(tipo="VERIFICACION", persona__fecha_verificacion_correo__isnull=False)
+        | Q(tipo="CONFIRMACION", persona__fecha_confirmacion_plaza__isnull=False)
+        | Q(tipo="CONFIRMACION", persona__fecha_rechazo_plaza__isnull=False)
+    )
+
+    eliminados = 0
+    while True:
+        lote = list(
+            caducados.order_by().values_list("pk", flat=True)[
+                : settings.TOKENS_TAMANO_LOTE
+            ]
+        )
+        if not lote:
+            break
+        eliminados += Token.objects.filter(pk__in=lote).delete()[0]
+
+    return eliminados
+
+
+def enviar_correos() -> int:
+    enviados, _errores = enviar_correos_pendientes()
+    return enviados
+
+
+def promocionar() -> int:
+    return len(promocionar_lista_espera())
+
+
+def indexar_cvs() -> int:
+    """Extrae el texto de un lote de CVs nuevos y actualiza el índice de búsqueda."""
+    extraer_pendientes()
+    return actualizar_indice()
+
+
+TAREAS = {
+    "enviar_correos_pendientes": enviar_correos,
+    "recordatorios_tokens": recordatorios_tokens,
+    "promocionar_lista_espera": promocionar,
+    "limpieza_tokens": limpieza_tokens,
+    "indexar_cvs": indexar_cvs,
+}
+
+
+def solicitar_tarea(nombre: str):
+    """
+    Pide que el proceso de las tareas periódicas (`bucle_tareas`) ejecute la tarea en
+    cuanto pueda, para no hacer en una petición el trabajo de una tarea. Si se llama
+    dentro de una transacción, la solicitud solo cuenta si se confirma.
+    """
+    if nombre not in TAREAS:
+        raise ValueError(f"Tarea desconocida: '{nombre}'")
+    # Si ya estaba solicitada, basta con la solicitud anterior
+    SolicitudTarea.objects.bulk_create(
+        [SolicitudTarea(nombre=nombre)], ignore_conflicts=True
+    )
+
+
+def tareas_solicitadas(nombres) -> set[str]:
+    """
+    Tareas de `nombres` con una solicitud pendiente (`solicitar_tarea`). Las solicitudes
+    se eliminan al leerlas: las que lleguen después piden otra ejecución.
+    """
+    solicitudes = SolicitudTarea.objects.filter(nombre__in=nombres)
+    solicitadas = set(solicitudes.values_list("nombre", flat=True))
+    if solicitadas:
+        SolicitudTarea.objects.filter(nombre__in=solicitadas).delete()
+    return solicitadas
+
+
+def ejecutar_tarea(nombre: str) -> int | None:
+    """
+    Ejecuta una tarea registrada en `TAREAS`, registrando su duración.
+    Los errores se registran y no se propagan, para no detener el resto de tareas.
+
+    Salida:
+        Resultado de la tarea o None si falló.
+    """
+    close_old_connections()
+    inicio = time.perf_counter()
+    try:
+        resultado = TAREAS[nombre]()
+    except Exception as e:
+        logger.error(f"Error en la tarea periódica '{nombre}':")
+        logger.error(e, stack_info=True)
+        return None
+    finally:
+        close_old_connections()
+
+    logger.info(
+        f"Tarea '{nombre}' completada en {time.perf_counter() - inicio:.2f}s: {resultado}"
+    )
+    return resultado
+
+
+def bucle_tareas(tareas: dict[str, int], parar=lambda: False):
+    """
+    Ejecuta cada tarea cuando le toca según su intervalo en segundos o cuando se
+    solicita (`solicitar_tarea`), hasta que `parar()` devuelva True. Todas las tareas
+    se ejecutan una vez al arrancar.
+    """
+    proxima = {nombre: 0.0 for nombre in tareas}
+
+    while not parar():
+        try:
+            solicitadas = tareas_solicitadas(tareas)
+        except Exception as e:
+            logger.error("Error al consultar las tareas solicitadas:")
+            logger.error(e, stack_info=True)
+            solicitadas = set()
+
+        ahora = time.monotonic()
+        for nombre, intervalo in tareas.items():
+            if proxima[nombre] <= ahora or nombre in solicitadas:
+                ejecutar_tarea(nombre)
+                proxima[nombre] = time.monotonic() + intervalo
+
+        espera = min(proxima.values()) - time.monotonic()
+        if espera > 0:
+            time.sleep(min(espera, 1))
@@ -1,3 +1,964 @@
-from django.test import TestCase
+import hashlib, zlib
+from datetime import date, timedelta
+from io import BytesIO, StringIO
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.contrib.messages import get_messages
+from django.core import signing
+from django.core.cache import cache
+from django.core.files.uploadhandler import SkipFile, StopFutureHandlers, StopUpload
+from django.core.management import call_command
+from django.db import OperationalError, connection
+from django.http.multipartparser import MultiPartParser
+from django.test import (
+    RequestFactory,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from gestion import eventos, panel
+from gestion.cvs import respuesta_cv
+from gestion.duplicados import buscar_duplicados
+from gestion.models import (
+    CambioNormalizacion,
+    CorreoPendiente,
+    Evento,
+    Mentor,
+    Normalizacion,
+    Participante,
+    Persona,
+    Presencia,
+    RestriccionAlimentaria,
+    SolicitudTarea,
+    Token,
+)
+from gestion.normalizacion import aplicar_normalizacion, deshacer_normalizacion
+from gestion.pdf import DESCOMPRIMIDO_MAXIMO, _objetos, extraer_texto
+from gestion.seleccion import aplicar_seleccion, promocionar_lista_espera, seleccionar
+from gestion.sqlite import escritura
+from gestion.subidas import CVUploadHandler
+from gestion.tareas import (
+    TAREAS,
+    bucle_tareas,
+    limpieza_tokens,
+    recordatorios_tokens,
+    solicitar_tarea,
+    tareas_solicitadas,
+)
+from gestion.tokens import firmar, leer
+
+
+def crear_participante(n: int, **campos) -> Participante:
+    datos = {
+        "correo": f"participante{n}@example.com",
+        "nombre": f"Participante {n}",
+        "dni": f"{n:08d}Z",
+        "genero": "H",
+        "talla_camiseta": "M",
+        "telefono": f"6{n:08d}",
+        "fecha_nacimiento": date(2000, 1, 1),
+        "nivel_estudio": "UNIVERSIDAD",
+    }
+    return Participante.objects.create(**(datos | campos))
+
+
+class ConsultasTokenTests(TestCase):
+    """Consultas por petición de las páginas a las que se accede con un Token."""
+
+    @classmethod
+    def setUpTestData(cls):
+        ahora = timezone.now()
+        cls.participante = Participante.objects.create(
+            correo="participante@example.com",
+            nombre="Participante",
+            dni="00000000A",
+            genero="H",
+            talla_camiseta="M",
+            telefono="600000000",
+            fecha_nacimiento=date(2000, 1, 1),
+            nivel_estudio="UNIVERSIDAD",
+            fecha_verificacion_correo=ahora,
+            fecha_aceptacion=ahora,
+        )
+        cls.participante.restricciones_alimentarias.set(
+            [RestriccionAlimentaria.objects.create(nombre="Vegana")]
+        )
+        cls.mentor = Mentor.objects.create(
+            correo="mentor@example.com",
+            nombre="Mentor",
+            dni="00000001B",
+            genero="M",
+            talla_camiseta="L",
+            telefono="600000001",
+            fecha_nacimiento=date(1990, 1, 1),
+            fecha_verificacion_correo=ahora,
+        )
+
+        expiracion = ahora + timedelta(days=7)
+        cls.verificacion = Token.objects.create(
+            persona=cls.participante,
+            tipo="VERIFICACION",
+            fecha_expiracion=expiracion,
+            fecha_uso=ahora,
+        )
+        cls.confirmacion = Token.objects.create(
+            persona=cls.participante, tipo="CONFIRMACION", fecha_expiracion=expiracion
+        )
+        cls.verificacion_mentor = Token.objects.create(
+            persona=cls.mentor,
+            tipo="VERIFICACION",
+            fecha_expiracion=expiracion,
+            fecha_uso=ahora,
+        )
+
+    def test_verificar_correo_participante(self):
+        # Token con Persona y Participante, restricciones de la Persona y opciones del formulario
+        with self.assertNumQueries(3):
+            respuesta = self.client.get(
+                reverse("verificar-correo", args=[self.verificacion.token])
+            )
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertContains(respuesta, "Participante")
+
+    def test_verificar_correo_mentor(self):
+        with self.assertNumQueries(3):
+            respuesta = self.client.get(
+                reverse("verificar-correo", args=[self.verificacion_mentor.token])
+            )
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertContains(respuesta, "Mentor")
+
+    def test_confirmar_plaza(self):
+        # Token con Persona y Participante, y los Token de la Persona
+        with self.assertNumQueries(2):
+            respuesta = self.client.get(
+                reverse("confirmar-plaza", args=[self.confirmacion.token])
+            )
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertContains(
+            respuesta, reverse("verificar-correo", args=[self.verificacion.token])
+        )
+
+    @override_settings(TOKENS_FIRMADOS=True)
+    def test_verificar_correo_firmado(self):
+        # La Persona por su referencia, sin consultar la tabla de tokens
+        with CaptureQueriesContext(connection) as consultas:
+            respuesta = self.client.get(
+                reverse("verificar-correo", args=[self.verificacion.enlace()])
+            )
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertContains(respuesta, "Participante")
+        self.assertEqual(len(consultas), 3)
+        self.assertFalse(any("gestion_token" in c["sql"] for c in consultas))
+
+    @override_settings(TOKENS_FIRMADOS=True)
+    def test_confirmar_plaza_firmado(self):
+        # La Persona con su Participante y sus Token
+        with self.assertNumQueries(2):
+            respuesta = self.client.get(
+                reverse("confirmar-plaza", args=[self.confirmacion.enlace()])
+            )
+        self.assertContains(respuesta, "/aceptar")
+
+    def test_rechazar_plaza_firmado(self):
+        url = reverse("rechazar-plaza", args=[self.confirmacion.token])
+        with self.assertNumQueries(1):
+            self.client.get(url)
+        # La página no necesita la base de datos
+        url = reverse("rechazar-plaza", args=[firmar(self.confirmacion)])
+        with self.assertNumQueries(0):
+            respuesta = self.client.get(url)
+        self.assertContains(respuesta, url)
+
+    def test_aceptar_plaza_firmado(self):
+        otro = crear_participante(1)
+        token, _verificacion = Token.objects.bulk_create(
+            Token(
+                persona=otro,
+                tipo=tipo,
+                fecha_expiracion=self.confirmacion.fecha_expiracion,
+            )
+            for tipo in ("CONFIRMACION", "VERIFICACION")
+        )
+        with CaptureQueriesContext(connection) as con_uuid:
+            self.client.post(reverse("aceptar-plaza", args=[self.confirmacion.token]))
+        # Sin leer el Token antes de marcarlo como usado
+        with CaptureQueriesContext(connection) as firmado:
+            self.client.post(reverse("aceptar-plaza", args=[firmar(token)]))
+        self.assertLess(len(firmado), len(con_uuid))
+        for participante in (self.participante, otro):
+            participante.refresh_from_db()
+            self.assertTrue(participante.confirmado())
+
+
+class NormalizacionTests(TestCase):
+    def setUp(self):
+        self.participantes = [
+            crear_participante(n, ciudad=ciudad)
+            for n, ciudad in enumerate(("A Coruña", "Coruña", "Coruña", "Lugo"))
+        ]
+
+    def test_aplicar_y_deshacer(self):
+        normalizacion = aplicar_normalizacion("ciudad", ["Coruña"], "A Coruña", "admin")
+        self.assertEqual(normalizacion.cambios.count(), 2)
+        self.assertEqual(Participante.objects.filter(ciudad="A Coruña").count(), 3)
+
+        # Un participante modificado después no se restaura
+        Participante.objects.filter(pk=self.participantes[2].pk).update(ciudad="Ferrol")
+        self.assertEqual(deshacer_normalizacion(normalizacion, "admin"), 1)
+        self.assertEqual(
+            Participante.objects.get(pk=self.participantes[1].pk).ciudad, "Coruña"
+        )
+
+    def test_deshacer_dos_veces(self):
+        normalizacion = aplicar_normalizacion("ciudad", ["Coruña"], "A Coruña", "admin")
+        # Otra petición con la normalización leída antes de deshacerla
+        anterior = Normalizacion.objects.get(pk=normalizacion.pk)
+        deshacer_normalizacion(normalizacion, "admin")
+        with self.assertRaises(ValueError):
+            deshacer_normalizacion(anterior, "admin")
+        self.assertEqual(CambioNormalizacion.objects.count(), 2)
+
+    def test_deshacer_tras_cambiar_correo(self):
+        normalizacion = aplicar_normalizacion("ciudad", ["Coruña"], "A Coruña", "admin")
+        call_command(
+            "actualizar_correo",
+            self.participantes[1].correo,
+            "nuevo@example.com",
+            stdout=StringIO(),
+        )
+        self.assertEqual(deshacer_normalizacion(normalizacion, "admin"), 2)
+        self.assertEqual(
+            Participante.objects.get(pk="nuevo@example.com").ciudad, "Coruña"
+        )
+
+
+class DuplicadosTests(TestCase):
+    def motivos(self) -> dict:
+        return {par["correos"]: par["motivos"] for par in buscar_duplicados()}
+
+    def test_correo_parecido_sin_otra_coincidencia(self):
+        crear_participante(99, correo="persona99@example.com", nombre="Ana Pérez")
+        crear_participante(997, correo="persona997@example.com", nombre="Luis Díaz")
+        self.assertEqual(self.motivos(), {})
+
+    def test_correo_y_nombre_parecidos(self):
+        crear_participante(1, correo="ana.garcia@example.com", nombre="Ana García")
+        crear_participante(22, correo="anagarcai@gmail.com", nombre="Ana Garcia")
+        crear_participante(333, correo="anagarcia@example.com", nombre="Luis Díaz")
+        self.assertEqual(
+            self.motivos(),
+            {
+                ("ana.garcia@example.com", "anagarcai@gmail.com"): {
+                    "CORREO",
+                    "NOMBRE_FECHA",
+                }
+            },
+        )
+
+    def test_correo_y_dni_parecidos(self):
+        crear_participante(
+            1, correo="luis.diaz@example.com", nombre="Luis Díaz", dni="12345678Z"
+        )
+        crear_participante(
+            2, correo="luisdiaz1@example.com", nombre="Ana Pérez", dni="12345679Z"
+        )
+        self.assertEqual(
+            self.motivos(),
+            {("luis.diaz@example.com", "luisdiaz1@example.com"): {"CORREO"}},
+        )
+
+    def test_mismo_dni(self):
+        crear_participante(1, correo="uno@example.com", dni="12345678-Z")
+        crear_participante(2, correo="otro@example.com", dni="12345678z")
+        self.assertEqual(
+            self.motivos(), {("otro@example.com", "uno@example.com"): {"DNI"}}
+        )
+
+
+class SeleccionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        inicio = timezone.now() - timedelta(days=10)
+        # Candidatos verificados en este orden: H, M, H, M, H
+        cls.candidatos = [
+            crear_participante(
+                n,
+                genero="HM"[n % 2],
+                fecha_verificacion_correo=inicio + timedelta(hours=n),
+            )
+            for n in range(5)
+        ]
+        # Ocupa plaza y cuenta para la cuota de su género
+        cls.aceptada = crear_participante(
+            10, genero="M", fecha_verificacion_correo=inicio, fecha_aceptacion=inicio
+        )
+        # Rechazó la plaza: ni la ocupa ni es candidata
+        crear_participante(
+            11,
+            genero="M",
+            fecha_verificacion_correo=inicio,
+            fecha_aceptacion=inicio,
+            fecha_rechazo_plaza=inicio,
+        )
+        # Sin verificar el correo
+        crear_participante(12)
+
+    def correos(self, indices: list[int]) -> list[str]:
+        return [self.candidatos[i].correo for i in indices]
+
+    def test_plazas(self):
+        resultado = seleccionar(4, {}, ["fecha_verificacion_correo"])
+        self.assertEqual(resultado["ocupadas"], 1)
+        self.assertEqual(resultado["aceptados"], self.correos([0, 1, 2]))
+        self.assertEqual(resultado["en_espera"], self.correos([3, 4]))
+
+    def test_orden_descendente(self):
+        resultado = seleccionar(3, {}, ["-fecha_verificacion_correo"])
+        self.assertEqual(resultado["aceptados"], self.correos([4, 3]))
+
+    def test_cuotas(self):
+        resultado = seleccionar(
+            10,
+            {"genero": {"M": 2}, "tipo": {"participante": 5}},
+            ["fecha_verificacion_correo"],
+        )
+        # La aceptada ya ocupa una de las dos plazas de "M"
+        self.assertEqual(resultado["aceptados"], self.correos([0, 1, 2, 4]))
+        self.assertEqual(resultado["en_espera"], self.correos([3]))
+        self.assertEqual(resultado["descartados_cuota"], {("genero", "M"): 1})
+        self.assertEqual(resultado["recuento"]["genero"], {"H": 3, "M": 2})
+
+    def test_plaza_caducada(self):
+        # Token de confirmación caducado sin confirmar: la plaza queda libre
+        Token.objects.create(
+            persona=self.aceptada,
+            tipo="CONFIRMACION",
+            fecha_expiracion=timezone.now() - timedelta(days=1),
+        )
+        resultado = seleccionar(2, {}, ["fecha_verificacion_correo"])
+        self.assertEqual(resultado["ocupadas"], 0)
+        self.assertEqual(resultado["aceptados"], self.correos([0, 1]))
+
+    def test_campo_desconocido(self):
+        with self.assertRaises(ValueError):
+            seleccionar(2, {"dni": {}}, [])
+        with self.assertRaises(ValueError):
+            seleccionar(2, {}, ["dni"])
+
+
+@override_settings(PLAZAS_EVENTO=2)
+class ListaEsperaTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        inicio = timezone.now() - timedelta(days=10)
+        cls.aceptada = crear_participante(
+            0, fecha_verificacion_correo=inicio, fecha_aceptacion=inicio
+        )
+        cls.confirmacion = Token.objects.create(
+            persona=cls.aceptada,
+            tipo="CONFIRMACION",
+            fecha_expiracion=timezone.now() + timedelta(days=7),
+        )
+        cls.espera = [
+            crear_participante(n, fecha_verificacion_correo=inicio + timedelta(hours=n))
+            for n in range(1, 4)
+        ]
+
+    def test_aplicar_seleccion(self):
+        aceptados = aplicar_seleccion(
+            [self.aceptada.correo, self.espera[0].correo], "admin"
+        )
+        # La que ya estaba aceptada no se vuelve a aceptar
+        self.assertEqual(aceptados, [self.espera[0].correo])
+        self.assertEqual(
+            list(
+                Evento.objects.filter(tipo="ACEPTACION").values_list(
+                    "persona_id", "usuario"
+                )
+            ),
+            [(self.espera[0].correo, "admin")],
+        )
+
+    def test_promocionar(self):
+        promocionados = promocionar_lista_espera()
+        self.assertEqual(promocionados, [self.espera[0].correo])
+        self.assertTrue(
+            Token.objects.filter(
+                persona=self.espera[0], tipo="CONFIRMACION", fecha_uso__isnull=True
+            ).exists()
+        )
+        self.assertEqual(
+            list(CorreoPendiente.objects.values_list("persona_id", "tipo")),
+            [(self.espera[0].correo, "CONFIRMACION")],
+        )
+        # Sin plazas libres no se promociona a nadie más
+        self.assertEqual(promocionar_lista_espera(), [])
+
+    def test_rechazo_solicita_promocion(self):
+        respuesta = self.client.post(
+            reverse("rechazar-plaza", args=[self.confirmacion.token])
+        )
+        self.assertEqual(respuesta.status_code, 302)
+        # La vista no promociona: lo pide a las tareas periódicas
+        self.assertFalse(
+            Persona.objects.filter(
+                correo__in=[p.correo for p in self.espera],
+                fecha_aceptacion__isnull=False,
+            ).exists()
+        )
+        self.assertTrue(
+            SolicitudTarea.objects.filter(nombre="promocionar_lista_espera").exists()
+        )
+
+        self.assertEqual(
+            tareas_solicitadas(["promocionar_lista_espera"]),
+            {"promocionar_lista_espera"},
+        )
+        self.assertFalse(SolicitudTarea.objects.exists())
+        self.assertEqual(
+            promocionar_lista_espera(), [p.correo for p in self.espera[:2]]
+        )
+
+    def test_actualizar_correo_con_correos_encolados(self):
+        promocionar_lista_espera()
+        call_command(
+            "actualizar_correo",
+            self.espera[0].correo,
+            "nuevo@example.com",
+            stdout=StringIO(),
+        )
+        self.assertEqual(
+            list(CorreoPendiente.objects.values_list("persona_id", flat=True)),
+            ["nuevo@example.com"],
+        )
+
+
+class SolicitudTareasTests(TestCase):
+    def test_bucle_ejecuta_solicitadas(self):
+        ejecutadas = []
+        tareas = {
+            "a": lambda: ejecutadas.append("a"),
+            "b": lambda: ejecutadas.append("b"),
+        }
+        vueltas = 0
+
+        def parar():
+            nonlocal vueltas
+            vueltas += 1
+            if vueltas == 2:
+                # Dos solicitudes antes de que se atiendan: una sola ejecución
+                solicitar_tarea("b")
+                solicitar_tarea("b")
+            return vueltas > 3
+
+        with (
+            mock.patch.dict(TAREAS, tareas, clear=True),
+            mock.patch("gestion.tareas.close_old_connections"),
+            mock.patch("gestion.tareas.time.sleep"),
+        ):
+            bucle_tareas({"a": 3600, "b": 3600}, parar)
+
+        # Todas al arrancar y "b" otra vez por la solicitud
+        self.assertEqual(ejecutadas, ["a", "b", "b"])
+        self.assertFalse(SolicitudTarea.objects.exists())
+
+    def test_tarea_desconocida(self):
+        with self.assertRaises(ValueError):
+            solicitar_tarea("desconocida")
+
+
+@override_settings(
+    RECORDATORIO_TOKENS_ANTELACION=timedelta(days=2),
+    TOKENS_RETENCION=timedelta(days=30),
+    TOKENS_TAMANO_LOTE=2,
+)
+class TareasTokensTests(TestCase):
+    def setUp(self):
+        self.ahora = timezone.now()
+        self.sin_verificar = crear_participante(1)
+        self.verificada = crear_participante(2, fecha_verificacion_correo=self.ahora)
+        self.aceptada = crear_participante(
+            3, fecha_verificacion_correo=self.ahora, fecha_aceptacion=self.ahora
+        )
+        self.rechazada = crear_participante(
+            4,
+            fecha_verificacion_correo=self.ahora,
+            fecha_aceptacion=self.ahora,
+            fecha_rechazo_plaza=self.ahora,
+        )
+
+    def token(self, persona, tipo: str, expira: timedelta, **campos) -> Token:
+        return Token.objects.create(
+            persona=persona, tipo=tipo, fecha_expiracion=self.ahora + expira, **campos
+        )
+
+    def test_recordatorios(self):
+        self.token(self.sin_verificar, "VERIFICACION", timedelta(days=1))
+        # Dos tokens de la misma persona: un solo recordatorio
+        self.token(self.aceptada, "CONFIRMACION", timedelta(days=1))
+        self.token(self.aceptada, "CONFIRMACION", timedelta(hours=1))
+        # Todavía lejos de expirar, ya verificada o plaza rechazada
+        self.token(self.sin_verificar, "VERIFICACION", timedelta(days=5))
+        self.token(self.verificada, "VERIFICACION", timedelta(days=1))
+        self.token(self.rechazada, "CONFIRMACION", timedelta(days=1))
+
+        self.assertEqual(recordatorios_tokens(), 2)
+        self.assertEqual(
+            set(CorreoPendiente.objects.values_list("persona_id", "tipo")),
+            {
+                (self.sin_verificar.correo, "RECORDATORIO_VERIFICACION"),
+                (self.aceptada.correo, "RECORDATORIO_CONFIRMACION"),
+            },
+        )
+        self.assertEqual(
+            Token.objects.filter(fecha_recordatorio__isnull=False).count(), 3
+        )
+        # Solo se avisa una vez
+        self.assertEqual(recordatorios_tokens(), 0)
+
+    def test_limpieza(self):
+        caducado = timedelta(days=-31)
+        eliminados = [
+            self.token(self.verificada, "VERIFICACION", caducado),
+            self.token(self.verificada, "VERIFICACION", caducado),
+            self.token(self.rechazada, "CONFIRMACION", caducado),
+        ]
+        conservados = [
+            # Usado: es el enlace con el que la persona consulta sus datos
+            self.token(self.verificada, "VERIFICACION", caducado, fecha_uso=self.ahora),
+            # Sin verificar todavía
+            self.token(self.sin_verificar, "VERIFICACION", caducado),
+            # Indica que la plaza de la aceptada quedó libre
+            self.token(self.aceptada, "CONFIRMACION", caducado),
+            # Dentro de `TOKENS_RETENCION`
+            self.token(self.verificada, "VERIFICACION", timedelta(days=-29)),
+        ]
+
+        self.assertEqual(limpieza_tokens(), len(eliminados))
+        self.assertEqual(
+            set(Token.objects.values_list("pk", flat=True)),
+            {token.pk for token in conservados},
+        )
+
+
+class TokensFirmadosTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.participante = crear_participante(1)
+        cls.token = Token.objects.create(
+            persona=cls.participante,
+            tipo="VERIFICACION",
+            fecha_expiracion=timezone.now() + timedelta(days=7),
+        )
+
+    def test_firmar_y_leer(self):
+        valor = firmar(self.token)
+        token, referencia = leer(valor, "VERIFICACION")
+        self.assertEqual(token.token, self.token.token)
+        self.assertEqual(referencia, self.participante.referencia)
+        self.assertEqual(
+            token.fecha_expiracion, self.token.fecha_expiracion.replace(microsecond=0)
+        )
+        # La firma depende del tipo
+        self.assertIsNone(leer(valor, "CONFIRMACION"))
+
+    def test_sin_datos_de_la_persona(self):
+        datos = signing.loads(firmar(self.token), salt="gestion.tokens.VERIFICACION")
+        self.assertEqual(set(datos), {"t", "p", "e"})
+        self.assertNotIn(self.participante.correo, str(datos))
+
+    def test_manipulado(self):
+        valor = firmar(self.token)
+        datos, firma = valor.rsplit(":", 1)
+        otra = "A" if firma[0] != "A" else "B"
+        self.assertIsNone(leer(f"{datos}:{otra}{firma[1:]}", "VERIFICACION"))
+        self.assertIsNone(leer(str(self.token.token), "VERIFICACION"))
+        self.assertIsNone(leer("", "VERIFICACION"))
+
+    def test_otra_clave(self):
+        with override_settings(SECRET_KEY="otra-clave"):
+            valor = firmar(self.token)
+        self.assertIsNone(leer(valor, "VERIFICACION"))
+
+    def test_token_eliminado(self):
+        valor = firmar(self.token)
+        Token.objects.filter(pk=self.token.pk).delete()
+        respuesta = self.client.get(reverse("verificar-correo", args=[valor]))
+        self.assertContains(respuesta, "Token inválido")
+
+    def test_expirado(self):
+        # Manda la expiración del enlace, sin leer la fila del Token
+        self.token.fecha_expiracion = timezone.now() - timedelta(days=1)
+        respuesta = self.client.get(
+            reverse("verificar-correo", args=[firmar(self.token)])
+        )
+        self.assertContains(respuesta, "Token expirado")
+        self.participante.refresh_from_db()
+        self.assertIsNone(self.participante.fecha_verificacion_correo)
+
+    def test_usado(self):
+        confirmacion = Token.objects.create(
+            persona=self.participante,
+            tipo="CONFIRMACION",
+            fecha_expiracion=timezone.now() + timedelta(days=7),
+            fecha_uso=timezone.now(),
+        )
+        self.client.post(reverse("aceptar-plaza", args=[firmar(confirmacion)]))
+        self.participante.refresh_from_db()
+        self.assertFalse(self.participante.confirmado())
+
+    def test_cambio_de_correo(self):
+        valor = firmar(self.token)
+        call_command(
+            "actualizar_correo",
+            self.participante.correo,
+            "nuevo@example.com",
+            stdout=StringIO(),
+        )
+        self.client.get(reverse("verificar-correo", args=[valor]))
+        self.assertTrue(Persona.objects.get(pk="nuevo@example.com").verificado())
+
+
+PDF = b"%PDF-1.4\n" + b"0" * 3000 + b"\n%%EOF\n"
+
+
+class SubidaCVTests(TestCase):
+    def setUp(self):
+        temporal = TemporaryDirectory()
+        self.addCleanup(temporal.cleanup)
+        ajustes = override_settings(
+            CV_TAMANO_MAXIMO=4096, CV_DIRECTORIO_TEMPORAL=temporal.name
+        )
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        self.request = RequestFactory().post("/")
+
+    def manejador(self, campo="cv", tamano=None) -> CVUploadHandler:
+        manejador = CVUploadHandler(self.request)
+        manejador.handle_raw_input(None, {}, tamano, "limite")
+        try:
+            manejador.new_file(campo, "cv.pdf", "application/pdf", tamano)
+        except StopFutureHandlers:
+            pass
+        return manejador
+
+    def recibir(self, manejador: CVUploadHandler, datos: bytes, bloque=1024):
+        for inicio in range(0, len(datos), bloque):
+            manejador.receive_data_chunk(datos[inicio : inicio + bloque], inicio)
+        return manejador.file_complete(len(datos))
+
+    def test_pdf(self):
+        archivo = self.recibir(self.manejador(), PDF)
+        self.assertTrue(archivo.es_pdf)
+        self.assertEqual(archivo.sha256, hashlib.sha256(PDF).hexdigest())
+        self.assertEqual(archivo.read(), PDF)
+
+    def test_sin_final(self):
+        archivo = self.recibir(self.manejador(), PDF[:-10])
+        self.assertFalse(archivo.es_pdf)
+
+    def test_no_es_pdf(self):
+        # Se salta el archivo y se sigue leyendo la petición
+        with self.assertRaises(SkipFile):
+            self.recibir(self.manejador(), b"x" * 2048)
+        self.assertEqual(self.request.errores_subida, {"cv": "El archivo no es un PDF"})
+
+    def test_demasiado_grande(self):
+        with self.assertRaises(StopUpload) as contexto:
+            self.recibir(self.manejador(), PDF + b"0" * 4096)
+        self.assertTrue(contexto.exception.connection_reset)
+        self.assertIn("no puede ocupar más de", self.request.errores_subida["cv"])
+
+    def test_tamano_declarado(self):
+        with self.assertRaises(StopUpload):
+            self.manejador(tamano=8192)
+
+    def test_otros_campos(self):
+        manejador = self.manejador("foto")
+        self.assertEqual(manejador.receive_data_chunk(b"datos", 0), b"datos")
+        self.assertIsNone(manejador.file_complete(5))
+
+    def test_peticion_detenida(self):
+        # Los campos anteriores al CV se conservan; el resto de la petición no se lee
+        cuerpo = b"".join(
+            (
+                b"--limite\r\n",
+                b'Content-Disposition: form-data; name="nombre"\r\n\r\nAna\r\n',
+                b"--limite\r\n",
+                b'Content-Disposition: form-data; name="cv"; filename="cv.pdf"\r\n',
+                b"Content-Type: application/pdf\r\n\r\n",
+                PDF * 3,
+                b"\r\n--limite\r\n",
+                b'Content-Disposition: form-data; name="telefono"\r\n\r\n600\r\n',
+                b"--limite--\r\n",
+            )
+        )
+        post, archivos = MultiPartParser(
+            {
+                "CONTENT_TYPE": "multipart/form-data; boundary=limite",
+                "CONTENT_LENGTH": len(cuerpo),
+            },
+            BytesIO(cuerpo),
+            [CVUploadHandler(self.request)],
+        ).parse()
+        self.assertEqual(post.dict(), {"nombre": "Ana"})
+        self.assertFalse(archivos)
+        self.assertIn("cv", self.request.errores_subida)
+
+
+def crear_pdf(*objetos: bytes) -> bytes:
+    """PDF mínimo con los objetos indicados, numerados desde 1."""
+    partes = [b"%PDF-1.4\n"]
+    for numero, objeto in enumerate(objetos, start=1):
+        partes.append(b"%d 0 obj\n%s\nendobj\n" % (numero, objeto))
+    partes.append(b"%%EOF\n")
+    return b"".join(partes)
+
+
+def stream(datos: bytes, diccionario: bytes = b"") -> bytes:
+    return b"<<%s /Length %d>>\nstream\n%s\nendstream" % (
+        diccionario,
+        len(datos),
+        datos,
+    )
+
+
+@override_settings(CV_DESCARGA="django")
+class DescargaCVTests(TestCase):
+    def setUp(self):
+        temporal = TemporaryDirectory()
+        self.addCleanup(temporal.cleanup)
+        self.ruta = Path(temporal.name) / "cv.pdf"
+        self.ruta.write_bytes(PDF)
+
+    def descargar(self, rango: str):
+        request = RequestFactory().get("/", HTTP_RANGE=rango)
+        return respuesta_cv(request, self.ruta)
+
+    def test_rango(self):
+        respuesta = self.descargar("bytes=0-7")
+        self.assertEqual(respuesta.status_code, 206)
+        self.assertEqual(b"".join(respuesta.streaming_content), PDF[:8])
+        self.assertEqual(respuesta["Content-Range"], f"bytes 0-7/{len(PDF)}")
+
+        respuesta = self.descargar("bytes=-7")
+        self.assertEqual(b"".join(respuesta.streaming_content), PDF[-7:])
+
+    def test_rango_invalido(self):
+        # Se ignora y se envía el archivo completo
+        for rango in ("bytes=10-5", "bytes=a-b", "lineas=0-1"):
+            with self.subTest(rango=rango):
+                respuesta = self.descargar(rango)
+                self.assertEqual(respuesta.status_code, 200)
+                self.assertEqual(b"".join(respuesta.streaming_content), PDF)
+
+    def test_rango_no_satisfacible(self):
+        for rango in (f"bytes={len(PDF)}-", f"bytes={len(PDF) + 5}-{len(PDF) + 10}"):
+            with self.subTest(rango=rango):
+                respuesta = self.descargar(rango)
+                self.assertEqual(respuesta.status_code, 416)
+                self.assertEqual(respuesta["Content-Range"], f"bytes */{len(PDF)}")
+
+
+class ExtraccionPDFTests(TestCase):
+    def test_sin_comprimir(self):
+        contenido = crear_pdf(
+            stream(
+                b"BT /F1 12 Tf 72 700 Td (Hola \\(mundo\\)) Tj 0 -14 Td (Adi\\363s) Tj ET"
+            )
+        )
+        self.assertEqual(extraer_texto(contenido), "Hola (mundo)\nAdiós")
+
+    def test_comprimido(self):
+        datos = zlib.compress(b"BT [(Ho) 50 (la) -300 (mundo)] TJ ET")
+        contenido = crear_pdf(stream(datos, b"/Filter /FlateDecode"))
+        self.assertEqual(extraer_texto(contenido), "Hola mundo")
+
+    def test_to_unicode(self):
+        cmap = b"begincmap 1 beginbfchar <01> <0048> endbfchar 1 beginbfrange <02> <03> <0069> endbfrange endcmap"
+        contenido = crear_pdf(
+            b"<< /Type /Font /ToUnicode 2 0 R >>",
+            stream(cmap),
+            b"<< /Type /Page /Resources << /Font << /F1 1 0 R >> >> >>",
+            stream(b"BT /F1 12 Tf <010203> Tj ET"),
+        )
+        self.assertEqual(extraer_texto(contenido), "Hij")
+
+    def test_sin_texto(self):
+        contenido = crear_pdf(
+            stream(b"\xff\xd8\xff", b"/Subtype /Image /Filter /DCTDecode"),
+            stream(
+                zlib.compress(b"BT (x) Tj ET"), b"/Subtype /Image /Filter /FlateDecode"
+            ),
+        )
+        self.assertEqual(extraer_texto(contenido), "")
+
+    def test_maximo_caracteres(self):
+        contenido = crear_pdf(stream(b"BT (" + b"a" * 500 + b") Tj ET"))
+        self.assertEqual(extraer_texto(contenido, 100), "a" * 100)
+
+    def test_bomba_zlib(self):
+        # 20 KB comprimidos que ocuparían 20 MB
+        datos = zlib.compress(b"BT (" + b" " * (20 * 1024 * 1024) + b"a) Tj ET", 9)
+        objetos = _objetos(crear_pdf(stream(datos, b"/Filter /FlateDecode")))
+        self.assertEqual(len(objetos[1][1]), DESCOMPRIMIDO_MAXIMO)
+
+    def test_maximo_descomprimido_total(self):
+        datos = zlib.compress(b"BT (" + b"a" * 600 + b") Tj ET")
+        pdf = crear_pdf(*[stream(datos, b"/Filter /FlateDecode")] * 3)
+        with mock.patch("gestion.pdf.DESCOMPRIMIDO_MAXIMO", 1000):
+            objetos = _objetos(pdf)
+        self.assertEqual(
+            [len(datos or b"") for _d, datos in objetos.values()], [611, 389, 0]
+        )
+
+
+@override_settings(SQLITE_REINTENTOS=2, SQLITE_REINTENTO_ESPERA=0)
+class EscrituraTests(TransactionTestCase):
+    """Reintentos de `escritura`, fuera de la transacción de cada test de TestCase."""
+
+    def funcion(self, *efectos):
+        funcion = mock.Mock(side_effect=efectos, __qualname__="funcion")
+        return funcion, escritura(funcion)
+
+    def test_reintenta_si_esta_bloqueada(self):
+        funcion, envuelta = self.funcion(
+            OperationalError("database is locked"),
+            OperationalError("database table is locked"),
+            "hecho",
+        )
+        self.assertEqual(envuelta(), "hecho")
+        self.assertEqual(funcion.call_count, 3)
+
+    def test_maximo_reintentos(self):
+        funcion, envuelta = self.funcion(*[OperationalError("database is locked")] * 4)
+        with self.assertRaises(OperationalError):
+            envuelta()
+        self.assertEqual(funcion.call_count, 3)
+
+    def test_otros_errores(self):
+        funcion, envuelta = self.funcion(OperationalError("no such table: x"))
+        with self.assertRaises(OperationalError):
+            envuelta()
+        self.assertEqual(funcion.call_count, 1)
+
+    def test_avisos_de_la_vista_una_vez(self):
+        participante = crear_participante(1, acreditacion="A1")
+        self.client.force_login(User.objects.create_superuser("admin"))
+
+        # El primer intento falla después de leer la última presencia
+        with mock.patch(
+            "gestion.views.eventos.registrar",
+            side_effect=[OperationalError("database is locked"), None],
+        ):
+            respuesta = self.client.get(
+                reverse("presencia-entrada", args=["A1"]), follow=True
+            )
+
+        self.assertEqual(
+            [str(mensaje) for mensaje in get_messages(respuesta.wsgi_request)],
+            ["No había ninguna entrada"],
+        )
+        self.assertEqual(Presencia.objects.filter(persona=participante).count(), 1)
+
+
+class EventosTests(TestCase):
+    def setUp(self):
+        self.ahora = timezone.now()
+        self.participante = crear_participante(
+            1,
+            ciudad="Coruna",
+            fecha_verificacion_correo=self.ahora,
+            fecha_aceptacion=self.ahora,
+        )
+        Token.objects.create(
+            persona=self.participante,
+            tipo="VERIFICACION",
+            fecha_expiracion=self.ahora,
+            fecha_uso=self.ahora,
+        )
+        self.confirmacion = Token.objects.create(
+            persona=self.participante,
+            tipo="CONFIRMACION",
+            fecha_expiracion=self.ahora + timedelta(days=7),
+        )
+
+    def tipos(self, correo: str) -> list[str]:
+        return [evento["tipo"] for evento in eventos.linea_temporal(correo)]
+
+    def test_linea_temporal(self):
+        crear_participante(2, ciudad="Coruna", fecha_verificacion_correo=self.ahora)
+        aplicar_seleccion(["participante2@example.com"], "admin")
+        self.client.post(reverse("aceptar-plaza", args=[self.confirmacion.token]))
+        aplicar_normalizacion("ciudad", ["Coruna"], "Coruña", "admin")
+
+        self.assertEqual(
+            self.tipos(self.participante.correo), ["CONFIRMACION", "NORMALIZACION"]
+        )
+        linea = eventos.linea_temporal("participante2@example.com")
+        self.assertEqual(
+            [(evento["tipo"], evento["usuario"]) for evento in linea],
+            [("ACEPTACION", "admin"), ("NORMALIZACION", "admin")],
+        )
+        self.assertTrue(linea[1]["detalle"].endswith("ciudad: Coruña"))
+
+    def test_mismo_instante(self):
+        # Con la misma fecha se ordenan por orden de inserción
+        for tipo in ("ENTRADA", "SALIDA", "ENTRADA"):
+            eventos.registrar(self.participante.correo, tipo, fecha=self.ahora)
+        self.assertEqual(
+            self.tipos(self.participante.correo), ["ENTRADA", "SALIDA", "ENTRADA"]
+        )
+
+    def test_detalle_largo(self):
+        evento = eventos.registrar(self.participante, "PASE", detalle="x" * 200)
+        self.assertEqual(len(evento.detalle), 128)
+
+    def test_rechazo_tras_cambiar_correo(self):
+        self.client.post(reverse("rechazar-plaza", args=[self.confirmacion.token]))
+        call_command(
+            "actualizar_correo",
+            self.participante.correo,
+            "nuevo@example.com",
+            stdout=StringIO(),
+        )
+        self.assertEqual(self.tipos("nuevo@example.com"), ["RECHAZO"])
+        self.assertEqual(self.tipos(self.participante.correo), [])
+
+    def test_resumen(self):
+        ayer = self.ahora - timedelta(days=1)
+        otro = crear_participante(2)
+        eventos.registrar_lote(
+            [self.participante.correo, otro.correo], "REGISTRO", fecha=ayer
+        )
+        eventos.registrar(self.participante, "ENTRADA", fecha=self.ahora)
+        eventos.registrar(self.participante, "ENTRADA", fecha=self.ahora)
+
+        tipos = eventos.resumen()["tipos"]
+        self.assertEqual(
+            (tipos["REGISTRO"]["total"], tipos["REGISTRO"]["personas"]), (2, 2)
+        )
+        self.assertEqual(
+            (tipos["ENTRADA"]["total"], tipos["ENTRADA"]["personas"]), (2, 1)
+        )
+        self.assertEqual(
+            sorted(eventos.resumen()["por_dia"].values(), key=len),
+            [{"REGISTRO": 2}, {"ENTRADA": 2}],
+        )
+        self.assertEqual(set(eventos.resumen(desde=self.ahora)["tipos"]), {"ENTRADA"})
+        self.assertEqual(set(eventos.resumen(hasta=self.ahora)["tipos"]), {"REGISTRO"})
+
+    def test_invalida_panel(self):
+        cache.set(panel.clave_cache(), {"fecha": self.ahora})
+        self.assertEqual(panel.datos()["fecha"], self.ahora)
+        # Con la versión de la base de datos, también en los demás procesos
+        eventos.registrar(self.participante, "ACREDITACION", detalle="A1")
+        self.assertNotEqual(panel.datos()["fecha"], self.ahora)
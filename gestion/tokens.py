@@ -0,0 +1,72 @@
+# Copyright (C) 2025-now  p.fernandezf <p@fernandezf.es> & iago.rivas <delthia@delthia.com>
+
+from datetime import UTC, datetime
+from uuid import UUID
+
+from django.core import signing
+
+from gestion.models import Token
+
+# El tipo forma parte de la sal: un enlace de verificación no sirve para confirmar
+SAL = "gestion.tokens"
+
+
+def firmar(token: Token) -> str:
+    """
+    Valor firmado del Token para los enlaces: su UUID, la referencia de la Persona y
+    la expiración. No incluye el correo ni otros datos de la Persona.
+    """
+    return signing.dumps(
+        {
+            "t": token.token.hex,
+            "p": token.persona.referencia.hex,
+            "e": int(token.fecha_expiracion.timestamp()),
+        },
+        salt=f"{SAL}.{token.tipo}",
+        compress=True,
+    )
+
+
+def leer(valor: str, tipo: str) -> tuple[Token, UUID] | None:
+    """
+    Lee un Token firmado sin consultar la base de datos. La expiración es la del enlace,
+    así que `Token.valido()` la comprueba sin leer su fila; el uso y si aún existe se
+    comprueban al marcarlo como usado (`usar`).
+
+    Salida:
+        Tupla con el Token sin guardar (sin Persona ni `fecha_uso`) y la referencia de
+        su Persona, o None si el valor no es un Token firmado válido del tipo indicado.
+    """
+    try:
+        datos = signing.loads(valor, salt=f"{SAL}.{tipo}")
+        token = Token(
+            token=UUID(hex=datos["t"]),
+            tipo=tipo,
+            fecha_expiracion=datetime.fromtimestamp(datos["e"], tz=UTC),
+        )
+        return token, UUID(hex=datos["p"])
+    except (signing.BadSignature, KeyError, TypeError, ValueError):
+        return None
+
+
+def usar(token: Token, fecha: datetime) -> bool:
+    """
+    Marca el Token como usado con una sola consulta, si no lo estaba ya. Es la
+    comprobación de los Token firmados, que no se leen de la base de datos.
+
+    Salida:
+        True si se marcó como usado.
+        False si ya estaba usado o ya no existe.
+    """
+    usado = (
+        Token.objects.filter(
+            pk=token.pk,
+            tipo=token.tipo,
+            persona_id=token.persona_id,
+            fecha_uso__isnull=True,
+        ).update(fecha_uso=fecha)
+        == 1
+    )
+    if usado:
+        token.fecha_uso = fecha
+    return usado
@@ -9,7 +9,7 @@ urlpatterns = [
     path("", views.registro, {"subclase": "participante"}, name="registro"),
     path("mentores", views.registro, {"subclase": "mentor"}, name="registro-mentores"),
     path("colaboradores", views.colaboradores, name="registro-colaboradores"),
-    path("media/cv/<archivo>", views.cvs),
+    path("media/cv/<path:archivo>", views.cvs),
     path("verificar/<token>", views.verificar_correo, name="verificar-correo"),
     path("confirmar/<token>", views.confirmar_plaza, name="confirmar-plaza"),
     path("confirmar/<token>/aceptar", views.aceptar_plaza, name="aceptar-plaza"),
@@ -21,6 +21,8 @@ urlpatterns = [
     ),
     path("logout", LogoutView.as_view(next_page="login"), name="logout"),
     path("gestion", views.gestion, name="gestion"),
+    path("gestion/directo", views.en_directo, name="directo"),
+    path("gestion/directo/eventos", views.en_directo_eventos, name="directo-eventos"),
     path("gestion/registro", views.alta, name="alta"),
     path("gestion/pases", views.pases, name="pases"),
     path("gestion/presencia", views.presencia, name="presencia"),
@@ -41,6 +43,14 @@ urlpatterns = [
         name="presencia-editar",
     ),
     path("gestion/info/<correo>", views.info_participante, name="info-participante"),
+    path("gestion/estado/sqlite", views.estado_sqlite, name="estado-sqlite"),
+    path("metrics", views.metrics, name="metrics"),
+    path("gestion/estado/perfilado", views.estado_perfilado, name="estado-perfilado"),
     path("gestion/normalizacion", views.normalizacion, name="normalizacion"),
     path("gestion/normalizacion/<campo>", views.normalizacion, name="normalizacion"),
+    path(
+        "gestion/normalizacion/<campo>/deshacer/<int:id_normalizacion>",
+        views.normalizacion_deshacer,
+        name="normalizacion-deshacer",
+    ),
 ]
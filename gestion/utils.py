@@ -1,18 +1,34 @@
 # Copyright (C) 2025-now  p.fernandezf <p@fernandezf.es> & iago.rivas <delthia@delthia.com>
 
-import logging
+import logging, time
 from datetime import datetime, timedelta
+from itertools import batched
 
 from django.conf import settings
 from django.core.mail import send_mail
+from django.db.models import F
 from django.template.loader import render_to_string
 from django.utils import timezone
 
-from gestion.models import Colaborador, Persona, Token
+from gestion import metricas
+from gestion.models import Colaborador, CorreoPendiente, Persona, Token
 
 logger = logging.getLogger(__name__)
 
 
+def _send_mail(tipo: str, **kwargs):
+    """`send_mail` contando los envíos, los errores y su duración por tipo de correo."""
+    inicio = time.perf_counter()
+    try:
+        send_mail(**kwargs)
+    except Exception:
+        metricas.correos.inc(tipo=tipo, resultado="error")
+        raise
+    finally:
+        metricas.duracion_correos.observar(time.perf_counter() - inicio, tipo=tipo)
+    metricas.correos.inc(tipo=tipo, resultado="enviado")
+
+
 def enviar_correo_verificacion(
     persona: Persona, fecha_expiracion: datetime | None = None
 ) -> int:
@@ -48,12 +64,13 @@ def enviar_correo_verificacion(
 
     params = {
         "nombre": persona.nombre,
-        "token": token.token,
+        "token": token.enlace(),
         "host": settings.HOST_REGISTRO,
     }
 
     try:
-        send_mail(
+        _send_mail(
+            "verificacion",
             subject=settings.EMAIL_VERIFICACION_ASUNTO,
             message=render_to_string("correo/verificacion_correo.txt", params),
             from_email=settings.DEFAULT_FROM_EMAIL,
@@ -90,12 +107,13 @@ def enviar_correo_verificacion_correcta(persona: Persona) -> int:
 
     params = {
         "nombre": persona.nombre,
-        "token": token.token,
+        "token": token.enlace(),
         "host": settings.HOST_REGISTRO,
     }
 
     try:
-        send_mail(
+        _send_mail(
+            "verificacion_correcta",
             subject=settings.EMAIL_VERIFICACION_CORRECTA_ASUNTO,
             message=render_to_string("correo/verificacion_correo_correcta.txt", params),
             from_email=settings.DEFAULT_FROM_EMAIL,
@@ -149,13 +167,14 @@ def enviar_correo_confirmacion(
 
     params = {
         "nombre": persona.nombre,
-        "token": token.token,
+        "token": token.enlace(),
         "expiracion": fecha_expiracion,
         "host": settings.HOST_REGISTRO,
     }
 
     try:
-        send_mail(
+        _send_mail(
+            "confirmacion",
             subject=settings.EMAIL_CONFIRMACION_ASUNTO,
             message=render_to_string("correo/confirmacion_plaza.txt", params),
             from_email=settings.DEFAULT_FROM_EMAIL,
@@ -195,7 +214,8 @@ def enviar_correo_aceptacion_plaza(persona: Persona) -> int:
     }
 
     try:
-        send_mail(
+        _send_mail(
+            "aceptacion_plaza",
             subject=settings.EMAIL_ACEPTACION_ASUNTO,
             message=render_to_string("correo/aceptacion_plaza.txt", params),
             from_email=settings.DEFAULT_FROM_EMAIL,
@@ -230,7 +250,8 @@ def enviar_correo_rechazo_plaza(persona: Persona) -> int:
     }
 
     try:
-        send_mail(
+        _send_mail(
+            "rechazo_plaza",
             subject=settings.EMAIL_RECHAZO_ASUNTO,
             message=render_to_string("correo/rechazo_plaza.txt", params),
             from_email=settings.DEFAULT_FROM_EMAIL,
@@ -265,7 +286,8 @@ def enviar_correo_colaborador(colaborador: Colaborador) -> int:
     }
 
     try:
-        send_mail(
+        _send_mail(
+            "colaborador",
             subject=settings.EMAIL_COLABORADOR_ASUNTO,
             message=render_to_string("correo/solicitud_colaborador.txt", params),
             from_email=settings.DEFAULT_FROM_EMAIL,
@@ -281,3 +303,148 @@ def enviar_correo_colaborador(colaborador: Colaborador) -> int:
 
     logger.info("Correo de colaborador enviado", extra={"correo": colaborador.correo})
     return 0
+
+
+def _enviar_correo_recordatorio(persona: Persona, tipo_token: str) -> int:
+    """
+    Envía el recordatorio de que el token del tipo indicado está a punto de expirar.
+    A diferencia del envío original, no modifica la fecha de expiración del token.
+
+    Argumentos:
+        persona: `Persona` a la que enviar el correo.
+        tipo_token: "VERIFICACION" o "CONFIRMACION".
+
+    Salida:
+        0: Envío correcto.
+        1: Error en el envío.
+    """
+    token = (
+        Token.objects.filter(
+            persona=persona,
+            tipo=tipo_token,
+            fecha_uso__isnull=True,
+            fecha_expiracion__gt=timezone.now(),
+        )
+        .order_by("-fecha_expiracion")
+        .first()
+    )
+    if not token:
+        logger.info(
+            f"Recordatorio de {tipo_token} sin token válido",
+            extra={"correo": persona.correo},
+        )
+        return 0
+
+    plantilla = f"correo/recordatorio_{tipo_token.lower()}"
+    params = {
+        "nombre": persona.nombre,
+        "token": token.enlace(),
+        "expiracion": token.fecha_expiracion,
+        "host": settings.HOST_REGISTRO,
+    }
+
+    try:
+        _send_mail(
+            f"recordatorio_{tipo_token.lower()}",
+            subject=getattr(settings, f"EMAIL_RECORDATORIO_{tipo_token}_ASUNTO"),
+            message=render_to_string(f"{plantilla}.txt", params),
+            from_email=settings.DEFAULT_FROM_EMAIL,
+            recipient_list=(persona.correo,),
+            html_message=render_to_string(f"{plantilla}.html", params),
+            fail_silently=False,
+        )
+    except ConnectionRefusedError as e:
+        logger.error(f"Error en el envío del recordatorio de {tipo_token}:")
+        logger.error(e, stack_info=True, extra={"correo": persona.correo})
+
+        return 1
+
+    logger.info(
+        f"Recordatorio de {tipo_token} enviado", extra={"correo": persona.correo}
+    )
+    return 0
+
+
+def enviar_correo_recordatorio_verificacion(persona: Persona) -> int:
+    return _enviar_correo_recordatorio(persona, "VERIFICACION")
+
+
+def enviar_correo_recordatorio_confirmacion(persona: Persona) -> int:
+    return _enviar_correo_recordatorio(persona, "CONFIRMACION")
+
+
+# Funciones de envío de cada tipo de CorreoPendiente
+ENVIOS_PENDIENTES = {
+    "CONFIRMACION": enviar_correo_confirmacion,
+    "RECORDATORIO_VERIFICACION": enviar_correo_recordatorio_verificacion,
+    "RECORDATORIO_CONFIRMACION": enviar_correo_recordatorio_confirmacion,
+}
+
+
+def encolar_correos(tipo: str, correos: list[str]) -> int:
+    """
+    Encola un correo del tipo indicado para cada Persona, en una sola inserción.
+
+    Argumentos:
+        tipo: Tipo de `CorreoPendiente`.
+        correos: Correos de las Personas destinatarias.
+
+    Salida:
+        Número de correos encolados.
+    """
+    encolados = CorreoPendiente.objects.bulk_create(
+        (CorreoPendiente(persona_id=correo, tipo=tipo) for correo in correos),
+        batch_size=500,
+    )
+    logger.info(f"{len(encolados)} correos de {tipo} encolados")
+    return len(encolados)
+
+
+def enviar_correos_pendientes(maximo: int | None = None) -> tuple[int, int]:
+    """
+    Envía los correos encolados sin superar `EMAIL_MESSAGE_RATE` mensajes por segundo.
+    Los correos que fallan más de `EMAIL_MAX_ERRORS` veces dejan de reintentarse.
+
+    Argumentos:
+        maximo: Número máximo de correos a enviar en esta llamada (Opcional).
+
+    Salida:
+        Tupla con el número de correos enviados y el de errores.
+    """
+    pendientes = CorreoPendiente.objects.filter(
+        fecha_envio__isnull=True, intentos__lt=settings.EMAIL_MAX_ERRORS
+    ).select_related("persona")
+    if maximo:
+        pendientes = pendientes[:maximo]
+
+    enviados, errores = 0, 0
+    inicio_batch = 0
+
+    for batch in batched(pendientes, settings.EMAIL_MESSAGE_RATE):
+        # Evitar mandar más del límite de mensajes
+        if time.perf_counter() - inicio_batch < 1:
+            time.sleep(1 - (time.perf_counter() - inicio_batch) + 0.1)
+        inicio_batch = time.perf_counter()
+
+        for pendiente in batch:
+            try:
+                estado = ENVIOS_PENDIENTES[pendiente.tipo](pendiente.persona)
+                error = None if estado == 0 else "Error en el envío"
+            except Exception as e:
+                logger.error(e, stack_info=True, extra={"correo": pendiente.persona_id})
+                error = str(e)[:4096]
+
+            if error:
+                errores += 1
+                CorreoPendiente.objects.filter(pk=pendiente.pk).update(
+                    intentos=F("intentos") + 1, error=error
+                )
+            else:
+                enviados += 1
+                CorreoPendiente.objects.filter(pk=pendiente.pk).update(
+                    intentos=F("intentos") + 1, fecha_envio=timezone.now()
+                )
+
+    if enviados or errores:
+        logger.info(f"Correos pendientes: {enviados} enviados, {errores} errores")
+    return enviados, errores
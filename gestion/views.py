@@ -1,21 +1,27 @@
 # Copyright (C) 2025-now  p.fernandezf <p@fernandezf.es> & iago.rivas <delthia@delthia.com>
 
-import logging, os
+import logging
 from datetime import timedelta
+from pathlib import Path
 from uuid import UUID
 
 from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.decorators import login_not_required
 from django.core.exceptions import PermissionDenied
+from django.core.handlers.asgi import ASGIRequest
 from django.core.mail import EmailMultiAlternatives
-from django.http import FileResponse, HttpRequest
+from django.db.models import Count
+from django.http import HttpRequest, HttpResponse, JsonResponse, StreamingHttpResponse
 from django.shortcuts import Http404, redirect, render
 from django.template.loader import render_to_string
 from django.urls import reverse
 from django.utils import timezone
+from django.utils.crypto import constant_time_compare
 from django.views.decorators.http import require_http_methods
 
+from gestion import directo, eventos, metricas, panel
+from gestion.cvs import respuesta_cv
 from gestion.forms import (
     EditarPresenciaForm,
     MentorForm,
@@ -30,6 +36,7 @@ from gestion.forms import (
 from gestion.models import (
     Colaborador,
     Mentor,
+    Normalizacion,
     Participante,
     Pase,
     Persona,
@@ -37,6 +44,17 @@ from gestion.models import (
     TipoPase,
     Token,
 )
+from gestion.normalizacion import (
+    CAMPOS_NORMALIZABLES,
+    aplicar_normalizacion,
+    deshacer_normalizacion,
+    grupos_campo,
+)
+from gestion.perfilado import agregado, instantaneas, perfil, resumen
+from gestion.sqlite import checkpointer, escritura
+from gestion.subidas import anadir_errores_subida
+from gestion.tareas import solicitar_tarea
+from gestion.tokens import leer as leer_token_firmado, usar as usar_token
 from gestion.utils import (
     enviar_correo_aceptacion_plaza,
     enviar_correo_rechazo_plaza,
@@ -57,6 +75,90 @@ def es_token(token: str) -> bool:
         return False
 
 
+def es_enlace(token: str, tipo: str) -> bool:
+    """Si el valor tiene el formato de un enlace: un UUID o un Token firmado del tipo."""
+    return es_token(token) or leer_token_firmado(token, tipo) is not None
+
+
+def leer_token(token: str, tipo: str) -> tuple[Token | None, UUID | None]:
+    """
+    Obtiene el Token de un enlace, firmado o con el UUID. Los Token firmados se leen
+    sin consultar la base de datos: no tienen Persona ni fecha de uso, que se comprueba
+    al marcarlos como usados.
+
+    Salida:
+        Tupla con el Token (None si no es válido o no existe) y, si es firmado,
+        la referencia de su Persona.
+    """
+    firmado = leer_token_firmado(token, tipo)
+    if firmado:
+        return firmado
+    if not es_token(token):
+        return None, None
+    return Token.objects.filter(token=token, tipo=tipo).first(), None
+
+
+def leer_token_persona(
+    token: str, tipo: str, restricciones: bool = False, tokens: bool = False
+) -> Token | None:
+    """
+    Como `leer_token`, pero con la Persona del Token y su subclase (Participante o
+    Mentor) cargadas en la misma consulta. Con `restricciones` y `tokens` precarga
+    además, con una consulta cada uno, sus restricciones alimentarias y el resto de
+    sus Token. Con un Token firmado solo se consulta la Persona, por su referencia.
+    """
+    relacionados = ["participante", "mentor"]
+    precargados = []
+    if restricciones:
+        precargados += [
+            "participante__restricciones_alimentarias",
+            "mentor__restricciones_alimentarias",
+        ]
+    if tokens:
+        precargados.append("tokens")
+
+    firmado = leer_token_firmado(token, tipo)
+    if firmado:
+        token_obj, referencia = firmado
+        persona = (
+            Persona.objects.select_related(*relacionados)
+            .prefetch_related(*precargados)
+            .filter(referencia=referencia)
+            .first()
+        )
+        if not persona:
+            return None
+        token_obj.persona = persona
+        return token_obj
+
+    if not es_token(token):
+        return None
+    return (
+        Token.objects.select_related(*(f"persona__{r}" for r in relacionados))
+        .prefetch_related(*(f"persona__{p}" for p in precargados))
+        .filter(token=token, tipo=tipo)
+        .first()
+    )
+
+
+def participante_token(
+    token_obj: Token, referencia: UUID | None
+) -> Participante | None:
+    """Participante de un Token de `leer_token`: por la referencia si es firmado o por su correo."""
+    if referencia:
+        return Participante.objects.filter(referencia=referencia).first()
+    return Participante.objects.filter(correo=token_obj.persona_id).first()
+
+
+def subclase_persona(persona: Persona) -> Participante | Mentor:
+    """Participante o Mentor de una Persona cargada con `leer_token_persona`."""
+    if hasattr(persona, "participante"):
+        return persona.participante
+    if hasattr(persona, "mentor"):
+        return persona.mentor
+    raise ValueError("La persona no es un participante ni un mentor")
+
+
 @login_not_required
 @require_http_methods(["GET", "POST"])
 def registro(request: HttpRequest, *args, **kwargs):
@@ -85,8 +187,17 @@ def registro(request: HttpRequest, *args, **kwargs):
         )
 
     form = subform(request.POST, request.FILES)
+    anadir_errores_subida(request, form)
     if form.is_valid() and request.POST.get("acepta_terminos", False):
-        persona: subclase = form.save()
+
+        @escritura
+        def guardar() -> subclase:
+            persona = form.save()
+            eventos.registrar(persona, "REGISTRO", fecha=persona.fecha_registro)
+            return persona
+
+        persona: subclase = guardar()
+        metricas.registros.inc(subclase=kwargs.get("subclase"))
 
         estado = enviar_correo_verificacion(persona)
         if estado != 0:
@@ -127,6 +238,7 @@ def colaboradores(request: HttpRequest):
     form = ColaboradorForm(request.POST)
     if form.is_valid() and request.POST.get("acepta_terminos", False):
         colaborador = form.save()
+        metricas.registros.inc(subclase="colaborador")
 
         estado = enviar_correo_colaborador(colaborador)
         if estado != 0:
@@ -155,8 +267,9 @@ def colaboradores(request: HttpRequest):
 @login_not_required
 @require_http_methods(["GET"])
 def verificar_correo(request: HttpRequest, token: str):
-    if not es_token(token):
-        logger.debug(f"Token inválido '{token}'")
+    token_obj = leer_token_persona(token, "VERIFICACION", restricciones=True)
+    if not token_obj and not es_enlace(token, "VERIFICACION"):
+        logger.debug("Token inválido")
         messages.error(
             request, "El token es inválido. Comprueba que copiaste el enlace completo"
         )
@@ -166,9 +279,8 @@ def verificar_correo(request: HttpRequest, token: str):
             {"motivo": "Token inválido", "token": token},
         )
 
-    token_obj = Token.objects.filter(token=token, tipo="VERIFICACION").first()
     if not token_obj:
-        logger.debug(f"Token inválido '{token}'")
+        logger.debug("Token inválido")
         messages.error(request, "El token es inválido.")
         return render(
             request,
@@ -176,20 +288,17 @@ def verificar_correo(request: HttpRequest, token: str):
             {"motivo": "Token inválido", "token": token},
         )
 
-    persona = Persona.objects.get(correo=token_obj.persona.correo)
-
-    if hasattr(persona, "participante"):
-        subpersona = persona.participante
+    # La subclase se usa para el formulario y la Persona para los cambios de estado
+    persona = token_obj.persona
+    subpersona = subclase_persona(persona)
+    if isinstance(subpersona, Participante):
         form = RevisarParticipanteForm
-    elif hasattr(persona, "mentor"):
-        subpersona = persona.mentor
-        form = RevisarMentorForm
     else:
-        raise ValueError("La persona no es un participante ni un mentor")
+        form = RevisarMentorForm
 
     # No permitir verificar el correo si el Token ha expirado
     if not token_obj.valido() and not persona.verificado():
-        logger.debug(f"Token expirado '{token}'", extra={"correo": persona.correo})
+        logger.debug("Token expirado", extra={"correo": persona.correo})
         messages.error(
             request,
             "El token de verificación ha expirado.",
@@ -202,15 +311,31 @@ def verificar_correo(request: HttpRequest, token: str):
 
     ahora = timezone.now()
 
-    # Actualizar la fecha de uso del Token aunque la Persona ya esté verificada con otro Token
-    if not token_obj.usado():
-        token_obj.fecha_uso = ahora
-        token_obj.save()
+    # Actualizar la fecha de uso del Token aunque la Persona ya esté verificada con otro Token.
+    # Un Token firmado solo se comprueba en la base de datos cuando verifica a la Persona.
+    if not es_token(token):
+        if not persona.verificado() and not usar_token(token_obj, ahora):
+            logger.debug("Token usado o eliminado", extra={"correo": persona.correo})
+            messages.error(request, "El token es inválido.")
+            return render(
+                request,
+                "verificacion_incorrecta.html",
+                {"motivo": "Token inválido", "token": token},
+            )
+    elif not token_obj.usado():
+        usar_token(token_obj, ahora)
 
     # Verificar a la Persona la primera vez que usa un Token de verificación
     if not persona.verificado():
         persona.fecha_verificacion_correo = ahora
-        persona.save()
+
+        @escritura
+        def verificar():
+            persona.save(update_fields=["fecha_verificacion_correo"])
+            eventos.registrar(persona, "VERIFICACION", fecha=ahora)
+
+        verificar()
+        metricas.verificaciones.inc()
 
         estado = enviar_correo_verificacion_correcta(persona)
         if estado != 0:
@@ -272,8 +397,9 @@ def verificar_correo(request: HttpRequest, token: str):
 @login_not_required
 @require_http_methods(["GET", "POST"])
 def confirmar_plaza(request: HttpRequest, token: str):
-    if not es_token(token):
-        logger.debug(f"Token inválido '{token}'")
+    token_obj = leer_token_persona(token, "CONFIRMACION", tokens=True)
+    if not token_obj and not es_enlace(token, "CONFIRMACION"):
+        logger.debug("Token inválido")
         messages.error(
             request, "El token es inválido. Comprueba que copiaste el enlace completo"
         )
@@ -283,19 +409,18 @@ def confirmar_plaza(request: HttpRequest, token: str):
             {"motivo": "Token inválido", "token": token},
         )
 
-    token_obj = Token.objects.filter(token=token, tipo="CONFIRMACION").first()
-
     if not token_obj:
-        logger.debug(f"Token inválido '{token}'")
+        logger.debug("Token inválido")
         messages.error(request, "Token inválido")
         return render(request, "vacio.html", {"titulo": "Confirmar plaza"})
 
-    participante: Participante = Participante.objects.get(
-        correo=token_obj.persona.correo
-    )
+    participante = subclase_persona(token_obj.persona)
 
-    token_verificacion = Token.objects.get(
-        persona__correo=participante.correo, tipo="VERIFICACION"
+    # Token de verificación para el enlace a los datos, preferiblemente el ya usado
+    token_verificacion = max(
+        (t for t in token_obj.persona.tokens.all() if t.tipo == "VERIFICACION"),
+        key=lambda t: (t.usado(), t.fecha_expiracion),
+        default=None,
     )
 
     if request.method == "GET":
@@ -310,7 +435,7 @@ def confirmar_plaza(request: HttpRequest, token: str):
         )
 
     if not token_obj.valido() and not participante.confirmado():
-        logger.debug(f"Token expirado '{token}'", extra={"correo": participante.correo})
+        logger.debug("Token expirado", extra={"correo": participante.correo})
         messages.error(
             request,
             "El token de verificación ha caducado. Ponte en contacto con nosotros para confirmar tu plaza a través de hackudc@gpul.org.",
@@ -322,29 +447,41 @@ def confirmar_plaza(request: HttpRequest, token: str):
 @login_not_required
 @require_http_methods(["POST"])
 def aceptar_plaza(request: HttpRequest, token: str):
-    token_obj = Token.objects.filter(token=token, tipo="CONFIRMACION").first()
+    token_obj, referencia = leer_token(token, "CONFIRMACION")
 
-    if not token_obj.valido():
-        logger.debug(
-            f"Token expirado '{token}'"
-        )  # , extra={"correo": participante.correo})
+    if not token_obj:
+        logger.debug("Token inválido")
+        messages.error(request, "Token inválido")
+        return render(request, "vacio.html", {"titulo": "Confirmar plaza"})
+
+    ahora = timezone.now()
+
+    @escritura
+    def confirmar() -> Participante | None:
+        # Si ya se usó o ya no existe, se comprueba al marcarlo como usado
+        if not token_obj.valido():
+            return None
+        participante = participante_token(token_obj, referencia)
+        if not participante:
+            return None
+        token_obj.persona = participante
+        if not usar_token(token_obj, ahora):
+            return None
+        participante.fecha_confirmacion_plaza = ahora
+        participante.save(update_fields=["fecha_confirmacion_plaza"])
+        eventos.registrar(participante, "CONFIRMACION", fecha=ahora)
+        return participante
+
+    participante = confirmar()
+    if not participante:
+        logger.debug("Token expirado", extra={"correo": token_obj.persona_id})
         messages.error(
             request,
             "Token caducado. No puedes confirmar tu plaza. Si crees que es un error, ponte en contacto a través de hackudc@gpul.org para solucionarlo",
         )
         return redirect("confirmar-plaza", token)
 
-    participante: Participante = Participante.objects.get(
-        correo=token_obj.persona.correo
-    )
-
-    ahora = timezone.now()
-
-    participante.fecha_confirmacion_plaza = ahora
-    participante.save()
-
-    token_obj.fecha_uso = ahora
-    token_obj.save()
+    metricas.plazas.inc(resultado="confirmada")
 
     # Correo confirmación de aceptación
     estado = enviar_correo_aceptacion_plaza(participante)
@@ -365,26 +502,41 @@ def aceptar_plaza(request: HttpRequest, token: str):
 @login_not_required
 @require_http_methods(["GET", "POST"])
 def rechazar_plaza(request: HttpRequest, token: str):
-    token_obj = Token.objects.filter(token=token, tipo="CONFIRMACION").first()
+    token_obj, referencia = leer_token(token, "CONFIRMACION")
 
     if not token_obj:
-        logger.debug(f"Token inválido '{token}'")
+        logger.debug("Token inválido")
         messages.error(request, "Token inválido")
         return render(request, "vacio.html")
 
     if request.method == "GET":
-        return render(request, "rechazar_plaza.html", {"token": token_obj})
+        return render(request, "rechazar_plaza.html", {"enlace": token})
 
     ahora = timezone.now()
 
-    participante: Participante = Participante.objects.get(
-        correo=token_obj.persona.correo
-    )
-    participante.fecha_rechazo_plaza = ahora
-    participante.save()
+    @escritura
+    def rechazar() -> Participante | None:
+        # Se puede rechazar aunque el Token ya se usara para aceptar, pero no si ya no existe
+        participante = participante_token(token_obj, referencia)
+        if not participante or not Token.objects.filter(
+            pk=token_obj.pk, tipo="CONFIRMACION", persona=participante
+        ).update(fecha_uso=ahora):
+            return None
+        participante.fecha_rechazo_plaza = ahora
+        participante.save(update_fields=["fecha_rechazo_plaza"])
+        eventos.registrar(participante, "RECHAZO", fecha=ahora)
+        # Ofrecer la plaza liberada a la lista de espera desde las tareas periódicas
+        if settings.PROMOCION_AUTOMATICA:
+            solicitar_tarea("promocionar_lista_espera")
+        return participante
+
+    participante = rechazar()
+    if not participante:
+        logger.debug("Token inválido")
+        messages.error(request, "Token inválido")
+        return render(request, "vacio.html")
 
-    token_obj.fecha_uso = ahora
-    token_obj.save()
+    metricas.plazas.inc(resultado="rechazada")
 
     # Correo confirmación de rechazo
     estado = enviar_correo_rechazo_plaza(participante)
@@ -403,27 +555,117 @@ def rechazar_plaza(request: HttpRequest, token: str):
         request,
         "Has rechazado tu plaza. Si te arrepientes, contáctanos en hackudc@gpul.org",
     )
+
     return redirect("confirmar-plaza", token)
 
 
 def gestion(request: HttpRequest):
-    return render(request, "gestion/index.html")
+    contexto = {}
+    if request.user.has_perm("gestion.view_participante"):
+        contexto["panel"] = panel.datos()
+    return render(request, "gestion/index.html", contexto)
+
+
+@require_http_methods(["GET"])
+def en_directo(request: HttpRequest):
+    """Pantalla con las lecturas de acreditaciones en directo."""
+    if not request.user.has_perm("gestion.view_participante"):
+        raise PermissionDenied
+
+    return render(request, "gestion/directo.html", {"estado": directo.estado()})
+
+
+@require_http_methods(["GET"])
+def en_directo_eventos(request: HttpRequest):
+    """
+    Server-Sent Events con las lecturas de acreditaciones. Con ASGI la conexión se
+    mantiene abierta; con WSGI se responde con los eventos pendientes y el navegador
+    vuelve a conectarse.
+    """
+    if not request.user.has_perm("gestion.view_participante"):
+        raise PermissionDenied
+
+    # El navegador envía el último recibido al reconectar
+    ultimo = request.headers.get("Last-Event-ID") or request.GET.get("ultimo", "")
+    ultimo = int(ultimo) if ultimo.isdigit() else None
+
+    if isinstance(request, ASGIRequest):
+        respuesta = StreamingHttpResponse(
+            directo.flujo(ultimo), content_type="text/event-stream"
+        )
+    else:
+        respuesta = HttpResponse(
+            directo.pendientes(ultimo), content_type="text/event-stream"
+        )
+    respuesta["Cache-Control"] = "no-cache"
+    # Sin el búfer de nginx, que retrasaría los eventos
+    respuesta["X-Accel-Buffering"] = "no"
+    return respuesta
+
+
+@require_http_methods(["GET"])
+def estado_sqlite(request: HttpRequest):
+    """Tamaño del WAL y métricas de los checkpoints del proceso que atiende la petición."""
+    if not request.user.is_staff:
+        raise PermissionDenied
+
+    return JsonResponse(checkpointer.estado())
+
+
+@login_not_required
+@require_http_methods(["GET"])
+def metrics(request: HttpRequest):
+    """
+    Métricas de todos los procesos en el formato de texto de Prometheus. Para usuarios
+    de staff o, para el scraper, con la cabecera `Authorization: Bearer <METRICAS_TOKEN>`.
+    """
+    autorizacion = request.headers.get("Authorization", "")
+    if not (
+        request.user.is_staff
+        or settings.METRICAS_TOKEN
+        and constant_time_compare(autorizacion, f"Bearer {settings.METRICAS_TOKEN}")
+    ):
+        raise PermissionDenied
+
+    return HttpResponse(
+        metricas.exposicion(), content_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
+@require_http_methods(["GET"])
+def estado_perfilado(request: HttpRequest):
+    """Perfilado por vista sumado de todos los procesos (ver `PERFILADO_ACTIVO`)."""
+    if not request.user.is_staff:
+        raise PermissionDenied
+
+    if settings.PERFILADO_ACTIVO:
+        perfil.guardar()
+    lista = instantaneas()
+    return JsonResponse(
+        {
+            "activo": settings.PERFILADO_ACTIVO,
+            "procesos": [instantanea["pid"] for instantanea in lista],
+            "vistas": resumen(agregado(lista)),
+        }
+    )
 
 
 def cvs(request: HttpRequest, archivo: str):
     if not request.user.has_perm("gestion.ver_cv_participante"):
         raise PermissionDenied
 
-    ruta = os.path.join(settings.MEDIA_ROOT, "cv", archivo)
+    # Los CV están en subdirectorios: evitar rutas fuera del directorio de CVs
+    directorio = (Path(settings.MEDIA_ROOT) / "cv").resolve()
+    ruta = (directorio / archivo).resolve()
 
-    if not os.path.exists(ruta) or not os.path.isfile(ruta):
+    if not ruta.is_relative_to(directorio) or not ruta.is_file():
         raise Http404("File not found")
 
     logger.info(
         f"Mostrando el CV {archivo} de un participante a {request.user.username}"
     )
 
-    return FileResponse(open(ruta, "rb"), as_attachment=False)
+    return respuesta_cv(request, ruta)
 
 
 @require_http_methods(["GET", "POST"])
@@ -443,7 +685,7 @@ def alta(request: HttpRequest):
     if form.is_valid():
         datos = form.cleaned_data
 
-        persona = Persona.objects.filter(correo=datos["correo"]).first()
+        persona = Persona.objects.filter(correo=datos["persona"]).first()
 
         if not persona:
             messages.error(request, "No se encontró el participante")
@@ -466,7 +708,19 @@ def alta(request: HttpRequest):
         # 3. Petición completa
         # Asignar la acreditación. Página de éxito con timeout y volver a la original
         persona.acreditacion = datos["acreditacion"]
-        persona.save()
+
+        @escritura
+        def acreditar():
+            persona.save()
+            eventos.registrar(
+                persona,
+                "ACREDITACION",
+                usuario=request.user.get_username(),
+                detalle=persona.acreditacion,
+            )
+
+        acreditar()
+        metricas.lecturas.inc(puesto=request.user.get_username(), tipo="alta")
 
         messages.success(
             request,
@@ -499,7 +753,20 @@ def pases(request: HttpRequest):
 
         if persona:
             pase = Pase(persona=persona, tipo_pase=datos["tipo_pase"])
-            pase.save()
+
+            @escritura
+            def registrar_pase():
+                pase.save()
+                eventos.registrar(
+                    persona,
+                    "PASE",
+                    usuario=request.user.get_username(),
+                    detalle=pase.tipo_pase.nombre,
+                    fecha=pase.fecha,
+                )
+
+            registrar_pase()
+            metricas.lecturas.inc(puesto=request.user.get_username(), tipo="pase")
             messages.success(request, f"Pase creado")
             return redirect("pases")
 
@@ -557,17 +824,34 @@ def presencia_entrada(request: HttpRequest, acreditacion: str):
         messages.error(request, "No existe la acreditación")
         return redirect("presencia")
 
-    presencias = Presencia.objects.filter(persona=persona)
-    ultima = presencias.order_by("-entrada").first()
-
-    if not ultima:
-        messages.error(request, "No había ninguna entrada")
-    elif not ultima.salida:
-        messages.warning(request, "No hay salida registrada de la última presencia")
+    # Lectura de la última presencia y escritura en la misma transacción, por si se
+    # registra la misma acreditación desde dos puestos a la vez. Como se puede
+    # reintentar, devuelve el aviso en lugar de añadirlo a los mensajes.
+    @escritura
+    def registrar_entrada() -> tuple[int, str] | None:
+        ultima = Presencia.objects.filter(persona=persona).order_by("-entrada").first()
+
+        aviso = None
+        if not ultima:
+            aviso = messages.ERROR, "No había ninguna entrada"
+        elif not ultima.salida:
+            aviso = messages.WARNING, "No hay salida registrada de la última presencia"
+
+        # Guardar entrada
+        entrada = Presencia(persona=persona, entrada=timezone.now())
+        entrada.save()
+        eventos.registrar(
+            persona,
+            "ENTRADA",
+            usuario=request.user.get_username(),
+            fecha=entrada.entrada,
+        )
+        return aviso
 
-    # Guardar entrada
-    entrada = Presencia(persona=persona, entrada=timezone.now())
-    entrada.save()
+    aviso = registrar_entrada()
+    if aviso:
+        messages.add_message(request, *aviso)
+    metricas.lecturas.inc(puesto=request.user.get_username(), tipo="entrada")
 
     return redirect("presencia", acreditacion=acreditacion)
 
@@ -579,19 +863,34 @@ def presencia_salida(request: HttpRequest, acreditacion: str):
         messages.error(request, "No existe la acreditación")
         return redirect("presencia")
 
-    presencias = Presencia.objects.filter(persona=persona)
-    ultima = presencias.order_by("-entrada").first()
-
-    if not ultima:
-        messages.error(request, "No había ninguna entrada")
-        ultima = Presencia(persona=persona)
-    elif ultima.salida:
-        messages.warning(request, "La última presencia ya tiene salida registrada")
-        ultima = Presencia(persona=persona)
+    # Lectura de la última presencia y escritura en la misma transacción
+    @escritura
+    def registrar_salida() -> tuple[int, str] | None:
+        ultima = Presencia.objects.filter(persona=persona).order_by("-entrada").first()
+
+        aviso = None
+        if not ultima:
+            aviso = messages.ERROR, "No había ninguna entrada"
+            ultima = Presencia(persona=persona)
+        elif ultima.salida:
+            aviso = messages.WARNING, "La última presencia ya tiene salida registrada"
+            ultima = Presencia(persona=persona)
+
+        # Guardar salida
+        ultima.salida = timezone.now()
+        ultima.save()
+        eventos.registrar(
+            persona,
+            "SALIDA",
+            usuario=request.user.get_username(),
+            fecha=ultima.salida,
+        )
+        return aviso
 
-    # Guardar salida
-    ultima.salida = timezone.now()
-    ultima.save()
+    aviso = registrar_salida()
+    if aviso:
+        messages.add_message(request, *aviso)
+    metricas.lecturas.inc(puesto=request.user.get_username(), tipo="salida")
 
     return redirect("presencia", acreditacion=acreditacion)
 
@@ -613,7 +912,7 @@ def presencia_editar(request: HttpRequest, id_presencia: str):
     # POST
     form = EditarPresenciaForm(request.POST, instance=presencia)
     if form.is_valid():
-        form.save()
+        escritura(form.save)()
         messages.success(request, "Presencia actualizada")
         return redirect("presencia", acreditacion=presencia.persona.acreditacion)
 
@@ -671,7 +970,7 @@ def normalizacion(request: HttpRequest, campo: str = None):
         )
         return redirect("gestion")
 
-    campos = ("nombre_estudio", "centro_estudio", "curso", "ciudad")
+    campos = CAMPOS_NORMALIZABLES
 
     if not campo or not campo in campos:
         return render(request, "gestion/normalizacion.html", {"campos": campos})
@@ -683,7 +982,14 @@ def normalizacion(request: HttpRequest, campo: str = None):
         return render(
             request,
             "gestion/normalizacion.html",
-            {"form": NormalizacionForm(originales=valores), "campo": campo},
+            {
+                "form": NormalizacionForm(originales=valores),
+                "campo": campo,
+                "grupos": grupos_campo(campo),
+                "historial": Normalizacion.objects.filter(campo=campo).annotate(
+                    n_cambios=Count("cambios")
+                )[:10],
+            },
         )
 
     # POST
@@ -694,8 +1000,34 @@ def normalizacion(request: HttpRequest, campo: str = None):
     data = form.cleaned_data
 
     if data["originales"] and data["reemplazo"]:
-        Participante.objects.filter(**{f"{campo}__in": data["originales"]}).update(
-            **{campo: data["reemplazo"]}
+        aplicar_normalizacion(
+            campo, data["originales"], data["reemplazo"], request.user.username
         )
 
     return redirect("normalizacion", campo=campo)
+
+
+@require_http_methods(["POST"])
+def normalizacion_deshacer(request: HttpRequest, campo: str, id_normalizacion: int):
+    if not request.user.has_perm("gestion.change_participante"):
+        messages.error(
+            request, "No tienes permiso para acceder a la página de normalización."
+        )
+        return redirect("gestion")
+
+    normalizacion = Normalizacion.objects.filter(
+        id_normalizacion=id_normalizacion, campo=campo
+    ).first()
+    if not normalizacion:
+        messages.error(request, "No existe la normalización")
+        return redirect("normalizacion", campo=campo)
+
+    try:
+        restaurados = deshacer_normalizacion(normalizacion, request.user.username)
+    except ValueError as e:
+        messages.warning(request, str(e))
+        return redirect("normalizacion", campo=campo)
+    messages.success(
+        request, f"Normalización deshecha. {restaurados} participantes restaurados."
+    )
+    return redirect("normalizacion", campo=campo)
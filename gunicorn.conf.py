@@ -1,3 +1,5 @@
+import os, shutil
+
 wsgi_app = "hackackathon.wsgi"
 
 daemon = True
@@ -14,9 +16,23 @@ access_log_format = '%(h)s %(l)s %(t)s "%(r)s" %(s)s %(b)s "%(f)s" "%(a)s"'
 capture_output = True
 
 
+def on_starting(server):
+    # Las métricas (gestion/metricas.py) empiezan de cero con cada arranque
+    shutil.rmtree(
+        os.getenv("METRICAS_DIRECTORIO") or "log/metricas", ignore_errors=True
+    )
+
+
 def when_ready(server):
     print("Gunicorn listo")
 
 
+def post_worker_init(worker):
+    # Checkpoints del WAL de SQLite en segundo plano (gestion/sqlite.py)
+    from gestion.sqlite import iniciar_checkpoints
+
+    iniciar_checkpoints()
+
+
 def on_exit(server):
     print("Gunicorn apagado")
@@ -0,0 +1,20 @@
+# Servidor ASGI (hackackathon/asgi.py) para las lecturas en directo (gestion/directo.py).
+# Las conexiones abiertas son corrutinas de un único proceso, sin ocupar los hilos de
+# gunicorn.conf.py. nginx le envía solo /gestion/directo/eventos (doc/nginx-default).
+# Uso: gunicorn -c gunicorn_directo.conf.py
+
+wsgi_app = "hackackathon.asgi"
+worker_class = "asgi"
+
+daemon = True
+pidfile = "gunicorn_directo.pid"
+
+workers = 1
+worker_connections = 500
+
+bind = "127.0.0.1:8001"
+
+accesslog = "log/gunicorn-directo-access.log"
+errorlog = "log/gunicorn-directo-error.log"
+access_log_format = '%(h)s %(l)s %(t)s "%(r)s" %(s)s %(b)s "%(f)s" "%(a)s"'
+capture_output = True
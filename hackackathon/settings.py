@@ -1,7 +1,7 @@
 # Copyright (C) 2025-now  p.fernandezf <p@fernandezf.es> & iago.rivas <delthia@delthia.com>
 
 import os
-from datetime import datetime
+from datetime import datetime, timedelta
 from pathlib import Path
 from zoneinfo import ZoneInfo
 
@@ -47,6 +47,12 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Solo se usa con PERFILADO_ACTIVO. El primero para medir también el resto.
+    "gestion.perfilado.PerfiladoMiddleware",
+    # Identificador de la petición en los logs
+    "gestion.logs.ContextoLogsMiddleware",
+    # Solo se usa con METRICAS_ACTIVAS
+    "gestion.metricas.MetricasMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -83,12 +89,65 @@ WSGI_APPLICATION = "hackackathon.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
-DATABASES = {
-    "default": {
-        "ENGINE": "django.db.backends.sqlite3",
-        "NAME": BASE_DIR / "db.sqlite3",
+# Base de datos: "sqlite" (por defecto) o "postgresql" (requiere psycopg).
+# Para pasar los datos de SQLite a PostgreSQL: python manage.py copiar_bd
+BD_MOTOR = os.getenv("BD_MOTOR") or "sqlite"
+
+if BD_MOTOR == "postgresql":
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.postgresql",
+            "NAME": os.getenv("BD_NOMBRE"),
+            "USER": os.getenv("BD_USUARIO"),
+            "PASSWORD": os.getenv("BD_CONTRASENA"),
+            "HOST": os.getenv("BD_HOST") or "localhost",
+            "PORT": os.getenv("BD_PUERTO") or "5432",
+            "CONN_MAX_AGE": 60,
+            "CONN_HEALTH_CHECKS": True,
+        }
+    }
+else:
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": os.getenv("BD_NOMBRE") or BASE_DIR / "db.sqlite3",
+            "OPTIONS": {
+                # Las transacciones toman el bloqueo de escritura al empezar: si la base
+                # de datos está ocupada se espera (timeout) en lugar de fallar a mitad
+                "transaction_mode": "IMMEDIATE",
+                "timeout": 5,  # Segundos que se espera por el bloqueo de escritura
+            },
+        }
     }
-}
+
+# SQLite en modo WAL (gestion/sqlite.py)
+# Reintentos de las escrituras de las vistas que fallan porque la base de datos sigue
+# bloqueada tras el timeout, con esperas aleatorias de hasta ESPERA * 2^intento segundos
+SQLITE_REINTENTOS = 3
+SQLITE_REINTENTO_ESPERA = 0.1
+# Páginas del WAL (4 KB) a partir de las que la escritura que las supera hace el checkpoint.
+# Por encima de SQLITE_CHECKPOINT_TAMANO para que normalmente lo haga antes el hilo de checkpoints.
+SQLITE_WAL_AUTOCHECKPOINT = 4000
+SQLITE_WAL_TAMANO_LIMITE = (
+    64 * 1024 * 1024
+)  # Bytes a los que se trunca el WAL tras un checkpoint
+# Checkpoints PASSIVE en segundo plano en cada proceso de gunicorn (ver gunicorn.conf.py)
+SQLITE_CHECKPOINT_AUTOMATICO = True
+SQLITE_CHECKPOINT_INTERVALO = 5  # Segundos entre comprobaciones del WAL
+SQLITE_CHECKPOINT_TAMANO = (
+    8 * 1024 * 1024
+)  # Bytes del WAL sin copiar a partir de los que se hace
+SQLITE_CHECKPOINT_INACTIVIDAD = 30  # Segundos sin escrituras tras los que se hace
+
+# Copias de seguridad (python manage.py copia_seguridad)
+COPIAS_DIRECTORIO = BASE_DIR.parent / "backups"
+COPIAS_CONSERVAR = 28  # Copias más recientes que se conservan (0 para conservar todas)
+COPIAS_NIVEL_COMPRESION = (
+    12  # Nivel de zstd (o de gzip, hasta 9, si zstd no está instalado)
+)
+# Páginas copiadas en cada paso y pausa en segundos entre pasos, para no bloquear las escrituras
+COPIAS_PAGINAS_PASO = 1024
+COPIAS_PAUSA_PASO = 0.05
 
 
 # Password validation
@@ -127,13 +186,9 @@ LOGGING = {
         },
     },
     "formatters": {
-        "standard": {
-            "format": "[%(asctime)s] %(levelname)s [%(name)s:%(lineno)s] %(message)s",
-            "datefmt": "%Y-%m-%d %H:%M:%S",
-        },
-        "con_correo": {
-            "format": "[%(asctime)s] %(levelname)s [%(name)s:%(lineno)s] (%(correo)s) %(message)s",
-            "datefmt": "%Y-%m-%d %H:%M:%S",
+        # Una línea JSON con request_id y correo (gestion/logs.py)
+        "json": {
+            "()": "gestion.logs.FormatoJSON",
         },
         "django.server": {  # manage.py runserver
             "()": "django.utils.log.ServerFormatter",
@@ -163,28 +218,43 @@ LOGGING = {
             "class": "logging.NullHandler",
         },
         # Custom
+        # Todos los logs de la aplicación pasan por la cola; el listener de cada proceso
+        # (gestion/logs.py, iniciado en GestionConfig.ready) los escribe en los archivos
+        "cola": {
+            "class": "gestion.logs.ColaHandler",
+            "handlers": ["file_debug", "file_info", "file_warning", "file_error"],
+            "respect_handler_level": True,
+        },
         "file_debug": {
-            "class": "logging.FileHandler",
-            "formatter": "standard",
+            "class": "gestion.logs.ArchivoRotativo",
+            "formatter": "json",
             "filename": LOGFILE_NAME + "debug.log",
+            "maxBytes": LOGFILE_SIZE,
+            "backupCount": LOGFILE_COUNT,
         },
         "file_info": {
             "level": "INFO",
-            "class": "logging.FileHandler",
-            "formatter": "standard",
+            "class": "gestion.logs.ArchivoRotativo",
+            "formatter": "json",
             "filename": LOGFILE_NAME + "info.log",
+            "maxBytes": LOGFILE_SIZE,
+            "backupCount": LOGFILE_COUNT,
         },
         "file_warning": {
             "level": "WARNING",
-            "class": "logging.FileHandler",
-            "formatter": "standard",
+            "class": "gestion.logs.ArchivoRotativo",
+            "formatter": "json",
             "filename": LOGFILE_NAME + "warning.log",
+            "maxBytes": LOGFILE_SIZE,
+            "backupCount": LOGFILE_COUNT,
         },
         "file_error": {
             "level": "ERROR",
-            "class": "logging.FileHandler",
-            "formatter": "standard",
+            "class": "gestion.logs.ArchivoRotativo",
+            "formatter": "json",
             "filename": LOGFILE_NAME + "error.log",
+            "maxBytes": LOGFILE_SIZE,
+            "backupCount": LOGFILE_COUNT,
         },
     },
     "loggers": {
@@ -208,27 +278,8 @@ LOGGING = {
         },
         # Custom
         "": {
-            "level": os.getenv("DJANGO_LOG_LEVEL", "DEBUG"),
-            "handlers": ["file_error", "file_warning", "file_info", "file_debug"],
-        },
-        "hackackathon": {
-            "level": "DEBUG",
-            "handlers": ["file_debug"],
-        },
-        "gestion": {
-            "level": "DEBUG",
-            "handlers": ["file_debug"],
-        },
-        # Custom/con_correo
-        "gestion.utils": {
-            "level": "DEBUG",
-            "formatter": "con_correo",
-            "handlers": ["file_debug"],
-        },
-        "gestion.management.commands.correosconfirmacion": {
-            "level": "DEBUG",
-            "formatter": "con_correo",
-            "handlers": ["file_debug"],
+            "level": os.getenv("DJANGO_LOG_LEVEL", "INFO"),
+            "handlers": ["cola"],
         },
     },
 }
@@ -257,9 +308,28 @@ STATICFILES_DIRS = [
 
 # Media files (User uploaded content)
 # https://docs.djangoproject.com/en/5.1/topics/files/
-MEDIA_ROOT = BASE_DIR / "media"
+MEDIA_ROOT = Path(os.getenv("MEDIA_ROOT") or BASE_DIR / "media")
 MEDIA_URL = "media/"
 
+# Subida de CVs: se reciben a un directorio temporal en el mismo sistema de
+# ficheros que MEDIA_ROOT, comprobando el tamaño y la cabecera PDF al recibirlos
+CV_TAMANO_MAXIMO = 10 * 1024 * 1024  # Bytes
+CV_DIRECTORIO_TEMPORAL = MEDIA_ROOT / "tmp"
+FILE_UPLOAD_HANDLERS = [
+    "gestion.subidas.CVUploadHandler",
+    "django.core.files.uploadhandler.MemoryFileUploadHandler",
+    "django.core.files.uploadhandler.TemporaryFileUploadHandler",
+]
+
+# Descarga de CVs: "django" los envía desde Django. "nginx" (X-Accel-Redirect) y "sendfile"
+# (X-Sendfile) solo comprueban los permisos y delegan el envío en el servidor web.
+CV_DESCARGA = os.getenv("CV_DESCARGA") or "django"
+# Ubicación interna de nginx que apunta a MEDIA_ROOT (ver doc/nginx-default)
+CV_DESCARGA_PREFIJO = "/interno/media/"
+# Búsqueda en los CVs: la tarea "indexar_cvs" extrae su texto y lo indexa junto a la motivación
+CV_INDICE_LOTE = 200  # CVs de los que se extrae el texto en cada ejecución
+CV_TEXTO_MAXIMO = 100_000  # Caracteres de texto que se guardan de cada CV
+
 # Fixtures (initial data)
 # https://docs.djangoproject.com/en/5.1/topics/db/fixtures/
 FIXTURE_DIRS = [
@@ -282,8 +352,9 @@ MESSAGE_STORAGE = "django.contrib.messages.storage.session.SessionStorage"
 # Email
 # https://docs.djangoproject.com/en/5.1/topics/email/
 EMAIL_HOST = os.getenv("EMAIL_HOST")
-EMAIL_PORT = 465
-EMAIL_USE_SSL = True
+# Con otro puerto, sin SSL: por ejemplo un servidor SMTP local de pruebas (aiosmtpd)
+EMAIL_PORT = int(os.getenv("EMAIL_PORT") or 465)
+EMAIL_USE_SSL = EMAIL_PORT == 465
 EMAIL_HOST_USER = os.getenv("EMAIL_HOST_USER")
 EMAIL_HOST_PASSWORD = os.getenv("EMAIL_HOST_PASSWORD")
 
@@ -292,8 +363,10 @@ EMAIL_MAX_ERRORS = 5  # Máximo de errores en el envío de correos de confirmaci
 
 SERVER_EMAIL = os.getenv("SERVER_EMAIL")
 DEFAULT_FROM_EMAIL = os.getenv("DEFAULT_FROM_EMAIL")
-EMAIL_BACKEND = "django.core.mail.backends.smtp.EmailBackend"
-# EMAIL_BACKEND = "django.core.mail.backends.console.EmailBackend"
+# Para pruebas: "django.core.mail.backends.console.EmailBackend" o "...locmem.EmailBackend"
+EMAIL_BACKEND = (
+    os.getenv("EMAIL_BACKEND") or "django.core.mail.backends.smtp.EmailBackend"
+)
 
 # Configuración de entorno ----------------------------------------------------
 # Inicio del evento
@@ -309,6 +382,78 @@ FECHA_FIN_REGISTRO = datetime.fromisoformat(os.getenv("FECHA_FIN_REGISTRO")).rep
     tzinfo=ZoneInfo(TIME_ZONE)
 )
 
+# Normalización de participantes
+NORMALIZACION_UMBRAL_SIMILITUD = 0.7  # Similitud mínima (0-1) para proponer un grupo
+NORMALIZACION_CACHE_TTL = 10 * 60  # Segundos que se reutilizan los grupos calculados
+NORMALIZACION_TAMANO_LOTE = 500  # Filas por consulta al aplicar o deshacer
+
+# Selección de participantes
+# Plazas totales del evento (participantes y mentores). Vacío para no limitarlas.
+PLAZAS_EVENTO = int(os.getenv("PLAZAS_EVENTO")) if os.getenv("PLAZAS_EVENTO") else None
+# Máximo de plazas por valor de un campo. Ej: {"tipo": {"mentor": 20}}
+CUOTAS_SELECCION = {}
+# Orden de prioridad de los candidatos. "-" para orden descendente.
+CRITERIOS_SELECCION = ["fecha_registro"]
+SELECCION_TAMANO_LOTE = 500  # Filas por consulta al aceptar
+EVENTOS_TAMANO_LOTE = 500  # Eventos por inserción en las acciones sobre muchas personas
+# Promocionar la lista de espera cuando alguien rechaza su plaza (requiere PLAZAS_EVENTO).
+# La promoción la hace el proceso de las tareas periódicas (ejecutar_tareas) al momento.
+PROMOCION_AUTOMATICA = True
+
+# Perfilado de las vistas (gestion/perfilado.py): consultas, tiempo de la base de datos,
+# de las plantillas, del envío de correos y total por vista. Ver con `manage.py perfilado`
+# o en /gestion/estado/perfilado.
+PERFILADO_ACTIVO = False
+PERFILADO_MUESTREO = 0.1  # Fracción de las peticiones que se miden
+PERFILADO_INTERVALO = 10  # Segundos entre guardados de la instantánea de cada proceso
+PERFILADO_DIRECTORIO = BASE_DIR / "log" / "perfilado"
+
+# Métricas de Prometheus en /metrics (gestion/metricas.py)
+METRICAS_ACTIVAS = True
+METRICAS_INTERVALO = 5  # Segundos entre guardados de las métricas de cada proceso
+# gunicorn.conf.py lo vacía al arrancar
+METRICAS_DIRECTORIO = Path(
+    os.getenv("METRICAS_DIRECTORIO") or BASE_DIR / "log" / "metricas"
+)
+# Con la cabecera "Authorization: Bearer <token>" no hace falta iniciar sesión
+METRICAS_TOKEN = os.getenv("METRICAS_TOKEN", "")
+
+# Tareas periódicas (python manage.py ejecutar_tareas)
+# Intervalo en segundos entre ejecuciones de cada tarea. Eliminar una entrada la desactiva.
+TAREAS_PERIODICAS = {
+    "enviar_correos_pendientes": 60,
+    "recordatorios_tokens": 60 * 60,
+    "promocionar_lista_espera": 60 * 60,
+    "limpieza_tokens": 24 * 60 * 60,
+    "indexar_cvs": 5 * 60,
+}
+# Antelación con la que se recuerda a una persona que su token va a expirar
+RECORDATORIO_TOKENS_ANTELACION = timedelta(days=2)
+# Tiempo que se conservan los tokens expirados sin usar que ya no sirven
+TOKENS_RETENCION = timedelta(days=30)
+TOKENS_TAMANO_LOTE = 500  # Filas por consulta al limpiar tokens
+# Enviar enlaces de verificación y confirmación firmados en lugar del UUID del token.
+# Firman el UUID, la expiración y la referencia de la Persona (no su correo): se validan
+# sin consultar la base de datos y la tabla de tokens solo se consulta al cambiar de
+# estado (verificar, aceptar o rechazar), con una actualización que descarta los tokens
+# usados o eliminados. Los enlaces con UUID siguen funcionando. Dependen de SECRET_KEY
+# (y SECRET_KEY_FALLBACK).
+TOKENS_FIRMADOS = False
+
+# Segundos que se reutiliza el resultado de la búsqueda de registros duplicados
+DUPLICADOS_CACHE_TTL = 5 * 60
+
+# Segundos que se reutilizan los datos del panel del índice de gestión si no hay
+# cambios de estado (gestion/panel.py)
+PANEL_CACHE_TTL = 30
+
+# Lecturas de acreditaciones en directo (gestion/directo.py)
+DIRECTO_INTERVALO = 1  # Segundos entre consultas de los eventos de otros procesos
+DIRECTO_LATIDO = 15  # Segundos sin eventos tras los que se envía un comentario
+DIRECTO_REINTENTO = 5000  # Milisegundos hasta que el navegador vuelve a conectarse
+DIRECTO_REPETIR = 200  # Eventos pendientes enviados como mucho al conectarse
+DIRECTO_COLA = 100  # Eventos en espera por conexión
+
 # Nombre y mail del administrador
 NOMBRE_ADMIN = os.getenv("NOMBRE_ADMIN")
 MAIL_ADMIN = os.getenv("MAIL_ADMIN")
@@ -320,6 +465,12 @@ EMAIL_VERIFICACION_CORRECTA_ASUNTO = "HackUDC 2026 - Solicitud registrada correc
 EMAIL_ACEPTACION_ASUNTO = "HackUDC 2026 - Plaza confirmada"
 EMAIL_RECHAZO_ASUNTO = "HackUDC 2026 - Plaza rechazada"
 EMAIL_COLABORADOR_ASUNTO = "HackUDC 2026 - Solicitud recibida"
+EMAIL_RECORDATORIO_VERIFICACION_ASUNTO = (
+    "HackUDC 2026 - Aún no has confirmado tu correo ⏳"
+)
+EMAIL_RECORDATORIO_CONFIRMACION_ASUNTO = (
+    "HackUDC 2026 - Aún no has confirmado tu plaza ⏳"
+)
 # -----------------------------------------------------------------------------
 
 ADMINS = [